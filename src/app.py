@@ -1,19 +1,34 @@
 import asyncio
-import logging.config
+import logging
 import json
+import time
 
-from fastapi import Depends, FastAPI
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi_pagination import add_pagination
 from gmqtt import Client as MQTTClient
 from prometheus_fastapi_instrumentator import Instrumentator
-from starlette.responses import PlainTextResponse
-from starlette.staticfiles import StaticFiles
+from starlette.responses import JSONResponse, PlainTextResponse, Response
 
 import settings
+from core.etag import NotModified
+from core.executor import ExecutorOverloaded
+from core.jobs import JobQueue
+from core.log_pipeline import setup_logging
+from core.static_files import CachedStaticFiles
 from core.simple_cache import Cache
+from database.orm import Session, engine
 from monitoring.instumentator import verify_metrics_creds
+from monitoring.loop_monitor import LoopMonitor
+from monitoring.profiler import ProfileRouteMiddleware
+from monitoring.query_stats import QueryStatsMiddleware, install_query_stats
+from monitoring.metrics import (
+    MQTT_HANDLER_ERRORS,
+    MQTT_HANDLER_TIME,
+    MQTT_MESSAGES,
+)
 from routers import api_v1_router
+from web.debug.routers import router as debug_router
 from settings import (
     LOGGING,
     MQTT_BROKER,
@@ -23,16 +38,21 @@ from settings import (
     DELETE_AFTER,
 )
 from state import SensorsState
+from web.slots.jobs import ARCHIVE_SPRINT_HITS, register_slot_jobs
+from web.users.photos import RENDITION_NAME_RE, photo_processing
+from web.users.users import password_hashing
 
 
-logging.config.dictConfig(LOGGING)
+setup_logging(LOGGING)
 
 
 logger = logging.getLogger('control')
+mqtt_logger = logging.getLogger('control.mqtt')
 
 
 def setup_routes(app: FastAPI):
     app.include_router(api_v1_router)
+    app.include_router(debug_router)
     app.add_route('/ping/', lambda _request: PlainTextResponse('pong'))
 
 
@@ -64,18 +84,43 @@ def create_app() -> FastAPI:
     add_pagination(app)
     app.mount(
         f'/api/{settings.STATIC_FOLDER}',
-        StaticFiles(directory='static'),
+        CachedStaticFiles(
+            directory='static',
+            immutable_pattern=RENDITION_NAME_RE,
+        ),
         name='static',
     )
-    # logging_config.dictConfig(settings.LOGGING)
+    install_query_stats(engine.sync_engine)
+    app.add_middleware(ProfileRouteMiddleware)
+    app.add_middleware(
+        QueryStatsMiddleware,
+        budget=settings.QUERY_BUDGET,
+        repeat_threshold=settings.QUERY_REPEAT_THRESHOLD,
+    )
     app.add_middleware(
         CORSMiddleware,
         allow_origins=origins,
         allow_credentials=True,
         allow_methods=['*'],
         allow_headers=['*'],
+        expose_headers=['ETag'],
     )
 
+    @app.exception_handler(NotModified)
+    async def _not_modified(request: Request, exc: NotModified) -> Response:
+        return Response(status_code=304, headers=exc.headers)
+
+    @app.exception_handler(ExecutorOverloaded)
+    async def _executor_overloaded(
+        request: Request, exc: ExecutorOverloaded
+    ) -> JSONResponse:
+        logger.warning('%s, rejecting %s', exc, request.url.path)
+        return JSONResponse(
+            status_code=503,
+            content={'detail': 'Server is busy, try again later'},
+            headers={'Retry-After': str(exc.retry_after)},
+        )
+
     Instrumentator(
         should_group_status_codes=False,
         should_ignore_untemplated=True,
@@ -88,6 +133,13 @@ def create_app() -> FastAPI:
 
     @app.on_event('startup')
     async def _startup() -> None:
+        if settings.LOOP_MONITOR_ENABLED:
+            app.state.loop_monitor = LoopMonitor(
+                interval=settings.LOOP_MONITOR_INTERVAL,
+                block_threshold=settings.LOOP_BLOCK_THRESHOLD,
+            )
+            await app.state.loop_monitor.start()
+
         client = MQTTClient('api-backend')
         app.state.mqtt = client
         app.state.sensors = SensorsState()
@@ -102,6 +154,14 @@ def create_app() -> FastAPI:
         except Exception as e:
             logger.exception("Redis connect failed: %s", e)
 
+        app.state.jobs = JobQueue(
+            Session,
+            cache=app.state.cache,
+            concurrency=settings.JOB_WORKERS,
+        )
+        register_slot_jobs(app.state.jobs)
+        await app.state.jobs.start()
+
         def _on_connect(client, flags, rc, properties):
             logger.info("🔌 MQTT connected: flags=%s rc=%s", flags, rc)
             client.subscribe('fitbox/ping', qos=1)
@@ -118,17 +178,24 @@ def create_app() -> FastAPI:
         client.on_subscribe = _on_subscribe
 
         async def _on_msg(client, topic, payload, qos, properties):
+            MQTT_MESSAGES.labels(topic).inc()
+            started = time.perf_counter()
             try:
-                logger.debug("📥 MQTT message: topic=%s qos=%s payload=%r", topic, qos, payload)
+                mqtt_logger.debug("📥 MQTT message: topic=%s qos=%s payload=%r", topic, qos, payload)
                 if topic == 'fitbox/ping':
                     data = json.loads(payload)
                     device_id = str(data.get('device_id') or '').strip()
                     ip = data.get('ip')
                     if device_id:
                         await app.state.sensors.touch(device_id, ip=ip)
-                        logger.debug('🟢 touched %s (ip=%s)', device_id, ip)
+                        mqtt_logger.debug('🟢 touched %s (ip=%s)', device_id, ip)
             except Exception as e:
+                MQTT_HANDLER_ERRORS.labels(topic).inc()
                 logger.exception("❌ error in on_message: %s", e)
+            finally:
+                MQTT_HANDLER_TIME.labels(topic).observe(
+                    time.perf_counter() - started
+                )
 
         client.on_message = _on_msg
 
@@ -154,9 +221,23 @@ def create_app() -> FastAPI:
 
         app.state.janitor_task = asyncio.create_task(_janitor())
 
+        async def _archiver():
+            while True:
+                try:
+                    await app.state.jobs.submit(
+                        ARCHIVE_SPRINT_HITS,
+                        {'older_than_days': settings.HITS_ARCHIVE_AFTER_DAYS},
+                    )
+                except Exception as e:
+                    logger.exception('Could not submit hits archiving: %s', e)
+                await asyncio.sleep(settings.HITS_ARCHIVE_PERIOD)
+
+        if settings.HITS_ARCHIVE_AFTER_DAYS > 0:
+            app.state.archiver_task = asyncio.create_task(_archiver())
+
     @app.on_event('shutdown')
     async def _shutdown() -> None:
-        for attr in ('janitor_task', 'mqtt_connect_task'):
+        for attr in ('janitor_task', 'archiver_task', 'mqtt_connect_task'):
             task = getattr(app.state, attr, None)
             if task and not task.done():
                 task.cancel()
@@ -164,6 +245,14 @@ def create_app() -> FastAPI:
                     await task
                 except asyncio.CancelledError:
                     pass
+        jobs = getattr(app.state, 'jobs', None)
+        if jobs:
+            await jobs.stop()
+        loop_monitor = getattr(app.state, 'loop_monitor', None)
+        if loop_monitor:
+            await loop_monitor.stop()
+        password_hashing.shutdown()
+        photo_processing.shutdown()
         try:
             await app.state.mqtt.disconnect()
         except Exception:
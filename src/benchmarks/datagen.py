@@ -0,0 +1,195 @@
+import json
+import random
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from fastapi_users.password import PasswordHelper
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from constants import DEFAULT_BLINK_INTERVAL
+from database.models import Bookings, Slots, User
+
+BENCH_EMAIL_DOMAIN = 'bench.fitbox.local'
+BENCH_PASSWORD = 'bench-password'
+BENCH_SLOT_TYPE = 'bench'
+
+
+@dataclass
+class BenchUser:
+    id: uuid.UUID
+    email: str
+    name: str
+    last_name: str
+
+
+@dataclass
+class BenchSlot:
+    id: int
+    time: datetime
+    number_of_places: int
+    bindings: dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class Dataset:
+    seed: int
+    users: list[BenchUser]
+    slots: list[BenchSlot]
+    sensors: list[str]
+    sprints_per_slot: int
+    hits_per_sprint: int
+    blink_interval: int
+
+
+def load_hits_sample(path: str | Path) -> list[dict]:
+    """Hits from the JSON written by scripts/excel_to_hits.py."""
+    payload = json.loads(Path(path).read_text(encoding='utf-8'))
+    hits = payload['hits'] if isinstance(payload, dict) else payload
+    return [
+        {'timeMs': int(h['timeMs']), 'maxAccel': float(h['maxAccel'])}
+        for h in hits
+    ]
+
+
+def make_hits(
+    rng: random.Random,
+    count: int,
+    blink_interval: int = DEFAULT_BLINK_INTERVAL,
+    sample: list[dict] | None = None,
+) -> list[dict]:
+    """Synthetic hit stream shaped like real sensor output.
+
+    With ``sample`` the forces and inter-hit gaps are resampled from a
+    recorded sprint, otherwise hits follow the blink tempo with jitter,
+    occasional off-beat punches and a tail of weak sub-threshold taps.
+    """
+    hits = []
+    t = rng.randint(0, blink_interval)
+    if sample and len(sample) > 1:
+        gaps = [
+            max(1, b['timeMs'] - a['timeMs'])
+            for a, b in zip(sample, sample[1:])
+        ]
+        forces = [h['maxAccel'] for h in sample]
+        for _ in range(count):
+            hits.append({'timeMs': t, 'maxAccel': rng.choice(forces)})
+            t += rng.choice(gaps)
+        return hits
+
+    for _ in range(count):
+        if rng.random() < 0.15:
+            t += rng.randint(blink_interval // 4, blink_interval)
+        else:
+            t += blink_interval + int(rng.gauss(0, blink_interval * 0.12))
+        if rng.random() < 0.1:
+            force = rng.uniform(2.0, 13.0)
+        else:
+            force = rng.lognormvariate(3.0, 0.25)
+        hits.append({'timeMs': max(0, t), 'maxAccel': round(force, 2)})
+    return hits
+
+
+def chunked(hits: list[dict], size: int) -> list[list[dict]]:
+    if size <= 0:
+        return [hits]
+    return [hits[i:i + size] for i in range(0, len(hits), size)] or [[]]
+
+
+def build_dataset(
+    seed: int,
+    users: int,
+    slots: int,
+    sensors: int,
+    sprints_per_slot: int,
+    hits_per_sprint: int,
+    blink_interval: int = DEFAULT_BLINK_INTERVAL,
+    first_slot_id: int = 900_000,
+) -> Dataset:
+    """Deterministic description of the data to seed: the same seed gives
+    the same users, slots and bindings on every run."""
+    rng = random.Random(seed)
+    sensor_ids = [f'BENCH{i:03d}' for i in range(1, sensors + 1)]
+    bench_users = [
+        BenchUser(
+            id=uuid.UUID(int=rng.getrandbits(128), version=4),
+            email=f'user{i:05d}-{seed}@{BENCH_EMAIL_DOMAIN}',
+            name=f'Bench{i:05d}',
+            last_name=f'Seed{seed}',
+        )
+        for i in range(users)
+    ]
+    start = datetime(2025, 1, 6, 8, 0, tzinfo=timezone.utc)
+    bench_slots = []
+    for i in range(slots):
+        places = min(sensors, len(bench_users))
+        attendees = rng.sample(bench_users, places)
+        bench_slots.append(
+            BenchSlot(
+                id=first_slot_id + i,
+                time=start + timedelta(hours=i),
+                number_of_places=places,
+                bindings={
+                    str(u.id): sensor_ids[j] for j, u in enumerate(attendees)
+                },
+            )
+        )
+    return Dataset(
+        seed=seed,
+        users=bench_users,
+        slots=bench_slots,
+        sensors=sensor_ids,
+        sprints_per_slot=sprints_per_slot,
+        hits_per_sprint=hits_per_sprint,
+        blink_interval=blink_interval,
+    )
+
+
+async def seed_database(db_session: AsyncSession, dataset: Dataset) -> None:
+    """Insert the dataset's users, slots and bound bookings, replacing
+    anything left behind by a previous run with the same seed."""
+    slot_ids = [s.id for s in dataset.slots]
+    user_ids = [u.id for u in dataset.users]
+    await db_session.execute(delete(Slots).where(Slots.id.in_(slot_ids)))
+    await db_session.execute(delete(User).where(User.id.in_(user_ids)))
+
+    hashed_password = PasswordHelper().hash(BENCH_PASSWORD)
+    db_session.add_all(
+        User(
+            id=u.id,
+            email=u.email,
+            hashed_password=hashed_password,
+            name=u.name,
+            last_name=u.last_name,
+            score=len(dataset.slots),
+        )
+        for u in dataset.users
+    )
+    await db_session.flush()
+
+    now = datetime.now(timezone.utc)
+    for slot in dataset.slots:
+        db_session.add(
+            Slots(
+                id=slot.id,
+                type=BENCH_SLOT_TYPE,
+                time=slot.time,
+                number_of_places=slot.number_of_places,
+                booked_count=len(slot.bindings),
+                bindings=dict(slot.bindings),
+            )
+        )
+    await db_session.flush()
+    for slot in dataset.slots:
+        db_session.add_all(
+            Bookings(
+                created_at=now,
+                user_id=uuid.UUID(user_id),
+                slot_id=slot.id,
+                sensor_id=sensor_id,
+            )
+            for user_id, sensor_id in slot.bindings.items()
+        )
+    await db_session.commit()
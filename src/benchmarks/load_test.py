@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+import json
+import platform
+import random
+import resource
+import subprocess
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+import httpx
+
+import settings
+from benchmarks.datagen import (
+    Dataset,
+    build_dataset,
+    chunked,
+    load_hits_sample,
+    make_hits,
+    seed_database,
+)
+from database.orm import Session
+
+API_PREFIX = '/api/v1'
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    s = sorted(values)
+    rank = max(0, min(len(s) - 1, round(q / 100.0 * len(s) + 0.5) - 1))
+    return s[rank]
+
+
+@dataclass
+class ScenarioStats:
+    name: str
+    latencies: list[float] = field(default_factory=list)
+    statuses: dict[int, int] = field(default_factory=dict)
+    errors: int = 0
+    started: float = 0.0
+    finished: float = 0.0
+    peak_rss_kb: int | None = None
+
+    def record(self, elapsed: float, status: int | None) -> None:
+        self.latencies.append(elapsed)
+        if status is None or status >= 400:
+            self.errors += 1
+        key = status if status is not None else 0
+        self.statuses[key] = self.statuses.get(key, 0) + 1
+
+    def report(self) -> dict:
+        duration = max(self.finished - self.started, 1e-9)
+        ms = [v * 1000.0 for v in self.latencies]
+        return {
+            'requests': len(ms),
+            'errors': self.errors,
+            'statuses': {str(k): v for k, v in sorted(self.statuses.items())},
+            'duration_s': round(duration, 3),
+            'throughput_rps': round(len(ms) / duration, 2),
+            'p50_ms': round(percentile(ms, 50), 2),
+            'p90_ms': round(percentile(ms, 90), 2),
+            'p99_ms': round(percentile(ms, 99), 2),
+            'max_ms': round(max(ms), 2) if ms else 0.0,
+            'mean_ms': round(sum(ms) / len(ms), 2) if ms else 0.0,
+            'server_peak_rss_mb': (
+                round(self.peak_rss_kb / 1024, 1)
+                if self.peak_rss_kb is not None
+                else None
+            ),
+        }
+
+
+def read_rss_kb(pid: int, field_name: str = 'VmRSS') -> int | None:
+    try:
+        with open(f'/proc/{pid}/status', encoding='ascii') as f:
+            for line in f:
+                if line.startswith(f'{field_name}:'):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        return None
+    return None
+
+
+class RssSampler:
+    """Polls the server's resident set size while a scenario runs."""
+
+    def __init__(self, pid: int | None, interval: float = 0.05) -> None:
+        self._pid = pid
+        self._interval = interval
+        self._task: asyncio.Task | None = None
+        self.peak_kb: int | None = None
+
+    async def _run(self) -> None:
+        while True:
+            rss = read_rss_kb(self._pid)
+            if rss is not None and (self.peak_kb is None or rss > self.peak_kb):
+                self.peak_kb = rss
+            await asyncio.sleep(self._interval)
+
+    async def __aenter__(self) -> 'RssSampler':
+        if self._pid:
+            self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+async def timed_request(
+    client: httpx.AsyncClient,
+    stats: ScenarioStats,
+    method: str,
+    url: str,
+    **kwargs,
+) -> httpx.Response | None:
+    started = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+    except httpx.HTTPError:
+        stats.record(time.perf_counter() - started, None)
+        return None
+    stats.record(time.perf_counter() - started, response.status_code)
+    return response
+
+
+async def run_scenario(
+    name: str,
+    jobs: list,
+    concurrency: int,
+    server_pid: int | None,
+) -> ScenarioStats:
+    stats = ScenarioStats(name=name)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _guarded(job):
+        async with semaphore:
+            await job(stats)
+
+    async with RssSampler(server_pid) as sampler:
+        stats.started = time.perf_counter()
+        await asyncio.gather(*(_guarded(job) for job in jobs))
+        stats.finished = time.perf_counter()
+    stats.peak_rss_kb = sampler.peak_kb
+    return stats
+
+
+async def login(client: httpx.AsyncClient, email: str, password: str) -> str:
+    response = await client.post(
+        f'{API_PREFIX}/auth/jwt/login',
+        data={'username': email, 'password': password},
+    )
+    response.raise_for_status()
+    return response.json()['access_token']
+
+
+def ingest_jobs(
+    client: httpx.AsyncClient,
+    dataset: Dataset,
+    chunk_size: int,
+    sample: list[dict] | None,
+) -> list:
+    """One job per (slot, sprint, sensor): its chunks are sent in order,
+    the way a bag streams them, while different bags run concurrently."""
+    rng = random.Random(dataset.seed + 1)
+    jobs = []
+    for slot in dataset.slots:
+        for sprint_id in range(1, dataset.sprints_per_slot + 1):
+            for sensor_id in slot.bindings.values():
+                hits = make_hits(
+                    rng,
+                    dataset.hits_per_sprint,
+                    dataset.blink_interval,
+                    sample=sample,
+                )
+                chunks = chunked(hits, chunk_size)
+
+                async def _job(stats, slot_id=slot.id, sprint_id=sprint_id,
+                               sensor_id=sensor_id, chunks=chunks):
+                    for i, chunk in enumerate(chunks):
+                        await timed_request(
+                            client,
+                            stats,
+                            'POST',
+                            f'{API_PREFIX}/sensors/hits/bulk',
+                            json={
+                                'device_id': sensor_id,
+                                'session_id': str(slot_id),
+                                'sprint_id': str(sprint_id),
+                                'blink_interval': str(dataset.blink_interval),
+                                'hits': chunk,
+                                'is_last': i == len(chunks) - 1,
+                            },
+                        )
+
+                jobs.append(_job)
+    return jobs
+
+
+def request_jobs(
+    client: httpx.AsyncClient,
+    method: str,
+    urls: list[str],
+    repeat: int,
+    headers: dict,
+) -> list:
+    def _make(url):
+        async def _job(stats):
+            await timed_request(client, stats, method, url, headers=headers)
+        return _job
+
+    return [_make(url) for _ in range(repeat) for url in urls]
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main(args: argparse.Namespace) -> dict:
+    dataset = build_dataset(
+        seed=args.seed,
+        users=args.users,
+        slots=args.slots,
+        sensors=args.sensors,
+        sprints_per_slot=args.sprints,
+        hits_per_sprint=args.hits,
+        blink_interval=args.blink_interval,
+    )
+    sample = load_hits_sample(args.hits_file) if args.hits_file else None
+
+    if not args.skip_seed:
+        async with Session() as db_session:
+            await seed_database(db_session, dataset)
+
+    timeout = httpx.Timeout(args.timeout)
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(
+        base_url=args.base_url, timeout=timeout, limits=limits
+    ) as client:
+        token = await login(
+            client,
+            args.email or settings.SUPERUSER_EMAIL,
+            args.password or settings.SUPERUSER_PASSWORD,
+        )
+        auth = {'Authorization': f'Bearer {token}'}
+        slot_ids = [s.id for s in dataset.slots]
+        sprint_ids = range(1, dataset.sprints_per_slot + 1)
+
+        scenarios = {
+            'hits_bulk': ingest_jobs(client, dataset, args.chunk, sample),
+            'slot_results': request_jobs(
+                client,
+                'POST',
+                [f'{API_PREFIX}/slots/results/{s}?no_cache=true'
+                 for s in slot_ids],
+                args.repeat,
+                auth,
+            ),
+            'sprint_results': request_jobs(
+                client,
+                'POST',
+                [f'{API_PREFIX}/slots/results/{s}/sprint/{sp}?no_cache=true'
+                 for s in slot_ids for sp in sprint_ids],
+                args.repeat,
+                auth,
+            ),
+            'users_list': request_jobs(
+                client, 'GET', [f'{API_PREFIX}/users/'], args.repeat, auth
+            ),
+            'hits_export': request_jobs(
+                client,
+                'GET',
+                [f'{API_PREFIX}/sensors/hits/export'
+                 f'?slot_id={s}&sprint_id={sp}'
+                 for s in slot_ids for sp in sprint_ids],
+                1,
+                auth,
+            ),
+        }
+        results = {}
+        for name, jobs in scenarios.items():
+            if args.only and name not in args.only:
+                continue
+            stats = await run_scenario(
+                name, jobs, args.concurrency, args.server_pid
+            )
+            results[name] = stats.report()
+            print(f'{name:>15}: {json.dumps(results[name])}')
+
+    server_hwm_kb = read_rss_kb(args.server_pid, 'VmHWM') if args.server_pid else None
+    return {
+        'meta': {
+            'started_at': datetime.now(timezone.utc).isoformat(),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'base_url': args.base_url,
+            'seed': args.seed,
+            'users': args.users,
+            'slots': args.slots,
+            'sensors': args.sensors,
+            'sprints_per_slot': args.sprints,
+            'hits_per_sprint': args.hits,
+            'chunk_size': args.chunk,
+            'concurrency': args.concurrency,
+            'repeat': args.repeat,
+            'hits_file': args.hits_file,
+        },
+        'scenarios': results,
+        'server_peak_rss_mb': (
+            round(server_hwm_kb / 1024, 1) if server_hwm_kb else None
+        ),
+        'client_peak_rss_mb': round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1
+        ),
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    ap = argparse.ArgumentParser(
+        description='Seeded load test for the sensors ingest and results paths.'
+    )
+    ap.add_argument('--base-url', default='http://127.0.0.1:8800')
+    ap.add_argument('--server-pid', type=int, default=None,
+                    help='PID of the API process to sample RSS from')
+    ap.add_argument('--email', default=None)
+    ap.add_argument('--password', default=None)
+    ap.add_argument('--seed', type=int, default=42)
+    ap.add_argument('-N', '--users', type=int, default=60)
+    ap.add_argument('-M', '--slots', type=int, default=5)
+    ap.add_argument('-K', '--sensors', type=int, default=20)
+    ap.add_argument('--sprints', type=int, default=6)
+    ap.add_argument('--hits', type=int, default=300,
+                    help='Hits per sprint per sensor')
+    ap.add_argument('--hits-file', default=None,
+                    help='JSON from scripts/excel_to_hits.py to resample')
+    ap.add_argument('--chunk', type=int, default=50)
+    ap.add_argument('--blink-interval', type=int, default=500)
+    ap.add_argument('-c', '--concurrency', type=int, default=20)
+    ap.add_argument('--repeat', type=int, default=20,
+                    help='Repetitions of each read request')
+    ap.add_argument('--timeout', type=float, default=60.0)
+    ap.add_argument('--only', nargs='*', default=None,
+                    help='Run only these scenarios')
+    ap.add_argument('--skip-seed', action='store_true')
+    ap.add_argument('-o', '--output', default='bench_report.json')
+    return ap.parse_args()
+
+
+if __name__ == '__main__':
+    arguments = parse_args()
+    report = asyncio.run(main(arguments))
+    with open(arguments.output, 'w', encoding='utf-8') as out:
+        json.dump(report, out, ensure_ascii=False, indent=2)
+    print(f'Report written to {arguments.output}')
@@ -18,9 +18,40 @@ TEMPO_BORDER_PERCENT = 0.3
 FORCE_THRESHOLD = 13.5
 TRIM_PERCENT = 0.05
 PERCENTILE_LEVEL = 80
+MAX_WHAT_IF_PARAM_SETS = 100
 
 
 SLOT_RESULTS_CACHE_KEY = 'slot_result-{slot_id}'
 SLOT_RESULTS_CACHE_TTL = 60 * 60 * 24
 SPRINT_RESULTS_CACHE_KEY = 'sprint_result-{slot_id}-{sprint_id}'
 SPRINT_RESULTS_CACHE_TTL = 60 * 60 * 24
+SCHEDULE_CACHE_KEY = 'schedule-{week}'
+# bounds how long a lost incremental update can linger
+SCHEDULE_CACHE_TTL = 60 * 5
+
+# longest side in px of each stored rendition of a user photo
+PHOTO_RENDITIONS = {
+    'full': 600,
+    'thumb': 256,
+    'avatar': 96,
+}
+PHOTO_MAX_UPLOAD_BYTES = 20 * 1024 * 1024
+PHOTO_WEBP_QUALITY = 65
+
+# lower edges of the force histogram kept per sprint rollup; the last
+# bucket is open-ended
+ROLLUP_FORCE_EDGES = (0, 5, 10, 13.5, 20, 30, 40, 60, 80, 120)
+# hits per second over a sprint; buckets are doubled until they fit
+ROLLUP_TIMELINE_BUCKET_MS = 1000
+ROLLUP_MAX_TIMELINE_BUCKETS = 120
+
+# users x slots of one bulk booking request
+MAX_BULK_BOOKINGS = 1000
+MAX_BOOKING_SERIES_WEEKS = 52
+
+# pub/sub channel of a member's waitlist notifications
+WAITLIST_CHANNEL = 'waitlist-{user_id}'
+WAITLIST_KEEPALIVE = 15
+
+# latest items of each /users/me?expand= section; the rest is paginated
+USER_EXPAND_LIMIT = 20
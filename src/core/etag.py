@@ -0,0 +1,69 @@
+"""Weak ETags and If-None-Match handling for read endpoints.
+
+Routes declare a *version* dependency: a cheap query returning whatever
+changes when the response would (row counts, latest ``updated_at``, the
+caller's role). ``conditional_get`` turns it into a weak ETag and answers
+304 before the route loads or serializes anything.
+"""
+import hashlib
+from typing import Any, Callable
+
+from fastapi import Depends, Request, Response
+
+# revalidate on every use; responses depend on the caller
+PRIVATE_REVALIDATE = 'private, no-cache'
+
+
+class NotModified(Exception):
+    def __init__(self, headers: dict[str, str]) -> None:
+        super().__init__('Not modified')
+        self.headers = headers
+
+
+def make_etag(version: Any) -> str:
+    digest = hashlib.blake2b(repr(version).encode(), digest_size=16)
+    return f'W/"{digest.hexdigest()}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Weak comparison against an If-None-Match header value."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    opaque = etag.removeprefix('W/')
+    return any(
+        candidate.strip().removeprefix('W/') == opaque
+        for candidate in if_none_match.split(',')
+    )
+
+
+def check_not_modified(
+    request: Request,
+    response: Response,
+    version: Any,
+    cache_control: str = PRIVATE_REVALIDATE,
+) -> str:
+    """Set ETag and Cache-Control on ``response``; raise NotModified when
+    the client already has this version."""
+    etag = make_etag(version)
+    headers = {'ETag': etag, 'Cache-Control': cache_control}
+    if etag_matches(request.headers.get('if-none-match'), etag):
+        raise NotModified(headers)
+    response.headers.update(headers)
+    return etag
+
+
+def conditional_get(
+    version: Callable[..., Any], cache_control: str = PRIVATE_REVALIDATE
+):
+    """Route dependency answering 304 for an unchanged ``version``."""
+
+    async def dependency(
+        request: Request,
+        response: Response,
+        current: Any = Depends(version),
+    ) -> str:
+        return check_not_modified(request, response, current, cache_control)
+
+    return dependency
@@ -0,0 +1,96 @@
+from __future__ import annotations
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable
+
+from monitoring.metrics import (
+    EXECUTOR_PENDING,
+    EXECUTOR_QUEUE_WAIT,
+    EXECUTOR_REJECTED,
+    EXECUTOR_RUN_TIME,
+)
+
+
+class ExecutorOverloaded(Exception):
+    def __init__(self, name: str, retry_after: int) -> None:
+        super().__init__(f'Executor {name} is overloaded')
+        self.retry_after = retry_after
+
+
+def _timed_call(fn: Callable[..., Any], *args: Any) -> tuple[float, float, Any]:
+    # wall clock, so the timings survive the trip back from a worker process
+    started = time.time()
+    result = fn(*args)
+    return started, time.time(), result
+
+
+class BoundedExecutor:
+    """Pool for blocking CPU work with a cap on queued calls.
+
+    Once ``max_pending`` calls are waiting or running, ``run`` raises
+    ExecutorOverloaded at once instead of letting the backlog grow. With
+    ``processes=True`` calls go to spawned worker processes, so ``fn`` and
+    its arguments must be picklable.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        max_workers: int,
+        max_pending: int,
+        retry_after: int = 1,
+        processes: bool = False,
+    ) -> None:
+        self.name = name
+        self._max_workers = max_workers
+        self._max_pending = max_pending
+        self._retry_after = retry_after
+        self._processes = processes
+        self._pool: Executor | None = None
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _get_pool(self) -> Executor:
+        if self._pool is None:
+            if self._processes:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self._max_workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+            else:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self._max_workers,
+                    thread_name_prefix=self.name,
+                )
+        return self._pool
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        if self._pending >= self._max_pending:
+            EXECUTOR_REJECTED.labels(self.name).inc()
+            raise ExecutorOverloaded(self.name, self._retry_after)
+
+        self._pending += 1
+        EXECUTOR_PENDING.labels(self.name).set(self._pending)
+        submitted = time.time()
+        try:
+            loop = asyncio.get_running_loop()
+            started, finished, result = await loop.run_in_executor(
+                self._get_pool(), _timed_call, fn, *args
+            )
+        finally:
+            self._pending -= 1
+            EXECUTOR_PENDING.labels(self.name).set(self._pending)
+        EXECUTOR_QUEUE_WAIT.labels(self.name).observe(max(0.0, started - submitted))
+        EXECUTOR_RUN_TIME.labels(self.name).observe(finished - started)
+        return result
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,159 @@
+"""Compact binary storage for raw sensor hits.
+
+A blob is a version byte followed by one or more frames. Each frame is a
+varint length and a zlib-compressed body:
+
+    accel kind (1 byte) | varint count | timestamps | accels
+
+Timestamps are zigzag varints of the delta to the previous hit. Accels
+are stored as zigzag varint deltas of hundredths when every value of the
+frame is exact at that scale (what sensors send), otherwise as raw
+little-endian float64, so decoding always gives back the input values.
+
+Frames are independent, so a chunk of hits is appended without decoding
+what is already stored; ``encode_hits`` over the decoded columns merges
+them into one frame again.
+"""
+import math
+import sys
+import zlib
+from array import array
+
+VERSION = 1
+ACCEL_CENTI = 0
+ACCEL_FLOAT64 = 1
+COMPRESS_LEVEL = 6
+
+
+class HitsCodecError(Exception):
+    pass
+
+
+def _put_varint(out: bytearray, value: int) -> None:
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _put_deltas(out: bytearray, values) -> None:
+    prev = 0
+    for value in values:
+        delta = value - prev
+        prev = value
+        # Python ints are unbounded, so no fixed-width (d << 1) ^ (d >> 63)
+        zigzag = delta << 1 if delta >= 0 else (-delta << 1) - 1
+        while zigzag >= 0x80:
+            out.append(zigzag & 0x7F | 0x80)
+            zigzag >>= 7
+        out.append(zigzag)
+
+
+def _get_varint(buf, pos: int) -> tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def _get_deltas(buf, pos: int, count: int) -> tuple[list[int], int]:
+    values = [0] * count
+    prev = 0
+    for i in range(count):
+        zigzag = shift = 0
+        while True:
+            byte = buf[pos]
+            pos += 1
+            zigzag |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                break
+            shift += 7
+        prev += (zigzag >> 1) ^ -(zigzag & 1)
+        values[i] = prev
+    return values, pos
+
+
+def _encode_frame(times: list[int], forces: list[float]) -> bytes:
+    if len(times) != len(forces):
+        raise HitsCodecError('times and forces differ in length')
+    body = bytearray()
+    finite = all(math.isfinite(f) for f in forces)
+    centi = [round(f * 100) for f in forces] if finite else []
+    if finite and all(c / 100 == f for c, f in zip(centi, forces)):
+        body.append(ACCEL_CENTI)
+        _put_varint(body, len(times))
+        _put_deltas(body, times)
+        _put_deltas(body, centi)
+    else:
+        body.append(ACCEL_FLOAT64)
+        _put_varint(body, len(times))
+        _put_deltas(body, times)
+        floats = array('d', forces)
+        if sys.byteorder == 'big':
+            floats.byteswap()
+        body += floats.tobytes()
+    compressed = zlib.compress(bytes(body), COMPRESS_LEVEL)
+    frame = bytearray()
+    _put_varint(frame, len(compressed))
+    return bytes(frame) + compressed
+
+
+def _decode_frame(body: bytes, times: list, forces: list) -> None:
+    kind = body[0]
+    count, pos = _get_varint(body, 1)
+    frame_times, pos = _get_deltas(body, pos, count)
+    times.extend(frame_times)
+    if kind == ACCEL_CENTI:
+        centi, pos = _get_deltas(body, pos, count)
+        forces.extend(c / 100 for c in centi)
+    elif kind == ACCEL_FLOAT64:
+        floats = array('d')
+        floats.frombytes(body[pos:pos + count * floats.itemsize])
+        if sys.byteorder == 'big':
+            floats.byteswap()
+        forces.extend(floats)
+    else:
+        raise HitsCodecError(f'Unknown accel encoding {kind}')
+
+
+def encode_hits(times: list[int], forces: list[float]) -> bytes:
+    return bytes([VERSION]) + _encode_frame(times, forces)
+
+
+def append_hits(
+    blob: bytes | None, times: list[int], forces: list[float]
+) -> bytes:
+    if not blob:
+        return encode_hits(times, forces)
+    if blob[0] != VERSION:
+        raise HitsCodecError(f'Unknown hits encoding version {blob[0]}')
+    return blob + _encode_frame(times, forces)
+
+
+def decode_hits(blob: bytes) -> tuple[list[int], list[float]]:
+    """Timestamps and accels of every stored hit, in order."""
+    times: list[int] = []
+    forces: list[float] = []
+    if not blob:
+        return times, forces
+    if blob[0] != VERSION:
+        raise HitsCodecError(f'Unknown hits encoding version {blob[0]}')
+    pos = 1
+    try:
+        while pos < len(blob):
+            size, pos = _get_varint(blob, pos)
+            _decode_frame(zlib.decompress(blob[pos:pos + size]), times, forces)
+            pos += size
+    except (IndexError, zlib.error) as e:
+        raise HitsCodecError(f'Corrupt hits blob: {e}') from e
+    return times, forces
+
+
+def hits_to_dicts(times: list[int], forces: list[float]) -> list[dict]:
+    return [
+        {'timeMs': t, 'maxAccel': f} for t, f in zip(times, forces)
+    ]
@@ -0,0 +1,232 @@
+from __future__ import annotations
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from database.models import Jobs
+
+logger = logging.getLogger('control')
+
+JOB_PENDING = 'pending'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+ACTIVE_STATUSES = (JOB_PENDING, JOB_RUNNING)
+
+PROGRESS_MIN_INTERVAL = 0.5
+
+
+class JobSubmitError(Exception):
+    pass
+
+
+@dataclass
+class JobContext:
+    job_id: int
+    params: dict
+    db_session: AsyncSession
+    cache: Any
+    # records the fraction done, at most every PROGRESS_MIN_INTERVAL
+    progress: Callable[[float], Awaitable[None]]
+
+
+JobHandler = Callable[[JobContext], Awaitable[dict | None]]
+
+
+class JobQueue:
+    """Persistent background jobs run by a fixed pool of asyncio workers.
+
+    Jobs live in the ``jobs`` table, so pending and interrupted ones are
+    picked up again on start. A job whose kind and params match an active
+    (pending or running) job is not created twice: submit returns the
+    existing one instead.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker,
+        *,
+        cache: Any = None,
+        concurrency: int = 2,
+    ) -> None:
+        self._session_factory = session_factory
+        self._cache = cache
+        self._concurrency = concurrency
+        self._handlers: dict[str, JobHandler] = {}
+        self._queue: asyncio.Queue[int] = asyncio.Queue()
+        self._workers: list[asyncio.Task] = []
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        self._handlers[kind] = handler
+
+    @staticmethod
+    def dedup_key(kind: str, params: dict) -> str:
+        return f'{kind}:{json.dumps(params, sort_keys=True, default=str)}'
+
+    async def submit(self, kind: str, params: dict) -> tuple[Jobs, bool]:
+        """Returns the job and whether it was newly created."""
+        if kind not in self._handlers:
+            raise JobSubmitError(f'Unknown job kind {kind}')
+        key = self.dedup_key(kind, params)
+        async with self._session_factory() as db_session:
+            for _ in range(2):
+                query = select(Jobs).where(
+                    Jobs.dedup_key == key,
+                    Jobs.status.in_(ACTIVE_STATUSES),
+                )
+                existing = await db_session.scalar(query)
+                if existing is not None:
+                    return existing, False
+                job = Jobs(
+                    kind=kind,
+                    params=params,
+                    dedup_key=key,
+                    status=JOB_PENDING,
+                    progress=0.0,
+                    created_at=datetime.now(timezone.utc),
+                )
+                db_session.add(job)
+                try:
+                    await db_session.commit()
+                except IntegrityError:
+                    await db_session.rollback()
+                    continue
+                self._queue.put_nowait(job.id)
+                logger.info('Job %s (%s) queued: %s', job.id, kind, params)
+                return job, True
+        raise JobSubmitError(f'Could not submit job {key}')
+
+    async def get(self, job_id: int) -> Jobs | None:
+        async with self._session_factory() as db_session:
+            return await db_session.get(Jobs, job_id)
+
+    async def start(self) -> None:
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f'job-worker-{i}')
+            for i in range(self._concurrency)
+        ]
+        try:
+            await self._resume()
+        except Exception as e:
+            logger.exception('Could not resume pending jobs: %s', e)
+
+    async def _resume(self) -> None:
+        async with self._session_factory() as db_session:
+            await db_session.execute(
+                update(Jobs)
+                .where(Jobs.status == JOB_RUNNING)
+                .values(status=JOB_PENDING, progress=0.0, started_at=None)
+            )
+            await db_session.commit()
+            result = await db_session.scalars(
+                select(Jobs.id)
+                .where(Jobs.status == JOB_PENDING)
+                .order_by(Jobs.id.asc())
+            )
+            pending = result.all()
+        for job_id in pending:
+            self._queue.put_nowait(job_id)
+        if pending:
+            logger.info('Resumed %d pending jobs', len(pending))
+
+    async def stop(self) -> None:
+        for task in self._workers:
+            task.cancel()
+        for task in self._workers:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._workers = []
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                logger.exception('Job %s crashed the worker: %s', job_id, e)
+            finally:
+                self._queue.task_done()
+
+    async def _set(self, job_id: int, **values) -> None:
+        async with self._session_factory() as db_session:
+            await db_session.execute(
+                update(Jobs).where(Jobs.id == job_id).values(**values)
+            )
+            await db_session.commit()
+
+    def _progress_reporter(self, job_id: int):
+        last = 0.0
+
+        async def _report(fraction: float) -> None:
+            nonlocal last
+            now = time.monotonic()
+            if fraction < 1.0 and now - last < PROGRESS_MIN_INTERVAL:
+                return
+            last = now
+            await self._set(job_id, progress=max(0.0, min(1.0, fraction)))
+
+        return _report
+
+    async def _run(self, job_id: int) -> None:
+        async with self._session_factory() as db_session:
+            job = await db_session.get(Jobs, job_id)
+            if job is None or job.status != JOB_PENDING:
+                return
+            job.status = JOB_RUNNING
+            job.started_at = datetime.now(timezone.utc)
+            await db_session.commit()
+
+            handler = self._handlers.get(job.kind)
+            if handler is None:
+                await self._set(
+                    job_id,
+                    status=JOB_FAILED,
+                    error=f'Unknown job kind {job.kind}',
+                    finished_at=datetime.now(timezone.utc),
+                )
+                return
+
+            ctx = JobContext(
+                job_id=job_id,
+                params=dict(job.params or {}),
+                db_session=db_session,
+                cache=self._cache,
+                progress=self._progress_reporter(job_id),
+            )
+            started = time.perf_counter()
+            try:
+                result = await handler(ctx)
+            except Exception as e:
+                await db_session.rollback()
+                logger.exception('Job %s (%s) failed: %s', job_id, job.kind, e)
+                await self._set(
+                    job_id,
+                    status=JOB_FAILED,
+                    error=str(e),
+                    finished_at=datetime.now(timezone.utc),
+                )
+                return
+
+        await self._set(
+            job_id,
+            status=JOB_DONE,
+            progress=1.0,
+            result=result or {},
+            finished_at=datetime.now(timezone.utc),
+        )
+        logger.info(
+            'Job %s (%s) done in %.2fs',
+            job_id,
+            job.kind,
+            time.perf_counter() - started,
+        )
@@ -0,0 +1,133 @@
+import atexit
+import json
+import logging
+import logging.config
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+_RECORD_ATTRS = frozenset(
+    logging.LogRecord('', 0, '', 0, '', (), None).__dict__
+) | {'message', 'asctime', 'suppressed'}
+
+_listener: QueueListener | None = None
+_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; ``extra`` fields are kept as keys."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            'ts': datetime.fromtimestamp(
+                record.created, timezone.utc
+            ).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            'src': f'{record.filename}:{record.lineno}',
+        }
+        suppressed = getattr(record, 'suppressed', 0)
+        if suppressed:
+            payload['suppressed'] = suppressed
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                payload[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload['exc'] = record.exc_text
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """Token bucket per message template: at most ``rate`` records every
+    ``per`` seconds, plus a burst of the same size. The first record let
+    through after a quiet spell carries how many were dropped."""
+
+    def __init__(self, rate: float = 10, per: float = 1.0) -> None:
+        super().__init__()
+        self._rate = float(rate)
+        self._per = float(per)
+        self._buckets: dict[tuple, list[float]] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [self._rate, now, 0]
+            tokens, last, dropped = bucket
+            tokens = min(
+                self._rate, tokens + (now - last) * self._rate / self._per
+            )
+            if tokens < 1:
+                bucket[:] = [tokens, now, dropped + 1]
+                return False
+            bucket[:] = [tokens - 1, now, 0]
+        if dropped:
+            record.suppressed = dropped
+        return True
+
+
+class _PreparedQueueHandler(QueueHandler):
+    """Renders the message and traceback on the caller's thread, since
+    args and exc_info may not survive until the listener gets to them,
+    but leaves the final formatting to the listener's handlers."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(
+                record.exc_info
+            )
+            record.exc_info = None
+        return record
+
+
+def setup_logging(config: dict) -> None:
+    """Apply ``config`` and move the handlers of every configured logger
+    behind one queue, so formatting and disk/stdout writes happen on a
+    listener thread rather than on the event loop.
+
+    Safe to call more than once: only the first call takes effect.
+    """
+    global _listener
+    with _lock:
+        if _listener is not None:
+            return
+        logging.config.dictConfig(config)
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        queue_handler = _PreparedQueueHandler(log_queue)
+        handlers: list[logging.Handler] = []
+        for name in config.get('loggers', {}):
+            logger = logging.getLogger(name)
+            if not logger.handlers:
+                continue
+            for handler in logger.handlers:
+                if handler not in handlers:
+                    handlers.append(handler)
+            logger.handlers = [queue_handler]
+        _listener = QueueListener(
+            log_queue, *handlers, respect_handler_level=True
+        )
+        _listener.start()
+        atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """Drain the queue and stop the listener thread."""
+    global _listener
+    with _lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        _listener = None
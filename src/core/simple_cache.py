@@ -1,6 +1,6 @@
 from __future__ import annotations
 import json
-from typing import Any
+from typing import Any, AsyncIterator
 from redis.asyncio import Redis
 
 class Cache:
@@ -27,5 +27,49 @@ class Cache:
     async def set_json(self, key: str, value: Any, ttl: int | float | None = None) -> None:
         await self.set(key, json.dumps(value, ensure_ascii=False), ttl)
 
+    async def hgetall_json(self, key: str) -> dict[str, Any]:
+        raw = await self._r.hgetall(self._k(key))
+        return {field: json.loads(value) for field, value in raw.items()}
+
+    async def hset_json(self, key: str, field: str, value: Any, ttl: int | None = None) -> None:
+        """Set one field; a hash created by this call gets ``ttl``, an
+        existing one keeps its expiry."""
+        async with self._r.pipeline(transaction=True) as pipe:
+            pipe.hset(self._k(key), field, json.dumps(value, ensure_ascii=False))
+            if ttl:
+                pipe.expire(self._k(key), ttl, nx=True)
+            await pipe.execute()
+
+    async def replace_hash_json(self, key: str, mapping: dict[str, Any], ttl: int | None = None) -> None:
+        async with self._r.pipeline(transaction=True) as pipe:
+            pipe.delete(self._k(key))
+            pipe.hset(
+                self._k(key),
+                mapping={f: json.dumps(v, ensure_ascii=False) for f, v in mapping.items()},
+            )
+            if ttl:
+                pipe.expire(self._k(key), ttl)
+            await pipe.execute()
+
+    async def hdel(self, key: str, *fields: str) -> None:
+        await self._r.hdel(self._k(key), *fields)
+
+    async def publish(self, channel: str, message: Any) -> None:
+        await self._r.publish(self._k(channel), json.dumps(message, ensure_ascii=False))
+
+    async def listen(self, channel: str, timeout: float) -> AsyncIterator[Any]:
+        """Messages published on ``channel`` from now on; yields None when
+        ``timeout`` seconds pass without one, so callers can send
+        keep-alives and notice a gone client."""
+        pubsub = self._r.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(self._k(channel))
+        try:
+            while True:
+                message = await pubsub.get_message(timeout=timeout)
+                yield None if message is None else json.loads(message["data"])
+        finally:
+            await pubsub.unsubscribe()
+            await pubsub.aclose()
+
     async def close(self) -> None:
         await self._r.close()
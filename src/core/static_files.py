@@ -0,0 +1,45 @@
+import os
+import re
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'public, no-cache'
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles that lets clients keep content-addressed files forever.
+
+    Files whose name matches ``immutable_pattern`` never change, so they are
+    sent with an immutable Cache-Control. Everything else must be
+    revalidated, which Starlette answers with 304 from the ETag and
+    Last-Modified headers. Range requests are handled by FileResponse.
+    """
+
+    def __init__(
+        self, *args, immutable_pattern: re.Pattern | None = None, **kwargs
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self._immutable_pattern = immutable_pattern
+
+    def file_response(
+        self,
+        full_path: os.PathLike,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        response = FileResponse(
+            full_path, status_code=status_code, stat_result=stat_result
+        )
+        name = os.path.basename(full_path)
+        if self._immutable_pattern and self._immutable_pattern.match(name):
+            response.headers['cache-control'] = IMMUTABLE_CACHE_CONTROL
+        else:
+            response.headers['cache-control'] = REVALIDATE_CACHE_CONTROL
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,29 @@
+"""0022_added_updated_at_to_slots_bookings
+
+Revision ID: 0a7d3e91c5b6
+Revises: f2a94d6c0b18
+Create Date: 2026-10-19 21:03:52.617340
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '0a7d3e91c5b6'
+down_revision: Union[str, None] = 'f2a94d6c0b18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('slots', sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False))
+    op.add_column('bookings', sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('bookings', 'updated_at')
+    op.drop_column('slots', 'updated_at')
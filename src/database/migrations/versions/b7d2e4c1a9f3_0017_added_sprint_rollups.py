@@ -0,0 +1,59 @@
+"""0017_added_sprint_rollups
+
+Revision ID: b7d2e4c1a9f3
+Revises: a3c5e7f90b12
+Create Date: 2026-10-19 16:40:12.532871
+
+"""
+from typing import Sequence, Union
+
+import fastapi_users_db_sqlalchemy
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d2e4c1a9f3'
+down_revision: Union[str, None] = 'a3c5e7f90b12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('sprint_rollups',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('slot_id', sa.BigInteger(), nullable=False),
+    sa.Column('sprint_id', sa.Integer(), nullable=False),
+    sa.Column('sensor_id', sa.String(length=128), nullable=False),
+    sa.Column('user_id', fastapi_users_db_sqlalchemy.generics.GUID(), nullable=True),
+    sa.Column('slot_time', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('hit_count', sa.Integer(), nullable=False),
+    sa.Column('timed_count', sa.Integer(), nullable=False),
+    sa.Column('synced_count', sa.Integer(), nullable=False),
+    sa.Column('force_sum', sa.Float(), nullable=False),
+    sa.Column('force_max', sa.Float(), nullable=False),
+    sa.Column('force_hist', postgresql.ARRAY(sa.Integer()), nullable=False),
+    sa.Column('duration_ms', sa.Integer(), nullable=False),
+    sa.Column('timeline_bucket_ms', sa.Integer(), nullable=False),
+    sa.Column('timeline', postgresql.ARRAY(sa.Integer()), nullable=False),
+    sa.Column('tempo', sa.Float(), nullable=True),
+    sa.Column('power', sa.Float(), nullable=True),
+    sa.Column('energy', sa.Float(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['slot_id'], ['slots.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('slot_id', 'sprint_id', 'sensor_id', name='uix_sprint_rollup')
+    )
+    op.create_index('ix_sprint_rollups_user_time', 'sprint_rollups', ['user_id', 'slot_time'], unique=False)
+    op.create_index('ix_sprint_rollups_sensor_time', 'sprint_rollups', ['sensor_id', 'slot_time'], unique=False)
+    op.create_index('ix_sprint_rollups_slot_time', 'sprint_rollups', ['slot_time'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_sprint_rollups_slot_time', table_name='sprint_rollups')
+    op.drop_index('ix_sprint_rollups_sensor_time', table_name='sprint_rollups')
+    op.drop_index('ix_sprint_rollups_user_time', table_name='sprint_rollups')
+    op.drop_table('sprint_rollups')
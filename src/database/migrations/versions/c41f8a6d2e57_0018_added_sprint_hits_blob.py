@@ -0,0 +1,29 @@
+"""0018_added_sprint_hits_blob
+
+Revision ID: c41f8a6d2e57
+Revises: b7d2e4c1a9f3
+Create Date: 2026-10-19 17:25:03.871402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41f8a6d2e57'
+down_revision: Union[str, None] = 'b7d2e4c1a9f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('sprints', sa.Column('hits_blob', sa.LargeBinary(), nullable=True))
+    # already compressed, keep postgres from trying again
+    op.execute('ALTER TABLE sprints ALTER COLUMN hits_blob SET STORAGE EXTERNAL')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('sprints', 'hits_blob')
@@ -0,0 +1,41 @@
+"""0019_added_sprint_hits_archive
+
+Revision ID: d93a0b7e5c21
+Revises: c41f8a6d2e57
+Create Date: 2026-10-19 18:02:47.190336
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'd93a0b7e5c21'
+down_revision: Union[str, None] = 'c41f8a6d2e57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('sprint_hits_archive',
+    sa.Column('sprint_pk', sa.BigInteger(), nullable=False),
+    sa.Column('hits_blob', sa.LargeBinary(), nullable=False),
+    sa.Column('archived_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['sprint_pk'], ['sprints.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('sprint_pk')
+    )
+    op.execute('ALTER TABLE sprint_hits_archive ALTER COLUMN hits_blob SET STORAGE EXTERNAL')
+    op.add_column('sprints', sa.Column('archived_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(
+        'UPDATE sprints SET hits_blob = a.hits_blob '
+        'FROM sprint_hits_archive a '
+        'WHERE a.sprint_pk = sprints.id AND sprints.hits_blob IS NULL'
+    )
+    op.drop_column('sprints', 'archived_at')
+    op.drop_table('sprint_hits_archive')
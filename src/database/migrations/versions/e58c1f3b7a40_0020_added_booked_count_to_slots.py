@@ -0,0 +1,37 @@
+"""0020_added_booked_count_to_slots
+
+Revision ID: e58c1f3b7a40
+Revises: d93a0b7e5c21
+Create Date: 2026-10-19 19:26:11.482705
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'e58c1f3b7a40'
+down_revision: Union[str, None] = 'd93a0b7e5c21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('slots', sa.Column('booked_count', sa.Integer(), server_default='0', nullable=False))
+    op.execute(
+        'UPDATE slots SET booked_count = b.count '
+        'FROM (SELECT slot_id, count(*) AS count FROM bookings GROUP BY slot_id) b '
+        'WHERE b.slot_id = slots.id'
+    )
+    op.create_check_constraint('ck_slots_booked_count', 'slots', 'booked_count >= 0')
+    op.drop_column('slots', 'free_places')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('slots', sa.Column('free_places', sa.Integer(), server_default='0', nullable=False))
+    op.execute('UPDATE slots SET free_places = greatest(number_of_places - booked_count, 0)')
+    op.drop_constraint('ck_slots_booked_count', 'slots', type_='check')
+    op.drop_column('slots', 'booked_count')
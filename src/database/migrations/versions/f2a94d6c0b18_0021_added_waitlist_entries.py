@@ -0,0 +1,39 @@
+"""0021_added_waitlist_entries
+
+Revision ID: f2a94d6c0b18
+Revises: e58c1f3b7a40
+Create Date: 2026-10-19 20:11:38.905214
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import fastapi_users_db_sqlalchemy
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a94d6c0b18'
+down_revision: Union[str, None] = 'e58c1f3b7a40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('waitlist_entries',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('slot_id', sa.BigInteger(), nullable=False),
+    sa.Column('user_id', fastapi_users_db_sqlalchemy.generics.GUID(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['slot_id'], ['slots.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('slot_id', 'user_id', name='uix_waitlist_slot_user')
+    )
+    op.create_index('ix_waitlist_entries_user_id', 'waitlist_entries', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_waitlist_entries_user_id', table_name='waitlist_entries')
+    op.drop_table('waitlist_entries')
@@ -2,17 +2,25 @@ __all__ = [
 
     'BaseModel',
     'Bookings',
+    'Jobs',
     'Records',
+    'SprintHitsArchive',
+    'SprintRollups',
     'Slots',
     'Sprints',
     'Transactions',
     'User',
+    'WaitlistEntries',
 ]
 
 from database.orm import BaseModel
 from .bookings import Bookings
+from .hits_archive import SprintHitsArchive
+from .jobs import Jobs
 from .records import Records
+from .rollups import SprintRollups
 from .slots import Slots
 from .sprints import Sprints
 from .transactions import Transactions
 from .users import User
+from .waitlist import WaitlistEntries
@@ -1,7 +1,7 @@
 import sqlalchemy as sa
 from sqlalchemy.orm import relationship
 
-from database.orm import BaseModel
+from database.orm import BaseModel, updated_at_column
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.mutable import MutableDict
 
@@ -29,6 +29,7 @@ class Bookings(BaseModel):
         nullable=True,
         default=dict,
     )
+    updated_at = updated_at_column()
 
 
     __table_args__ = (
@@ -0,0 +1,16 @@
+import sqlalchemy as sa
+
+from database.orm import BaseModel
+
+
+class SprintHitsArchive(BaseModel):
+    """Cold copy of a sprint's raw hits (core.hits_codec format), moved
+    out of ``sprints`` once its slot is done and old enough."""
+
+    __tablename__ = 'sprint_hits_archive'
+
+    sprint_pk = sa.Column(
+        sa.ForeignKey('sprints.id', ondelete='CASCADE'), primary_key=True
+    )
+    hits_blob = sa.Column(sa.LargeBinary, nullable=False)
+    archived_at = sa.Column(sa.DateTime(timezone=True), nullable=False)
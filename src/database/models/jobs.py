@@ -0,0 +1,37 @@
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.mutable import MutableDict
+
+from database.orm import BaseModel
+
+
+class Jobs(BaseModel):
+    __tablename__ = 'jobs'
+
+    id = sa.Column(sa.BigInteger, primary_key=True)
+    kind = sa.Column(sa.String(64), nullable=False)
+    params = sa.Column(
+        MutableDict.as_mutable(JSONB),
+        nullable=False,
+        default=dict,
+    )
+    dedup_key = sa.Column(sa.String(256), nullable=False)
+    status = sa.Column(sa.String(16), nullable=False, default='pending')
+    progress = sa.Column(sa.Float, nullable=False, default=0.0)
+    result = sa.Column(
+        MutableDict.as_mutable(JSONB),
+        nullable=True,
+    )
+    error = sa.Column(sa.Text, nullable=True)
+    created_at = sa.Column(sa.DateTime(timezone=True), nullable=False)
+    started_at = sa.Column(sa.DateTime(timezone=True), nullable=True)
+    finished_at = sa.Column(sa.DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        sa.Index(
+            'uix_jobs_active_dedup_key',
+            'dedup_key',
+            unique=True,
+            postgresql_where=sa.text("status IN ('pending', 'running')"),
+        ),
+    )
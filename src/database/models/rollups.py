@@ -0,0 +1,44 @@
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from database.orm import BaseModel
+
+
+class SprintRollups(BaseModel):
+    """Per-sprint, per-device aggregates written when a sprint finalizes,
+    so history can be analysed without reading raw hits."""
+
+    __tablename__ = 'sprint_rollups'
+
+    id = sa.Column(sa.BigInteger, primary_key=True)
+    slot_id = sa.Column(
+        sa.ForeignKey('slots.id', ondelete='CASCADE'), nullable=False
+    )
+    sprint_id = sa.Column(sa.Integer, nullable=False)
+    sensor_id = sa.Column(sa.String(128), nullable=False)
+    user_id = sa.Column(
+        sa.ForeignKey('user.id', ondelete='SET NULL'), nullable=True
+    )
+    slot_time = sa.Column(sa.DateTime(timezone=True), nullable=True)
+    hit_count = sa.Column(sa.Integer, nullable=False)
+    timed_count = sa.Column(sa.Integer, nullable=False)
+    synced_count = sa.Column(sa.Integer, nullable=False)
+    force_sum = sa.Column(sa.Float, nullable=False)
+    force_max = sa.Column(sa.Float, nullable=False)
+    force_hist = sa.Column(ARRAY(sa.Integer), nullable=False)
+    duration_ms = sa.Column(sa.Integer, nullable=False)
+    timeline_bucket_ms = sa.Column(sa.Integer, nullable=False)
+    timeline = sa.Column(ARRAY(sa.Integer), nullable=False)
+    tempo = sa.Column(sa.Float, nullable=True)
+    power = sa.Column(sa.Float, nullable=True)
+    energy = sa.Column(sa.Float, nullable=True)
+    updated_at = sa.Column(sa.DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        sa.UniqueConstraint(
+            'slot_id', 'sprint_id', 'sensor_id', name='uix_sprint_rollup'
+        ),
+        sa.Index('ix_sprint_rollups_user_time', 'user_id', 'slot_time'),
+        sa.Index('ix_sprint_rollups_sensor_time', 'sensor_id', 'slot_time'),
+        sa.Index('ix_sprint_rollups_slot_time', 'slot_time'),
+    )
@@ -3,7 +3,7 @@ from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.mutable import MutableDict
 from sqlalchemy.orm import relationship
 
-from database.orm import BaseModel
+from database.orm import BaseModel, updated_at_column
 
 
 class Slots(BaseModel):
@@ -13,13 +13,25 @@ class Slots(BaseModel):
     type = sa.Column(sa.String(64), nullable=True)
     time = sa.Column(sa.DateTime(timezone=True), nullable=False)
     number_of_places = sa.Column(sa.Integer, nullable=False, default=0)
-    free_places = sa.Column(sa.Integer, nullable=False, default=0)
+    # bookings held; changed only through reserve_places/release_places
+    booked_count = sa.Column(
+        sa.Integer, nullable=False, default=0, server_default='0'
+    )
     is_done = sa.Column(sa.Boolean, default=False, nullable=False)
     bindings = sa.Column(
         MutableDict.as_mutable(JSONB),
         nullable=True,
         default=dict,
     )
+    updated_at = updated_at_column()
+
+    __table_args__ = (
+        sa.CheckConstraint('booked_count >= 0', name='ck_slots_booked_count'),
+    )
+
+    @property
+    def free_places(self) -> int:
+        return max(0, self.number_of_places - (self.booked_count or 0))
 
     bookings = relationship(
         "Bookings",
@@ -20,6 +20,10 @@ class Sprints(BaseModel):
         nullable=True,
         default=dict,
     )
+    # raw hits in core.hits_codec format; older rows keep them in data['hits']
+    hits_blob = sa.Column(sa.LargeBinary, nullable=True)
+    # set when hits_blob was moved to sprint_hits_archive
+    archived_at = sa.Column(sa.DateTime(timezone=True), nullable=True)
     result = sa.Column(
         MutableDict.as_mutable(JSONB),
         nullable=True,
@@ -0,0 +1,26 @@
+import sqlalchemy as sa
+
+from database.orm import BaseModel
+
+
+class WaitlistEntries(BaseModel):
+    """A member queued for a full slot; entries are promoted to bookings
+    in id order as places free up."""
+
+    __tablename__ = 'waitlist_entries'
+
+    id = sa.Column(sa.BigInteger, primary_key=True)
+    slot_id = sa.Column(
+        sa.ForeignKey('slots.id', ondelete='CASCADE'), nullable=False
+    )
+    user_id = sa.Column(
+        sa.ForeignKey('user.id', ondelete='CASCADE'), nullable=False
+    )
+    created_at = sa.Column(sa.DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        sa.UniqueConstraint(
+            'slot_id', 'user_id', name='uix_waitlist_slot_user'
+        ),
+        sa.Index('ix_waitlist_entries_user_id', 'user_id'),
+    )
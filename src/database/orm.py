@@ -1,3 +1,6 @@
+from datetime import datetime, timezone
+
+import sqlalchemy as sa
 from sqlalchemy.ext.asyncio import (
     AsyncSession,
     async_sessionmaker,
@@ -10,6 +13,22 @@ import settings
 
 BaseModel = declarative_base()
 
+
+def _utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def updated_at_column() -> sa.Column:
+    """Row version for ETags. Set on the client side, so ORM objects keep
+    a loaded value and Core UPDATE statements bump it as well."""
+    return sa.Column(
+        sa.DateTime(timezone=True),
+        nullable=False,
+        default=_utc_now,
+        onupdate=_utc_now,
+        server_default=sa.func.now(),
+    )
+
 engine = create_async_engine(
     settings.DATABASE_URL,
     echo=False,
@@ -5,6 +5,7 @@ from fastapi import Request
 if TYPE_CHECKING:
     from state import SensorsState
     from core.simple_cache import Cache
+    from core.jobs import JobQueue
 from gmqtt import Client as MQTTClient
 from database.orm import Session
 
@@ -30,3 +31,7 @@ def get_mqtt(request: Request) -> MQTTClient:
 
 def get_cache(request: Request) -> "Cache":
     return request.app.state.cache
+
+
+def get_jobs(request: Request) -> "JobQueue":
+    return request.app.state.jobs
@@ -1,4 +1,3 @@
-import logging.config
 import os
 import secrets
 
@@ -8,9 +7,10 @@ from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from starlette import status
 from starlette.exceptions import HTTPException
 
+from core.log_pipeline import setup_logging
 from settings import LOGGING
 
-logging.config.dictConfig(LOGGING)
+setup_logging(LOGGING)
 
 
 security = HTTPBasic()
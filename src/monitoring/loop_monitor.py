@@ -0,0 +1,110 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from types import FrameType
+
+from monitoring.metrics import LOOP_BLOCKS, LOOP_LAG
+
+logger = logging.getLogger('control')
+
+
+def find_route(frame: FrameType | None) -> str | None:
+    """Route of the request whose code is running in ``frame``, taken from
+    the ASGI scope of the innermost Starlette frame that has one."""
+    path = None
+    while frame is not None:
+        scope = frame.f_locals.get('scope')
+        if isinstance(scope, dict) and scope.get('type') in ('http', 'websocket'):
+            route = scope.get('route')
+            method = scope.get('method', 'WS')
+            if route is not None and getattr(route, 'path', None):
+                return f'{method} {route.path}'
+            if path is None:
+                path = f'{method} {scope.get("path")}'
+        frame = frame.f_back
+    return path
+
+
+class LoopMonitor:
+    """Measures event loop lag and reports callbacks that block it.
+
+    A heartbeat task sleeps for ``interval`` and records how late it wakes
+    up. A watchdog thread notices when the heartbeat has been silent for
+    longer than ``block_threshold``, grabs the loop thread's current stack
+    and logs it with the route being served. Stacks are only taken while
+    the loop is stuck, so the steady-state cost is one short sleep per
+    interval.
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.1,
+        block_threshold: float = 0.25,
+        stack_limit: int = 25,
+    ) -> None:
+        self._interval = interval
+        self._threshold = block_threshold
+        self._stack_limit = stack_limit
+        self._beat = time.monotonic()
+        self._loop_thread_id: int | None = None
+        self._task: asyncio.Task | None = None
+        self._thread: threading.Thread | None = None
+        self._stopped = threading.Event()
+
+    async def start(self) -> None:
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._heartbeat(), name='loop-monitor')
+        self._thread = threading.Thread(
+            target=self._watch, name='loop-watchdog', daemon=True
+        )
+        self._thread.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    async def _heartbeat(self) -> None:
+        while True:
+            expected = time.monotonic() + self._interval
+            await asyncio.sleep(self._interval)
+            now = time.monotonic()
+            LOOP_LAG.observe(max(0.0, now - expected))
+            self._beat = now
+
+    def _watch(self) -> None:
+        reported_beat = None
+        while not self._stopped.wait(self._threshold / 2):
+            beat = self._beat
+            blocked_for = time.monotonic() - beat - self._interval
+            if blocked_for < self._threshold or beat == reported_beat:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            reported_beat = beat
+            self._report(frame, blocked_for)
+
+    def _report(self, frame: FrameType, blocked_for: float) -> None:
+        route = find_route(frame)
+        LOOP_BLOCKS.labels(route or 'background').inc()
+        stack = ''.join(traceback.format_stack(frame, limit=self._stack_limit))
+        logger.warning(
+            'Event loop blocked for at least %.3fs in %s\n%s',
+            blocked_for,
+            route or 'background task',
+            stack,
+        )
@@ -0,0 +1,136 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+EXECUTOR_PENDING = Gauge(
+    'fitbox_executor_pending',
+    'Calls submitted to a bounded executor and not finished yet',
+    ['executor'],
+)
+EXECUTOR_QUEUE_WAIT = Histogram(
+    'fitbox_executor_queue_wait_seconds',
+    'Time a call waited for a free executor thread',
+    ['executor'],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+EXECUTOR_RUN_TIME = Histogram(
+    'fitbox_executor_run_seconds',
+    'Time a call spent running on an executor thread',
+    ['executor'],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+EXECUTOR_REJECTED = Counter(
+    'fitbox_executor_rejected_total',
+    'Calls refused because the executor queue was full',
+    ['executor'],
+)
+
+SENSOR_HITS = Counter(
+    'fitbox_sensor_hits_total',
+    'Hits received from sensors',
+    ['device'],
+)
+# device ids come from unauthenticated requests, so the label is bounded
+SENSOR_HITS_MAX_DEVICES = 256
+UNKNOWN_DEVICE = 'unknown'
+_hits_devices: set[str] = set()
+SENSOR_CHUNK_SIZE = Histogram(
+    'fitbox_sensor_chunk_hits',
+    'Hits per /sensors/hits/bulk chunk',
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000),
+)
+SENSOR_STATE_LOCK_WAIT = Histogram(
+    'fitbox_sensor_state_lock_wait_seconds',
+    'Time spent waiting for the SensorsState lock',
+    ['op'],
+    buckets=(0.00001, 0.0001, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5),
+)
+SENSOR_DEVICES = Gauge(
+    'fitbox_sensor_devices',
+    'Known sensor devices by state',
+    ['state'],
+)
+INGEST_ROW_LOCK_WAIT = Histogram(
+    'fitbox_ingest_row_lock_seconds',
+    'Time to select the sprint row FOR UPDATE in receive_hits',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+INGEST_COMMIT = Histogram(
+    'fitbox_ingest_commit_seconds',
+    'Commit latency in receive_hits',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+INGEST_RETRIES = Counter(
+    'fitbox_ingest_retries_total',
+    'receive_hits attempts retried after an IntegrityError',
+)
+INGEST_CONFLICTS = Counter(
+    'fitbox_ingest_conflicts_total',
+    'receive_hits requests answered with 409',
+)
+MQTT_MESSAGES = Counter(
+    'fitbox_mqtt_messages_total',
+    'MQTT messages received',
+    ['topic'],
+)
+MQTT_HANDLER_TIME = Histogram(
+    'fitbox_mqtt_handler_seconds',
+    'Time spent handling one MQTT message',
+    ['topic'],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5),
+)
+MQTT_HANDLER_ERRORS = Counter(
+    'fitbox_mqtt_handler_errors_total',
+    'MQTT messages whose handler raised',
+    ['topic'],
+)
+SPRINT_METRICS_TIME = Histogram(
+    'fitbox_sprint_metrics_seconds',
+    'Duration of calculate_sprint_metrics',
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1),
+)
+
+LOOP_LAG = Histogram(
+    'fitbox_event_loop_lag_seconds',
+    'How late the loop monitor heartbeat woke up',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+LOOP_BLOCKS = Counter(
+    'fitbox_event_loop_blocks_total',
+    'Times a single callback blocked the loop beyond the threshold',
+    ['route'],
+)
+
+REQUEST_DB_QUERIES = Histogram(
+    'fitbox_request_db_queries',
+    'SQL statements executed per HTTP request',
+    ['route'],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+REQUEST_DB_TIME = Histogram(
+    'fitbox_request_db_seconds',
+    'Time spent in SQL statements per HTTP request',
+    ['route'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+REQUEST_DB_ROWS = Histogram(
+    'fitbox_request_db_rows',
+    'Rows returned or affected by SQL statements per HTTP request',
+    ['route'],
+    buckets=(0, 1, 10, 100, 1_000, 10_000, 100_000),
+)
+REQUEST_QUERY_BUDGET_EXCEEDED = Counter(
+    'fitbox_request_query_budget_exceeded_total',
+    'Requests that executed more SQL statements than the budget',
+    ['route'],
+)
+
+
+def sensor_device_label(device_id: str, registered: bool) -> str:
+    """The SENSOR_HITS label of a device: its id if it registered or sent
+    a heartbeat, up to SENSOR_HITS_MAX_DEVICES ids, otherwise 'unknown'."""
+    if not registered:
+        return UNKNOWN_DEVICE
+    if device_id not in _hits_devices:
+        if len(_hits_devices) >= SENSOR_HITS_MAX_DEVICES:
+            return UNKNOWN_DEVICE
+        _hits_devices.add(device_id)
+    return device_id
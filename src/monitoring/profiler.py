@@ -0,0 +1,239 @@
+"""Sampling profiler for the live process.
+
+A background thread walks ``sys._current_frames()`` at a fixed interval
+and counts the stacks it sees, so nothing is traced and the profiled
+code runs at full speed between samples. Results are exported in the
+speedscope file format (https://www.speedscope.app).
+"""
+import asyncio
+import linecache
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from monitoring.loop_monitor import find_route
+from monitoring.query_stats import route_name
+
+MAX_STACK_DEPTH = 128
+
+FrameKey = tuple[str, str, int]
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+class SamplingProfiler:
+    def __init__(
+        self,
+        interval: float = 0.005,
+        *,
+        thread_ids: set[int] | None = None,
+        route: str | None = None,
+        requests: int | None = None,
+    ) -> None:
+        self.interval = interval
+        self.route = route
+        self.requests_left = requests
+        self._thread_ids = thread_ids
+        self._stacks: Counter[tuple[FrameKey, ...]] = Counter()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._done = asyncio.Event()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self.started_at = 0.0
+        self.finished_at = 0.0
+
+    @property
+    def samples(self) -> int:
+        return sum(self._stacks.values())
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(
+            target=self._run, name='sampling-profiler', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.finished_at = time.perf_counter()
+
+    async def wait(self, timeout: float) -> None:
+        """Until ``timeout`` passes or the requested number of requests
+        to ``route`` has finished."""
+        try:
+            await asyncio.wait_for(self._done.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def request_finished(self) -> None:
+        if self.requests_left is None:
+            return
+        self.requests_left -= 1
+        if self.requests_left <= 0:
+            self._done.set()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                if self._thread_ids and thread_id not in self._thread_ids:
+                    continue
+                if self.route and find_route(frame) != self.route:
+                    continue
+                self._stacks[self._stack(frame)] += 1
+
+    @staticmethod
+    def _stack(frame) -> tuple[FrameKey, ...]:
+        stack = []
+        while frame is not None and len(stack) < MAX_STACK_DEPTH:
+            code = frame.f_code
+            stack.append((code.co_filename, code.co_name, code.co_firstlineno))
+            frame = frame.f_back
+        stack.reverse()
+        return tuple(stack)
+
+    def to_speedscope(self, name: str) -> dict[str, Any]:
+        frames: list[dict[str, Any]] = []
+        index: dict[FrameKey, int] = {}
+        samples, weights = [], []
+        for stack, count in self._stacks.most_common():
+            sample = []
+            for key in stack:
+                if key not in index:
+                    filename, function, line = key
+                    index[key] = len(frames)
+                    frames.append(
+                        {'name': function, 'file': filename, 'line': line}
+                    )
+                sample.append(index[key])
+            samples.append(sample)
+            weights.append(round(count * self.interval, 6))
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': name,
+            'exporter': 'fitbox sampling profiler',
+            'shared': {'frames': frames},
+            'profiles': [
+                {
+                    'type': 'sampled',
+                    'name': name,
+                    'unit': 'seconds',
+                    'startValue': 0,
+                    'endValue': round(sum(weights), 6),
+                    'samples': samples,
+                    'weights': weights,
+                }
+            ],
+        }
+
+
+_active: SamplingProfiler | None = None
+_tracing = False
+
+
+async def run_profile(
+    seconds: float,
+    interval: float,
+    *,
+    thread_ids: set[int] | None = None,
+    route: str | None = None,
+    requests: int | None = None,
+) -> SamplingProfiler:
+    global _active
+    if _active is not None:
+        raise ProfilerBusy('A profile is already running')
+    profiler = SamplingProfiler(
+        interval, thread_ids=thread_ids, route=route, requests=requests
+    )
+    _active = profiler
+    profiler.start()
+    try:
+        await profiler.wait(seconds)
+    finally:
+        # stop() joins the sampler thread, keep that off the loop
+        await asyncio.to_thread(profiler.stop)
+        _active = None
+    return profiler
+
+
+class ProfileRouteMiddleware:
+    """Tells a route-scoped profile when a request to its route is done."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profiler = _active
+            if (
+                profiler is not None
+                and profiler.route is not None
+                and scope['type'] == 'http'
+                and route_name(scope) == profiler.route
+            ):
+                profiler.request_finished()
+
+
+async def tracemalloc_top(
+    seconds: float, limit: int, group_by: str = 'lineno'
+) -> dict[str, Any]:
+    """Top allocation sites. Tracing is switched on for ``seconds`` unless
+    it is already running, so only memory allocated in that window shows
+    up in the first case."""
+    global _tracing
+    if _tracing:
+        raise ProfilerBusy('A tracemalloc snapshot is already running')
+    _tracing = True
+    try:
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start(25)
+        try:
+            if not was_tracing:
+                await asyncio.sleep(seconds)
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            if not was_tracing:
+                tracemalloc.stop()
+    finally:
+        _tracing = False
+    snapshot = snapshot.filter_traces(
+        (
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        )
+    )
+    top = []
+    for stat in snapshot.statistics(group_by)[:limit]:
+        frame = stat.traceback[0]
+        top.append(
+            {
+                'file': frame.filename,
+                'line': frame.lineno,
+                'code': linecache.getline(frame.filename, frame.lineno).strip(),
+                'size_kb': round(stat.size / 1024, 1),
+                'count': stat.count,
+            }
+        )
+    return {
+        'window_seconds': 0 if was_tracing else seconds,
+        'traced_current_kb': round(current / 1024, 1),
+        'traced_peak_kb': round(peak / 1024, 1),
+        'top': top,
+    }
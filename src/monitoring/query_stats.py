@@ -0,0 +1,178 @@
+"""Per-request SQL accounting.
+
+Engine events add every statement to the QueryStats held in a context
+variable. SQLAlchemy runs the sync event handlers in a greenlet that
+shares the caller's context, so statements issued by an async session
+are attributed to the request that awaited them.
+"""
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from monitoring.metrics import (
+    REQUEST_DB_QUERIES,
+    REQUEST_DB_ROWS,
+    REQUEST_DB_TIME,
+    REQUEST_QUERY_BUDGET_EXCEEDED,
+)
+
+logger = logging.getLogger('control')
+
+_current_stats: ContextVar['QueryStats | None'] = ContextVar(
+    'query_stats', default=None
+)
+
+
+@dataclass
+class QueryStats:
+    queries: int = 0
+    rows: int = 0
+    db_time: float = 0.0
+    statements: Counter = field(default_factory=Counter)
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """Statements run at least ``threshold`` times: N+1 suspects."""
+        return [
+            (statement, count)
+            for statement, count in self.statements.most_common()
+            if count >= threshold
+        ]
+
+    def server_timing(self) -> str:
+        return (
+            f'db;dur={self.db_time * 1000:.1f};'
+            f'desc="{self.queries} queries, {self.rows} rows"'
+        )
+
+
+def _before_cursor_execute(
+    conn, cursor, statement, parameters, context, executemany
+):
+    if _current_stats.get() is not None:
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(
+    conn, cursor, statement, parameters, context, executemany
+):
+    stats = _current_stats.get()
+    if stats is None:
+        return
+    started = conn.info.get('query_started')
+    if started:
+        stats.db_time += time.perf_counter() - started.pop()
+    stats.queries += 1
+    stats.statements[statement] += 1
+    rowcount = getattr(cursor, 'rowcount', -1)
+    if rowcount and rowcount > 0:
+        stats.rows += rowcount
+
+
+def install_query_stats(engine: Engine) -> None:
+    """Hook the counters into a (sync) engine; pass ``engine.sync_engine``
+    for an AsyncEngine."""
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+@contextmanager
+def count_queries() -> Iterator[QueryStats]:
+    """Collect the statements run inside the block, e.g. to assert a
+    query budget in tests."""
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+@contextmanager
+def assert_max_queries(limit: int) -> Iterator[QueryStats]:
+    with count_queries() as stats:
+        yield stats
+    if stats.queries > limit:
+        statements = '\n'.join(
+            f'  {count} x {statement}'
+            for statement, count in stats.statements.most_common()
+        )
+        raise AssertionError(
+            f'{stats.queries} SQL statements ran, budget is {limit}:\n'
+            f'{statements}'
+        )
+
+
+def route_name(scope: Scope) -> str:
+    route = scope.get('route')
+    if route is not None and getattr(route, 'path', None):
+        return f'{scope.get("method")} {route.path}'
+    return 'unmatched'
+
+
+class QueryStatsMiddleware:
+    """Counts SQL per request, adds a Server-Timing header, feeds the
+    per-route histograms and warns about requests over ``budget`` queries
+    or with a statement repeated ``repeat_threshold`` times."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        budget: int = 20,
+        repeat_threshold: int = 5,
+    ) -> None:
+        self.app = app
+        self.budget = budget
+        self.repeat_threshold = repeat_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current_stats.set(stats)
+
+        async def _send(message: Message) -> None:
+            if message['type'] == 'http.response.start':
+                headers = MutableHeaders(scope=message)
+                headers.append('Server-Timing', stats.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            _current_stats.reset(token)
+            self._record(scope, stats)
+
+    def _record(self, scope: Scope, stats: QueryStats) -> None:
+        route = route_name(scope)
+        REQUEST_DB_QUERIES.labels(route).observe(stats.queries)
+        REQUEST_DB_TIME.labels(route).observe(stats.db_time)
+        REQUEST_DB_ROWS.labels(route).observe(stats.rows)
+        if stats.queries > self.budget:
+            REQUEST_QUERY_BUDGET_EXCEEDED.labels(route).inc()
+            logger.warning(
+                '%s ran %d SQL statements (budget %d), %.1f ms in the DB',
+                route,
+                stats.queries,
+                self.budget,
+                stats.db_time * 1000,
+            )
+        for statement, count in stats.repeated(self.repeat_threshold):
+            logger.warning(
+                'Possible N+1 in %s: statement ran %d times: %s',
+                route,
+                count,
+                ' '.join(statement.split())[:300],
+            )
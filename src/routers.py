@@ -6,11 +6,14 @@ from starlette import status
 from web.auth.login import router as login_router
 from web.auth.refresh import router as refresh_router
 from web.bookings.routers import router as bookings_router
+from web.jobs.routers import router as jobs_router
 from web.records.routers import router as records_router
+from web.rollups.routers import router as rollups_router
 from web.sensors.routers import router as sensors_router
 from web.slots.routers import router as slots_router
 from web.transactions.routers import router as transactions_router
 from web.users.routers import router as users_router
+from web.waitlist.routers import router as waitlist_router
 from web.users.schemas import UserCreate, UserRead
 from web.users.users import fastapi_users
 
@@ -63,5 +66,8 @@ api_v1_router.include_router(bookings_router)
 api_v1_router.include_router(records_router)
 api_v1_router.include_router(transactions_router)
 api_v1_router.include_router(sensors_router)
+api_v1_router.include_router(jobs_router)
+api_v1_router.include_router(rollups_router)
+api_v1_router.include_router(waitlist_router)
 api_v1_router.include_router(login_router)
 api_v1_router.include_router(refresh_router)
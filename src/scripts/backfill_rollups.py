@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+
+from sqlalchemy import select
+
+from database.models import SprintRollups, Sprints
+from web.common.services import get_async_session_context
+from web.rollups.services import save_sprint_rollups
+
+
+async def main(args: argparse.Namespace) -> None:
+    async with get_async_session_context() as session:
+        query = select(Sprints.slot_id).where(Sprints.result.isnot(None))
+        if not args.all:
+            query = query.where(
+                ~select(SprintRollups.id)
+                .where(
+                    SprintRollups.slot_id == Sprints.slot_id,
+                    SprintRollups.sprint_id == Sprints.sprint_id,
+                    SprintRollups.sensor_id == Sprints.sensor_id,
+                )
+                .exists()
+            )
+        slot_ids = (await session.scalars(query.distinct())).all()
+
+    total = 0
+    for slot_id in sorted(slot_ids):
+        async with get_async_session_context() as session:
+            sprints = (
+                await session.scalars(
+                    select(Sprints).where(
+                        Sprints.slot_id == slot_id,
+                        Sprints.result.isnot(None),
+                    )
+                )
+            ).all()
+            await save_sprint_rollups(session, sprints)
+            await session.commit()
+        total += len(sprints)
+        print(f'slot {slot_id}: {len(sprints)} sprints')
+    print(f'{total} sprint rollups written for {len(slot_ids)} slots')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Write sprint rollups for sprints finalized before they existed.'
+    )
+    parser.add_argument(
+        '--all',
+        action='store_true',
+        help='Rebuild every rollup, not only the missing ones',
+    )
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+import json
+
+from sqlalchemy import Text, bindparam, literal, select, update
+
+from core.hits_codec import encode_hits
+from database.models import Sprints
+from web.common.services import get_async_session_context
+
+
+def _encode_legacy(hits: list) -> bytes | None:
+    try:
+        times = [int(h['timeMs']) for h in hits]
+        forces = [float(h['maxAccel']) for h in hits]
+    except (KeyError, TypeError, ValueError):
+        return None
+    return encode_hits(times, forces)
+
+
+async def main(args: argparse.Namespace) -> None:
+    last_id = 0
+    converted = skipped = json_bytes = blob_bytes = 0
+    while True:
+        async with get_async_session_context() as session:
+            rows = (
+                await session.execute(
+                    select(Sprints.id, Sprints.data['hits'].label('hits'))
+                    .where(
+                        Sprints.id > last_id,
+                        Sprints.hits_blob.is_(None),
+                        Sprints.data.has_key('hits'),
+                    )
+                    .order_by(Sprints.id.asc())
+                    .limit(args.batch)
+                )
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            params = []
+            for row in rows:
+                blob = _encode_legacy(row.hits or [])
+                if blob is None:
+                    skipped += 1
+                    print(f'sprint {row.id}: hits not in the expected shape, kept')
+                    continue
+                json_bytes += len(json.dumps(row.hits))
+                blob_bytes += len(blob)
+                params.append({'sprint_pk': row.id, 'blob': blob})
+
+            if params and not args.dry_run:
+                sprints = Sprints.__table__
+                await session.execute(
+                    update(sprints)
+                    .where(sprints.c.id == bindparam('sprint_pk'))
+                    .values(
+                        hits_blob=bindparam('blob'),
+                        data=sprints.c.data.op('-')(literal('hits', Text)),
+                    ),
+                    params,
+                )
+                await session.commit()
+            converted += len(params)
+            print(f'up to sprint {last_id}: {converted} converted')
+
+    print(
+        f'{"would convert" if args.dry_run else "converted"} {converted} '
+        f'sprints, {skipped} skipped, hits {json_bytes / 1024 / 1024:.1f} MiB '
+        f'as JSON -> {blob_bytes / 1024 / 1024:.1f} MiB encoded'
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Move raw hits from sprints.data JSONB into hits_blob.'
+    )
+    parser.add_argument('--batch', type=int, default=200)
+    parser.add_argument('--dry-run', action='store_true')
+    asyncio.run(main(parser.parse_args()))
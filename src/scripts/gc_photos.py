@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+import argparse
+import asyncio
+import os
+import time
+
+from settings import PHOTO_DIR
+from web.common.services import get_async_session_context
+from web.users.photos import find_orphaned_photos, get_referenced_photos
+
+
+async def main(args: argparse.Namespace) -> None:
+    async with get_async_session_context() as session:
+        referenced = await get_referenced_photos(session)
+    orphans = find_orphaned_photos(
+        referenced, PHOTO_DIR, time.time() - args.grace_minutes * 60
+    )
+    freed = 0
+    for name in orphans:
+        path = os.path.join(PHOTO_DIR, name)
+        try:
+            size = os.path.getsize(path)
+            if not args.dry_run:
+                os.remove(path)
+        except FileNotFoundError:
+            continue
+        freed += size
+        print(f'{"would delete" if args.dry_run else "deleted"} {name}')
+    print(
+        f'{len(orphans)} orphaned files, {freed / 1024 / 1024:.1f} MiB, '
+        f'{len(referenced)} referenced'
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Delete photo files no User.photo_url refers to.'
+    )
+    parser.add_argument('--dry-run', action='store_true')
+    parser.add_argument(
+        '--grace-minutes',
+        type=int,
+        default=60,
+        help='Keep files modified more recently than this',
+    )
+    asyncio.run(main(parser.parse_args()))
@@ -40,7 +40,13 @@ SUPERUSER_EMAILS_LIST = [SUPERUSER_EMAIL, SUPERUSER_EMAIL_2]
 SECRET_KEY = os.getenv('SECRET_KEY')
 
 LOG_HANDLERS = ['console', 'file']
-LOG_LEVEL = os.getenv('LOG_LEVEL', default='DEBUG')
+LOG_LEVEL = os.getenv('LOG_LEVEL', default='INFO')
+# 'json' for Loki, 'text' for reading logs by eye
+LOG_FORMAT = os.getenv('LOG_FORMAT', default='json')
+# records per second let through from the per-chunk ingest and MQTT ping
+# loggers; warnings and errors are never dropped
+LOG_INGEST_RATE = float(os.getenv('LOG_INGEST_RATE', default=5))
+LOG_MQTT_RATE = float(os.getenv('LOG_MQTT_RATE', default=2))
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -52,18 +58,31 @@ LOGGING = {
             ),
             'datefmt': '%d/%b/%Y:%H:%M:%S %z',
         },
+        'json': {
+            '()': 'core.log_pipeline.JsonFormatter',
+        },
+    },
+    'filters': {
+        'ingest_rate': {
+            '()': 'core.log_pipeline.RateLimitFilter',
+            'rate': LOG_INGEST_RATE,
+        },
+        'mqtt_rate': {
+            '()': 'core.log_pipeline.RateLimitFilter',
+            'rate': LOG_MQTT_RATE,
+        },
     },
     'handlers': {
         'console': {
             'level': LOG_LEVEL,
             'class': 'logging.StreamHandler',
             'stream': 'ext://sys.stdout',
-            'formatter': 'default',
+            'formatter': 'json' if LOG_FORMAT == 'json' else 'default',
         },
         'file': {
             'level': LOG_LEVEL,
             'class': 'logging.handlers.RotatingFileHandler',
-            'formatter': 'default',
+            'formatter': 'json' if LOG_FORMAT == 'json' else 'default',
             'filename': os.path.join(BASE_DIR, 'logs', 'app.log'),
             'maxBytes': 1024 * 1024 * 5,  # 5 MB
             'backupCount': 1,
@@ -76,6 +95,12 @@ LOGGING = {
             'handlers': LOG_HANDLERS,
             'propagate': False,
         },
+        'control.ingest': {
+            'filters': ['ingest_rate'],
+        },
+        'control.mqtt': {
+            'filters': ['mqtt_rate'],
+        },
     },
 }
 
@@ -92,3 +117,36 @@ CLEAN_PERIOD = 10
 IP_MISMATCH_POLICY = 'quarantine'
 
 REDIS_URL = os.getenv('REDIS_URL', default='redis://localhost:6379/0')
+
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', default=2))
+
+# weeks of GET /slots/schedule start on Monday in this zone
+SCHEDULE_TIMEZONE = os.getenv('SCHEDULE_TIMEZONE', default='UTC')
+
+# seconds an authenticated user's principal is served from memory
+AUTH_CACHE_TTL = float(os.getenv('AUTH_CACHE_TTL', default=30))
+
+# password hashing runs on its own thread pool; logins beyond
+# PASSWORD_HASH_MAX_PENDING queued hashes get a 503
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', default=2))
+PASSWORD_HASH_MAX_PENDING = int(
+    os.getenv('PASSWORD_HASH_MAX_PENDING', default=32)
+)
+
+PHOTO_WORKERS = int(os.getenv('PHOTO_WORKERS', default=2))
+PHOTO_MAX_PENDING = int(os.getenv('PHOTO_MAX_PENDING', default=8))
+
+LOOP_MONITOR_ENABLED = os.getenv('LOOP_MONITOR_ENABLED', default='1') == '1'
+LOOP_MONITOR_INTERVAL = float(os.getenv('LOOP_MONITOR_INTERVAL', default=0.1))
+LOOP_BLOCK_THRESHOLD = float(os.getenv('LOOP_BLOCK_THRESHOLD', default=0.25))
+
+# SQL statements per request above which a warning is logged
+QUERY_BUDGET = int(os.getenv('QUERY_BUDGET', default=20))
+QUERY_REPEAT_THRESHOLD = int(os.getenv('QUERY_REPEAT_THRESHOLD', default=5))
+
+# raw hits of done slots older than this move to sprint_hits_archive;
+# the archiver job is submitted every HITS_ARCHIVE_PERIOD seconds
+HITS_ARCHIVE_AFTER_DAYS = int(os.getenv('HITS_ARCHIVE_AFTER_DAYS', default=30))
+HITS_ARCHIVE_PERIOD = int(os.getenv('HITS_ARCHIVE_PERIOD', default=6 * 60 * 60))
+# archived hit blobs kept in memory (LRU) after being read back
+HITS_ARCHIVE_CACHE_SIZE = int(os.getenv('HITS_ARCHIVE_CACHE_SIZE', default=256))
@@ -1,8 +1,12 @@
 from __future__ import annotations
+from contextlib import asynccontextmanager
 from dataclasses import dataclass, field
 from datetime import datetime, timezone, timedelta
 import asyncio
-from typing import Optional, Literal
+import time
+from typing import AsyncIterator, Optional, Literal
+
+from monitoring.metrics import SENSOR_DEVICES, SENSOR_STATE_LOCK_WAIT
 
 
 IpMismatchPolicy = Literal['quarantine', 'update', 'drop']
@@ -28,9 +32,35 @@ class SensorsState:
         self._lock = asyncio.Lock()
         self._ip_mismatch_policy = ip_mismatch_policy
 
+    @asynccontextmanager
+    async def _locked(
+        self, op: str, publish: bool = True
+    ) -> AsyncIterator[None]:
+        started = time.perf_counter()
+        async with self._lock:
+            SENSOR_STATE_LOCK_WAIT.labels(op).observe(
+                time.perf_counter() - started
+            )
+            try:
+                yield
+            finally:
+                if publish:
+                    self._publish_device_counts()
+
+    def _publish_device_counts(self) -> None:
+        quarantined = sum(1 for d in self._devices.values() if d.ip_mismatch)
+        active = sum(
+            1 for d in self._devices.values() if d.active and not d.ip_mismatch
+        )
+        SENSOR_DEVICES.labels('active').set(active)
+        SENSOR_DEVICES.labels('quarantined').set(quarantined)
+        SENSOR_DEVICES.labels('inactive').set(
+            len(self._devices) - active - quarantined
+        )
+
     async def upsert(self, device_id: str, ip: str) -> None:
         now = datetime.now(timezone.utc)
-        async with self._lock:
+        async with self._locked('upsert'):
             self._devices[device_id] = DeviceInfo(
                 ip=ip,
                 last_seen=now,
@@ -41,7 +71,7 @@ class SensorsState:
 
     async def touch(self, device_id: str, ip: Optional[str] = None) -> None:
         now = datetime.now(timezone.utc)
-        async with self._lock:
+        async with self._locked('touch'):
             info = self._devices.get(device_id)
             if info is None:
                 self._devices[device_id] = DeviceInfo(
@@ -68,9 +98,19 @@ class SensorsState:
             if not info.ip_mismatch:
                 info.active = True
 
+    def is_registered(self, device_id: str) -> bool:
+        """Registered or heard over MQTT with its ip, and not quarantined;
+        hits alone add a device with an unknown ip."""
+        info = self._devices.get(device_id)
+        return (
+            info is not None
+            and info.ip != 'unknown'
+            and not info.ip_mismatch
+        )
+
     async def update_on_hit(self, device_id: str) -> None:
         now = datetime.now(timezone.utc)
-        async with self._lock:
+        async with self._locked('update_on_hit'):
             info = self._devices.get(device_id)
             if info is None:
                 self._devices[device_id] = DeviceInfo(
@@ -82,14 +122,14 @@ class SensorsState:
                     info.active = True
 
     async def snapshot(self) -> dict[str, DeviceInfo]:
-        async with self._lock:
+        async with self._locked('snapshot', publish=False):
             return dict(self._devices)
 
     async def maintain(
         self, inactive_after: timedelta, delete_after: timedelta
     ) -> None:
         now = datetime.now(timezone.utc)
-        async with self._lock:
+        async with self._locked('maintain'):
             to_delete = []
             for did, info in self._devices.items():
                 age = now - info.last_seen
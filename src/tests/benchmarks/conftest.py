@@ -0,0 +1,132 @@
+import gc
+import json
+import statistics
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+
+import pytest
+
+MIN_ROUNDS = 3
+MAX_ROUNDS = 1000
+TARGET_SECONDS = 0.3
+
+
+@dataclass
+class BenchResult:
+    name: str
+    items: int
+    rounds: int
+    min_ns: int
+    median_ns: int
+    ns_per_item: float
+    peak_alloc_bytes: int
+    retained_bytes: int
+
+
+_results: list[BenchResult] = []
+
+
+class Bench:
+    """pytest-benchmark style runner: calibrates rounds, times with GC off
+    and measures peak and retained allocations of one extra run under
+    tracemalloc (the returned value counts as retained)."""
+
+    def __init__(self, name: str) -> None:
+        self._name = name
+
+    def __call__(self, fn, *args, items: int, **kwargs):
+        result = fn(*args, **kwargs)
+
+        started = time.perf_counter()
+        fn(*args, **kwargs)
+        once = max(time.perf_counter() - started, 1e-9)
+        rounds = int(min(MAX_ROUNDS, max(MIN_ROUNDS, TARGET_SECONDS / once)))
+
+        timings = []
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for _ in range(rounds):
+                t0 = time.perf_counter_ns()
+                fn(*args, **kwargs)
+                timings.append(time.perf_counter_ns() - t0)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+        tracemalloc.start()
+        try:
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            kept = fn(*args, **kwargs)
+            after, peak = tracemalloc.get_traced_memory()
+            del kept
+        finally:
+            tracemalloc.stop()
+
+        median = int(statistics.median(timings))
+        _results.append(
+            BenchResult(
+                name=self._name,
+                items=items,
+                rounds=rounds,
+                min_ns=min(timings),
+                median_ns=median,
+                ns_per_item=round(median / max(items, 1), 2),
+                peak_alloc_bytes=peak - before,
+                retained_bytes=after - before,
+            )
+        )
+        return result
+
+
+@pytest.fixture
+def bench(request):
+    return Bench(request.node.name)
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption('--bench'):
+        return
+    skip = pytest.mark.skip(reason='micro-benchmarks need --bench')
+    for item in items:
+        if 'benchmark' in item.keywords:
+            item.add_marker(skip)
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    if not _results:
+        return
+    baseline = {}
+    compare_path = config.getoption('--bench-compare')
+    if compare_path:
+        with open(compare_path, encoding='utf-8') as f:
+            baseline = {r['name']: r for r in json.load(f)['results']}
+
+    tr = terminalreporter
+    tr.section('micro-benchmarks')
+    tr.write_line(
+        f'{"name":<58} {"items":>7} {"median µs":>11} {"ns/item":>9} '
+        f'{"peak KiB":>9} {"kept KiB":>9} {"vs base":>8}'
+    )
+    for r in _results:
+        base = baseline.get(r.name)
+        ratio = (
+            f'{r.median_ns / base["median_ns"]:.2f}x'
+            if base and base['median_ns']
+            else '-'
+        )
+        tr.write_line(
+            f'{r.name:<58} {r.items:>7} {r.median_ns / 1000:>11.1f} '
+            f'{r.ns_per_item:>9.1f} {r.peak_alloc_bytes / 1024:>9.1f} '
+            f'{r.retained_bytes / 1024:>9.1f} {ratio:>8}'
+        )
+
+    json_path = config.getoption('--bench-json')
+    if json_path:
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(
+                {'results': [asdict(r) for r in _results]}, f, indent=2
+            )
+        tr.write_line(f'benchmark results written to {json_path}')
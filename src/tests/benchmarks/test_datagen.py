@@ -0,0 +1,37 @@
+import random
+
+from benchmarks.datagen import build_dataset, chunked, make_hits
+
+
+def test_build_dataset_is_reproducible():
+    a = build_dataset(seed=7, users=30, slots=3, sensors=10,
+                      sprints_per_slot=2, hits_per_sprint=50)
+    b = build_dataset(seed=7, users=30, slots=3, sensors=10,
+                      sprints_per_slot=2, hits_per_sprint=50)
+    assert [u.id for u in a.users] == [u.id for u in b.users]
+    assert [s.bindings for s in a.slots] == [s.bindings for s in b.slots]
+    for slot in a.slots:
+        assert len(slot.bindings) == 10
+        assert len(set(slot.bindings.values())) == 10
+
+
+def test_make_hits_shape_and_order():
+    hits = make_hits(random.Random(1), 200, blink_interval=500)
+    assert len(hits) == 200
+    assert set(hits[0]) == {'timeMs', 'maxAccel'}
+    times = [h['timeMs'] for h in hits]
+    assert times == sorted(times)
+    assert make_hits(random.Random(1), 200, 500) == hits
+
+
+def test_make_hits_resamples_recorded_sprint():
+    sample = [{'timeMs': i * 480, 'maxAccel': 20.0 + i} for i in range(5)]
+    hits = make_hits(random.Random(3), 50, sample=sample)
+    assert {h['maxAccel'] for h in hits} <= {h['maxAccel'] for h in sample}
+
+
+def test_chunked_keeps_every_hit():
+    hits = make_hits(random.Random(2), 123)
+    chunks = chunked(hits, 50)
+    assert [len(c) for c in chunks] == [50, 50, 23]
+    assert chunked([], 50) == [[]]
@@ -0,0 +1,78 @@
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from benchmarks.datagen import make_hits
+from constants import DEFAULT_BLINK_INTERVAL, PERCENTILE_LEVEL, TRIM_PERCENT
+from web.bookings.services import calculate_booking_metrics
+from web.sensors.services import (
+    _percentile,
+    _trimmed,
+    calculate_sprint_metrics,
+    get_forces_and_times,
+    is_synced_hit,
+)
+
+pytestmark = pytest.mark.benchmark
+
+SIZES = [50, 500, 5_000, 50_000, 100_000]
+
+
+@pytest.fixture(scope='module', params=SIZES, ids=lambda n: f'{n}')
+def hits(request):
+    return make_hits(random.Random(request.param), request.param)
+
+
+def test_calculate_sprint_metrics(bench, hits):
+    result = bench(
+        calculate_sprint_metrics,
+        hits,
+        float(DEFAULT_BLINK_INTERVAL),
+        len(hits),
+        items=len(hits),
+    )
+    assert set(result) >= {'tempo', 'power', 'energy'}
+
+
+def test_trimmed(bench, hits):
+    forces, _ = get_forces_and_times(hits)
+    trimmed = bench(_trimmed, forces, TRIM_PERCENT, items=len(forces))
+    assert len(trimmed) <= len(forces)
+
+
+def test_percentile(bench, hits):
+    forces, _ = get_forces_and_times(hits)
+    sorted_forces = sorted(forces)
+    value = bench(
+        _percentile, sorted_forces, PERCENTILE_LEVEL, items=len(forces)
+    )
+    assert sorted_forces[0] <= value <= sorted_forces[-1]
+
+
+def test_is_synced_hit(bench, hits):
+    times = [h['timeMs'] for h in hits]
+
+    def _all_synced():
+        return sum(
+            1 for t in times if is_synced_hit(t, float(DEFAULT_BLINK_INTERVAL))
+        )
+
+    synced = bench(_all_synced, items=len(times))
+    assert 0 <= synced <= len(times)
+
+
+@pytest.mark.parametrize('sprints', SIZES, ids=lambda n: f'{n}')
+def test_calculate_booking_metrics(bench, sprints):
+    rng = random.Random(sprints)
+    sprints_data = {
+        str(i): {
+            'power': rng.uniform(50, 150),
+            'energy': rng.uniform(40, 100),
+            'tempo': rng.uniform(30, 100),
+        }
+        for i in range(sprints)
+    }
+    booking = SimpleNamespace(power=None, energy=None, tempo=None)
+    bench(calculate_booking_metrics, booking, sprints_data, items=sprints)
+    assert booking.energy is not None
@@ -0,0 +1,197 @@
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from dependencies import get_cache, get_db_session
+from web.bookings.services import (
+    BOOKING_CREATED,
+    BOOKING_DUPLICATE,
+    BOOKING_FULL,
+    BOOKING_SLOT_NOT_FOUND,
+    BOOKING_SUPERUSER,
+    BOOKING_USER_NOT_FOUND,
+    BulkBookingError,
+    DuplicateBookingError,
+    ExcessiveBookingError,
+    NotFoundSlotError,
+    check_before_create,
+    create_bulk_bookings,
+    release_places,
+    release_user_places,
+)
+from web.slots.schemas import BindInput
+from web.slots.services import check_complete_bindings
+from web.users.users import current_user
+
+
+@pytest.mark.asyncio
+async def test_bulk_bookings_fill_slots_in_order(rows, scripted_session):
+    ann, bob, eve, admin, ghost = (uuid.uuid4() for _ in range(5))
+    slots = rows([
+        SimpleNamespace(id=1, number_of_places=3, booked_count=1),
+        SimpleNamespace(id=2, number_of_places=1, booked_count=0),
+    ])
+    booked = rows([SimpleNamespace(slot_id=1, user_ids=[ann])])
+    users = rows([
+        SimpleNamespace(id=ann, is_superuser=False),
+        SimpleNamespace(id=bob, is_superuser=False),
+        SimpleNamespace(id=eve, is_superuser=False),
+        SimpleNamespace(id=admin, is_superuser=True),
+    ])
+    inserted = rows([
+        SimpleNamespace(id=10, user_id=bob, slot_id=1),
+        SimpleNamespace(id=12, user_id=ann, slot_id=2),
+    ])
+    session = scripted_session([slots, booked, users, inserted])
+
+    outcomes = await create_bulk_bookings(
+        session,
+        [1, 2, 3, 1],
+        [ann, bob, eve, admin, ghost],
+        datetime.now(timezone.utc),
+    )
+
+    status = {(o['user_id'], o['slot_id']): o['status'] for o in outcomes}
+    assert len(outcomes) == 15
+    assert status[(ann, 1)] == BOOKING_DUPLICATE
+    assert status[(bob, 1)] == BOOKING_CREATED
+    # eve was planned in slot 1 but the insert skipped her: booked meanwhile
+    assert status[(eve, 1)] == BOOKING_DUPLICATE
+    assert status[(admin, 1)] == BOOKING_SUPERUSER
+    assert status[(ghost, 1)] == BOOKING_USER_NOT_FOUND
+    assert status[(ann, 2)] == BOOKING_CREATED
+    assert status[(bob, 2)] == BOOKING_FULL
+    assert status[(eve, 2)] == BOOKING_FULL
+    assert all(status[(u, 3)] == BOOKING_SLOT_NOT_FOUND for u in (ann, bob))
+    booking_ids = {o['booking_id'] for o in outcomes if o['booking_id']}
+    assert booking_ids == {10, 12}
+
+    assert session.locking('slots')
+    # bob and eve planned in slot 1, ann in slot 2
+    [insert] = session.writes('bookings')
+    assert len(insert._multi_values[0]) == 3
+    assert len(session.writes('slots')) == 1
+
+
+@pytest.mark.asyncio
+async def test_bulk_bookings_skip_insert_when_nothing_to_book(
+    rows, scripted_session
+):
+    user = uuid.uuid4()
+    slots = rows([
+        SimpleNamespace(id=1, number_of_places=1, booked_count=1),
+    ])
+    users = rows([SimpleNamespace(id=user, is_superuser=False)])
+    session = scripted_session([slots, rows(), users])
+
+    outcomes = await create_bulk_bookings(
+        session, [1], [user], datetime.now(timezone.utc)
+    )
+
+    assert [o['status'] for o in outcomes] == [BOOKING_FULL]
+    assert session.writes('bookings') == []
+    assert session.writes('slots') == []
+
+
+@pytest.mark.asyncio
+async def test_bulk_bookings_limit(scripted_session):
+    with pytest.raises(BulkBookingError):
+        await create_bulk_bookings(
+            scripted_session(),
+            range(100),
+            [uuid.uuid4() for _ in range(11)],
+            datetime.now(timezone.utc),
+        )
+
+
+@pytest.mark.asyncio
+async def test_check_before_create_reserves_the_place(scripted_session):
+    user = SimpleNamespace(id=uuid.uuid4())
+    session = scripted_session(scalars=[None, 1])
+    await check_before_create(1, user, session)
+    [reserve] = session.writes('slots')
+    assert reserve.is_update
+    guard = reserve.whereclause.compile()
+    assert str(guard) == (
+        'slots.id = :id_1 AND '
+        'slots.booked_count + :booked_count_1 <= slots.number_of_places'
+    )
+    assert guard.params == {'id_1': 1, 'booked_count_1': 1}
+
+    # the slot exists but the conditional update matched nothing
+    with pytest.raises(ExcessiveBookingError):
+        await check_before_create(
+            1, user, scripted_session(scalars=[None, None, 1])
+        )
+    with pytest.raises(NotFoundSlotError):
+        await check_before_create(1, user, scripted_session())
+    session = scripted_session(scalars=[5])
+    with pytest.raises(DuplicateBookingError):
+        await check_before_create(1, user, session)
+    assert session.writes('slots') == []
+
+
+@pytest.mark.asyncio
+async def test_release_places_floors_at_zero(scripted_session):
+    session = scripted_session()
+    await release_places(session, 1, 2)
+    [release] = session.writes('slots')
+    [count] = release._values.values()
+    assert str(count) == (
+        'greatest(slots.booked_count - :booked_count_1, :greatest_1)'
+    )
+    assert count.compile().params == {'booked_count_1': 2, 'greatest_1': 0}
+
+
+@pytest.mark.asyncio
+async def test_deleting_a_booking_releases_its_place_first(
+    app, client, scripted_session
+):
+    booking = SimpleNamespace(id=7, slot_id=1, user_id=uuid.uuid4())
+
+    class Session(scripted_session):
+        async def delete(self, obj):
+            self.deleted = (obj, len(self.executed))
+
+    session = Session(scalars=[booking])
+    app.dependency_overrides[get_db_session] = lambda: session
+    app.dependency_overrides[get_cache] = lambda: None
+    app.dependency_overrides[current_user] = (
+        lambda: SimpleNamespace(id=uuid.uuid4(), is_superuser=True)
+    )
+
+    response = await client.delete('/bookings/7')
+
+    assert response.status_code == 204
+    [release] = session.writes('slots')
+    deleted, executed_before = session.deleted
+    assert deleted is booking
+    assert session.executed.index(release) < executed_before
+
+
+@pytest.mark.asyncio
+async def test_release_user_places(scripted_session):
+    session = scripted_session()
+    await release_user_places(session, uuid.uuid4())
+    [release] = session.writes('slots')
+    assert release.is_update
+
+
+@pytest.mark.asyncio
+async def test_bindings_are_applied_with_one_update(rows, scripted_session):
+    users = [uuid.uuid4() for _ in range(3)]
+    bind_input = BindInput(
+        slot_id=7,
+        bindings=[
+            {'user_id': user, 'sensor_id': f'BAG0{i}'}
+            for i, user in enumerate(users)
+        ],
+    )
+    session = scripted_session([rows(rowcount=2)], scalars=[7])
+
+    result = await check_complete_bindings(bind_input, session)
+
+    assert result == {'accepted_bindings': 3, 'possible_bindings': 2}
+    assert len(session.writes('bookings')) == 1
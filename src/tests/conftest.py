@@ -41,6 +41,76 @@ class FakeDBSession:
         pass
 
 
+class Rows(list):
+    """A canned statement result with the accessors services use."""
+
+    def __init__(self, rows=(), rowcount=None):
+        super().__init__(rows)
+        self.rowcount = len(self) if rowcount is None else rowcount
+
+    def all(self):
+        return list(self)
+
+    def first(self):
+        return self[0] if self else None
+
+    def one(self):
+        [row] = self
+        return row
+
+    def one_or_none(self):
+        return self[0] if self else None
+
+
+class ScriptedSession(FakeDBSession):
+    """Answers ``execute``/``scalars`` from ``results`` and ``scalar``
+    from ``scalars``, each either a list used in call order or a function
+    of the statement. Every statement is kept in ``executed``."""
+
+    def __init__(self, results=(), scalars=()):
+        super().__init__()
+        self.executed = []
+        self._results = results if callable(results) else list(results)
+        self._scalars = scalars if callable(scalars) else list(scalars)
+        self.rollbacks = 0
+
+    @staticmethod
+    def _answer(source, statement, empty):
+        if callable(source):
+            return source(statement)
+        return source.pop(0) if source else empty
+
+    async def execute(self, statement, *args, **kwargs):
+        self.executed.append(statement)
+        return self._answer(self._results, statement, Rows())
+
+    async def scalars(self, statement, *args, **kwargs):
+        self.executed.append(statement)
+        return self._answer(self._results, statement, Rows())
+
+    async def scalar(self, statement, *args, **kwargs):
+        self.executed.append(statement)
+        return self._answer(self._scalars, statement, None)
+
+    async def rollback(self):
+        self.rollbacks += 1
+
+    def writes(self, table: str) -> list:
+        """INSERT, UPDATE and DELETE statements on ``table``."""
+        return [
+            s for s in self.executed
+            if s.is_dml and s.table.name == table
+        ]
+
+    def locking(self, table: str) -> list:
+        """SELECT ... FOR UPDATE statements reading ``table``."""
+        return [
+            s for s in self.executed
+            if getattr(s, '_for_update_arg', None) is not None
+            and table in {t.name for t in s.get_final_froms()}
+        ]
+
+
 @pytest.fixture(scope='session')
 def event_loop():
     loop = asyncio.new_event_loop()
@@ -48,6 +118,16 @@ def event_loop():
     loop.close()
 
 
+@pytest.fixture
+def rows():
+    return Rows
+
+
+@pytest.fixture
+def scripted_session():
+    return ScriptedSession
+
+
 @pytest.fixture
 def app():
     app = create_app()
@@ -69,3 +149,23 @@ async def client(app):
         transport=transport, base_url='http://test/api/v1'
     ) as ac:
         yield ac
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('benchmarks')
+    group.addoption(
+        '--bench',
+        action='store_true',
+        default=False,
+        help='run the micro-benchmarks in tests/benchmarks',
+    )
+    group.addoption(
+        '--bench-json',
+        default=None,
+        help='write micro-benchmark results to this JSON file',
+    )
+    group.addoption(
+        '--bench-compare',
+        default=None,
+        help='JSON from a previous --bench-json run to compare against',
+    )
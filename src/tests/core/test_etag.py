@@ -0,0 +1,52 @@
+import pytest
+from fastapi import Depends
+
+from core.etag import conditional_get, etag_matches, make_etag
+
+
+def test_weak_comparison():
+    etag = make_etag((1, 'a'))
+    assert etag.startswith('W/"')
+    assert etag == make_etag((1, 'a'))
+    assert etag != make_etag((2, 'a'))
+    assert etag_matches(etag, etag)
+    assert etag_matches(etag.removeprefix('W/'), etag)
+    assert etag_matches(f'"other", {etag}', etag)
+    assert etag_matches('*', etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches('"other"', etag)
+
+
+@pytest.mark.asyncio
+async def test_unchanged_version_is_answered_with_304(app, client):
+    state = {'version': 1, 'calls': 0}
+
+    async def version():
+        return state['version']
+
+    async def handler():
+        state['calls'] += 1
+        return {'ok': True}
+
+    app.add_api_route(
+        '/api/v1/etag-test',
+        handler,
+        dependencies=[Depends(conditional_get(version, 'private, max-age=5'))],
+    )
+
+    first = await client.get('/etag-test')
+    etag = first.headers['etag']
+    assert first.status_code == 200
+    assert first.headers['cache-control'] == 'private, max-age=5'
+
+    again = await client.get('/etag-test', headers={'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.content == b''
+    assert again.headers['etag'] == etag
+    assert state['calls'] == 1
+
+    state['version'] = 2
+    changed = await client.get('/etag-test', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['etag'] != etag
+    assert state['calls'] == 2
@@ -0,0 +1,91 @@
+import asyncio
+import threading
+
+import pytest
+
+from core.executor import BoundedExecutor, ExecutorOverloaded
+
+
+@pytest.mark.asyncio
+async def test_runs_off_the_event_loop():
+    executor = BoundedExecutor('test-run', max_workers=1, max_pending=4)
+    try:
+        name = await executor.run(lambda: threading.current_thread().name)
+    finally:
+        executor.shutdown()
+    assert name.startswith('test-run')
+    assert executor.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_rejects_when_queue_is_full():
+    executor = BoundedExecutor(
+        'test-full', max_workers=1, max_pending=2, retry_after=3
+    )
+    release = threading.Event()
+    try:
+        busy = [
+            asyncio.ensure_future(executor.run(release.wait, 5))
+            for _ in range(2)
+        ]
+        await asyncio.sleep(0)
+        with pytest.raises(ExecutorOverloaded) as exc_info:
+            await executor.run(lambda: None)
+        assert exc_info.value.retry_after == 3
+        release.set()
+        assert await asyncio.gather(*busy) == [True, True]
+    finally:
+        executor.shutdown()
+
+
+@pytest.fixture
+def full_password_hashing(app, monkeypatch):
+    from web.users import users
+
+    class NoUsers:
+        async def get_by_email(self, email):
+            return None
+
+    executor = BoundedExecutor(
+        'test-hash', max_workers=1, max_pending=1, retry_after=7
+    )
+    release = threading.Event()
+    monkeypatch.setattr(users, 'password_hashing', executor)
+    app.dependency_overrides[users.get_user_manager] = (
+        lambda: users.UserManager(NoUsers())
+    )
+    busy = asyncio.ensure_future(executor.run(release.wait, 5))
+    yield
+    release.set()
+    executor.shutdown()
+    busy.cancel()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    'path, kwargs',
+    [
+        (
+            '/auth/jwt/login',
+            {'data': {'username': 'a@b.c', 'password': 'secret'}},
+        ),
+        (
+            '/auth/register',
+            {
+                'json': {
+                    'email': 'a@b.c',
+                    'password': 'secret',
+                    'name': 'Anna',
+                    'last_name': 'Ivanova',
+                }
+            },
+        ),
+    ],
+)
+async def test_auth_fails_fast_when_hashing_is_full(
+    client, full_password_hashing, path, kwargs
+):
+    response = await client.post(path, **kwargs)
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '7'
@@ -0,0 +1,69 @@
+import json
+import random
+
+import pytest
+
+from benchmarks.datagen import make_hits
+from core.hits_codec import (
+    HitsCodecError,
+    append_hits,
+    decode_hits,
+    encode_hits,
+    hits_to_dicts,
+)
+
+
+def _columns(hits):
+    return [h['timeMs'] for h in hits], [h['maxAccel'] for h in hits]
+
+
+def test_round_trip_is_exact_and_compact():
+    hits = make_hits(random.Random(7), 2000)
+    times, forces = _columns(hits)
+    blob = encode_hits(times, forces)
+
+    assert decode_hits(blob) == (times, forces)
+    assert len(blob) * 5 < len(json.dumps(hits))
+
+
+def test_values_off_the_centi_grid_are_kept_exactly():
+    times = [5, 3, 10**10, 0]
+    forces = [1 / 3, -2.5, float('inf'), 1e-9]
+    assert decode_hits(encode_hits(times, forces)) == (times, forces)
+
+
+@pytest.mark.parametrize(
+    'times, forces',
+    [
+        ([0], [-3e19]),
+        ([2**64, 0, -2**70, 2**63 - 1], [3e19, -1e21, -0.01, 2.0**80]),
+        ([-1, -2**63, 2**63], [-92233720368547758.08, 1.5, -1e300]),
+    ],
+)
+def test_round_trip_of_large_and_negative_values(times, forces):
+    assert decode_hits(encode_hits(times, forces)) == (times, forces)
+    assert decode_hits(append_hits(encode_hits(times, forces), times, forces)) == (
+        times * 2, forces * 2
+    )
+
+
+def test_append_adds_frames_without_decoding():
+    hits = make_hits(random.Random(3), 300)
+    blob = None
+    for start in range(0, 300, 50):
+        blob = append_hits(blob, *_columns(hits[start:start + 50]))
+
+    times, forces = decode_hits(blob)
+    assert hits_to_dicts(times, forces) == hits
+    assert len(encode_hits(times, forces)) < len(blob)
+
+
+def test_empty_and_invalid_blobs():
+    assert decode_hits(b'') == ([], [])
+    assert decode_hits(encode_hits([], [])) == ([], [])
+    with pytest.raises(HitsCodecError):
+        decode_hits(b'\x09abc')
+    with pytest.raises(HitsCodecError):
+        decode_hits(encode_hits([1, 2], [1.0, 2.0])[:-3])
+    with pytest.raises(HitsCodecError):
+        encode_hits([1], [])
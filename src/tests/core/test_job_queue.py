@@ -0,0 +1,244 @@
+import asyncio
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.sql import operators
+
+from core.jobs import (
+    ACTIVE_STATUSES,
+    JOB_DONE,
+    JOB_FAILED,
+    JOB_PENDING,
+    JOB_RUNNING,
+    JobQueue,
+    JobSubmitError,
+)
+from database.models import Jobs
+
+
+def _matches(job, statement) -> bool:
+    for criterion in statement._where_criteria:
+        value = getattr(job, criterion.left.key)
+        expected = criterion.right.value
+        if criterion.operator is operators.in_op:
+            if value not in expected:
+                return False
+        elif criterion.operator is operators.eq:
+            if value != expected:
+                return False
+        else:
+            raise AssertionError(f'unexpected operator {criterion.operator}')
+    return True
+
+
+class JobStore:
+    """The ``jobs`` table, with its partial unique index on active
+    dedup keys; ``race`` adds a competing job after the first lookup."""
+
+    def __init__(self, jobs=()):
+        self.rows: dict[int, Jobs] = {}
+        self.updates: list[tuple[int, dict]] = []
+        self.race: Jobs | None = None
+        for job in jobs:
+            self.insert(job)
+
+    def insert(self, job: Jobs) -> None:
+        job.id = max(self.rows, default=0) + 1
+        self.rows[job.id] = job
+
+    def active(self, key: str) -> list[Jobs]:
+        return [
+            job for job in self.rows.values()
+            if job.dedup_key == key and job.status in ACTIVE_STATUSES
+        ]
+
+    def session(self):
+        return FakeJobSession(self)
+
+
+class FakeResult:
+    def __init__(self, values):
+        self._values = values
+
+    def all(self):
+        return self._values
+
+
+class FakeJobSession:
+    def __init__(self, store: JobStore):
+        self.store = store
+        self.pending: list[Jobs] = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.pending = []
+
+    async def get(self, _model, job_id):
+        return self.store.rows.get(job_id)
+
+    async def scalar(self, statement):
+        found = [j for j in self.store.rows.values() if _matches(j, statement)]
+        if self.store.race is not None:
+            self.store.insert(self.store.race)
+            self.store.race = None
+        return found[0] if found else None
+
+    async def scalars(self, statement):
+        found = sorted(
+            job.id for job in self.store.rows.values()
+            if _matches(job, statement)
+        )
+        return FakeResult(found)
+
+    async def execute(self, statement):
+        values = {
+            column.key: param.value
+            for column, param in statement._values.items()
+        }
+        for job in list(self.store.rows.values()):
+            if _matches(job, statement):
+                for name, value in values.items():
+                    setattr(job, name, value)
+                self.store.updates.append((job.id, values))
+
+    def add(self, job):
+        self.pending.append(job)
+
+    async def commit(self):
+        pending, self.pending = self.pending, []
+        for job in pending:
+            if self.store.active(job.dedup_key):
+                raise IntegrityError('INSERT', {}, Exception('duplicate'))
+            self.store.insert(job)
+
+    async def rollback(self):
+        self.pending = []
+
+
+def _job(kind, params, status):
+    return Jobs(
+        kind=kind,
+        params=params,
+        dedup_key=JobQueue.dedup_key(kind, params),
+        status=status,
+        progress=0.0,
+    )
+
+
+async def _noop(ctx):
+    return None
+
+
+@pytest.mark.asyncio
+async def test_submit_deduplicates_active_jobs():
+    store = JobStore()
+    queue = JobQueue(store.session)
+    queue.register('recalc', _noop)
+
+    first, created = await queue.submit('recalc', {'slot_id': 1})
+    again, created_again = await queue.submit('recalc', {'slot_id': 1})
+    other, created_other = await queue.submit('recalc', {'slot_id': 2})
+
+    assert created is True and created_again is False
+    assert again is first
+    assert created_other is True and other.id != first.id
+    assert first.status == JOB_PENDING
+    assert queue._queue.qsize() == 2
+
+
+@pytest.mark.asyncio
+async def test_submit_returns_the_job_that_won_the_race():
+    store = JobStore()
+    store.race = _job('recalc', {'slot_id': 1}, JOB_PENDING)
+    queue = JobQueue(store.session)
+    queue.register('recalc', _noop)
+
+    job, created = await queue.submit('recalc', {'slot_id': 1})
+
+    assert created is False
+    assert job.id == 1 and len(store.rows) == 1
+    assert queue._queue.empty()
+
+
+@pytest.mark.asyncio
+async def test_submit_unknown_kind():
+    queue = JobQueue(JobStore().session)
+
+    with pytest.raises(JobSubmitError):
+        await queue.submit('nope', {})
+
+
+@pytest.mark.asyncio
+async def test_job_runs_to_done_and_reports_progress():
+    store = JobStore()
+    queue = JobQueue(store.session, concurrency=1)
+    seen = []
+
+    async def handler(ctx):
+        seen.append((store.rows[ctx.job_id].status, ctx.params))
+        await ctx.progress(0.5)
+        return {'slots': 3}
+
+    queue.register('recalc', handler)
+    await queue.start()
+    try:
+        job, _ = await queue.submit('recalc', {'slot_id': 1})
+        await asyncio.wait_for(queue._queue.join(), 1)
+    finally:
+        await queue.stop()
+
+    assert seen == [(JOB_RUNNING, {'slot_id': 1})]
+    assert job.started_at is not None
+    assert (job.id, {'progress': 0.5}) in store.updates
+    assert job.status == JOB_DONE
+    assert job.progress == 1.0
+    assert job.result == {'slots': 3}
+    assert job.finished_at is not None
+
+
+@pytest.mark.asyncio
+async def test_failed_job_frees_its_dedup_key():
+    store = JobStore()
+    queue = JobQueue(store.session, concurrency=1)
+
+    async def handler(ctx):
+        raise RuntimeError('sensor offline')
+
+    queue.register('recalc', handler)
+    await queue.start()
+    try:
+        job, _ = await queue.submit('recalc', {'slot_id': 1})
+        await asyncio.wait_for(queue._queue.join(), 1)
+        retry, created = await queue.submit('recalc', {'slot_id': 1})
+    finally:
+        await queue.stop()
+
+    assert job.status == JOB_FAILED
+    assert job.error == 'sensor offline'
+    assert created is True and retry.id != job.id
+
+
+@pytest.mark.asyncio
+async def test_start_resumes_pending_and_interrupted_jobs():
+    store = JobStore([
+        _job('recalc', {'slot_id': 1}, JOB_RUNNING),
+        _job('recalc', {'slot_id': 2}, JOB_DONE),
+        _job('recalc', {'slot_id': 3}, JOB_PENDING),
+    ])
+    queue = JobQueue(store.session, concurrency=1)
+    ran = []
+
+    async def handler(ctx):
+        ran.append(ctx.params['slot_id'])
+
+    queue.register('recalc', handler)
+    await queue.start()
+    try:
+        await asyncio.wait_for(queue._queue.join(), 1)
+    finally:
+        await queue.stop()
+
+    assert ran == [1, 3]
+    assert [job.status for job in store.rows.values()] == [JOB_DONE] * 3
@@ -0,0 +1,71 @@
+import json
+import logging
+import queue
+import sys
+from logging.handlers import QueueHandler, RotatingFileHandler
+
+import settings
+from core.log_pipeline import (
+    JsonFormatter,
+    RateLimitFilter,
+    _PreparedQueueHandler,
+    setup_logging,
+)
+
+
+def _record(msg='hit %s', args=(1,), level=logging.INFO, **extra):
+    record = logging.LogRecord(
+        'control.ingest', level, __file__, 10, msg, args, None
+    )
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_formatter_keeps_extras():
+    line = JsonFormatter().format(_record(device='SENS01'))
+    payload = json.loads(line)
+    assert payload['level'] == 'INFO'
+    assert payload['logger'] == 'control.ingest'
+    assert payload['msg'] == 'hit 1'
+    assert payload['device'] == 'SENS01'
+    assert payload['src'].endswith(':10')
+
+
+def test_rate_limit_reports_dropped_records(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr('core.log_pipeline.time.monotonic', lambda: now[0])
+    limiter = RateLimitFilter(rate=2, per=1.0)
+
+    passed = [limiter.filter(_record()) for _ in range(5)]
+    assert passed == [True, True, False, False, False]
+    assert limiter.filter(_record(level=logging.WARNING))
+
+    now[0] += 1.0
+    record = _record()
+    assert limiter.filter(record)
+    assert record.suppressed == 3
+    assert json.loads(JsonFormatter().format(record))['suppressed'] == 3
+
+
+def test_queue_handler_renders_on_caller_thread():
+    log_queue = queue.SimpleQueue()
+    handler = _PreparedQueueHandler(log_queue)
+    try:
+        raise ValueError('boom')
+    except ValueError:
+        record = _record(level=logging.ERROR)
+        record.exc_info = sys.exc_info()
+        handler.handle(record)
+
+    queued = log_queue.get_nowait()
+    assert queued.msg == 'hit 1' and queued.args is None
+    assert queued.exc_info is None
+    assert 'ValueError: boom' in json.loads(JsonFormatter().format(queued))['exc']
+
+
+def test_control_logger_writes_through_queue():
+    setup_logging(settings.LOGGING)
+    setup_logging(settings.LOGGING)
+    handlers = logging.getLogger('control').handlers
+    assert sum(isinstance(h, QueueHandler) for h in handlers) == 1
+    assert not any(isinstance(h, RotatingFileHandler) for h in handlers)
@@ -0,0 +1,61 @@
+import pytest
+from httpx import ASGITransport, AsyncClient
+from starlette.applications import Starlette
+from starlette.routing import Mount
+
+from core.static_files import (
+    IMMUTABLE_CACHE_CONTROL,
+    REVALIDATE_CACHE_CONTROL,
+    CachedStaticFiles,
+)
+from web.users.photos import RENDITION_NAME_RE
+
+HASHED = f'{"a" * 24}-full.webp'
+LEGACY = 'user--2025-01-01T10:00:00.webp'
+
+
+@pytest.fixture
+async def static_client(tmp_path):
+    (tmp_path / HASHED).write_bytes(b'0123456789')
+    (tmp_path / LEGACY).write_bytes(b'legacy')
+    app = Starlette(
+        routes=[
+            Mount(
+                '/static',
+                CachedStaticFiles(
+                    directory=str(tmp_path),
+                    immutable_pattern=RENDITION_NAME_RE,
+                ),
+            )
+        ]
+    )
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url='http://test'
+    ) as client:
+        yield client
+
+
+@pytest.mark.asyncio
+async def test_hashed_files_are_immutable(static_client):
+    response = await static_client.get(f'/static/{HASHED}')
+    assert response.headers['cache-control'] == IMMUTABLE_CACHE_CONTROL
+
+    response = await static_client.get(f'/static/{LEGACY}')
+    assert response.headers['cache-control'] == REVALIDATE_CACHE_CONTROL
+
+
+@pytest.mark.asyncio
+async def test_conditional_and_range_requests(static_client):
+    first = await static_client.get(f'/static/{HASHED}')
+
+    revalidated = await static_client.get(
+        f'/static/{HASHED}', headers={'if-none-match': first.headers['etag']}
+    )
+    assert revalidated.status_code == 304
+    assert revalidated.headers['cache-control'] == IMMUTABLE_CACHE_CONTROL
+
+    partial = await static_client.get(
+        f'/static/{HASHED}', headers={'range': 'bytes=2-5'}
+    )
+    assert partial.status_code == 206
+    assert partial.content == b'2345'
@@ -0,0 +1,60 @@
+import asyncio
+import sys
+import time
+from types import SimpleNamespace
+
+import pytest
+from prometheus_client import REGISTRY
+
+from monitoring.loop_monitor import LoopMonitor, find_route
+
+
+def _blocks(route):
+    return REGISTRY.get_sample_value(
+        'fitbox_event_loop_blocks_total', {'route': route}
+    ) or 0.0
+
+
+def _handle_request(scope, block):
+    # stands in for a Starlette frame holding the ASGI scope
+    return block()
+
+
+def test_find_route_prefers_matched_route():
+    scope = {
+        'type': 'http',
+        'method': 'GET',
+        'path': '/api/v1/users/42',
+        'route': SimpleNamespace(path='/api/v1/users/{id}'),
+    }
+    frame = _handle_request(scope, sys._getframe)
+    assert find_route(frame) == 'GET /api/v1/users/{id}'
+
+    scope.pop('route')
+    frame = _handle_request(scope, sys._getframe)
+    assert find_route(frame) == 'GET /api/v1/users/42'
+
+
+def test_find_route_outside_requests():
+    assert find_route(sys._getframe()) is None
+
+
+@pytest.mark.asyncio
+async def test_blocking_callback_is_reported_with_route():
+    scope = {
+        'type': 'http',
+        'method': 'POST',
+        'path': '/api/v1/x',
+        'route': SimpleNamespace(path='/api/v1/x'),
+    }
+    before = _blocks('POST /api/v1/x')
+    monitor = LoopMonitor(interval=0.01, block_threshold=0.05)
+    await monitor.start()
+    try:
+        await asyncio.sleep(0.05)
+        _handle_request(scope, lambda: time.sleep(0.3))
+        await asyncio.sleep(0.05)
+    finally:
+        await monitor.stop()
+
+    assert _blocks('POST /api/v1/x') == before + 1
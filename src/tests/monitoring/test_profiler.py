@@ -0,0 +1,115 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from monitoring.instumentator import verify_metrics_creds
+from monitoring.profiler import (
+    ProfileRouteMiddleware,
+    ProfilerBusy,
+    run_profile,
+)
+
+
+def _spin(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+@pytest.mark.asyncio
+async def test_profile_exports_speedscope():
+    async def _busy():
+        await asyncio.sleep(0.02)
+        _spin(0.2)
+
+    task = asyncio.ensure_future(_busy())
+    profiler = await run_profile(
+        0.3, 0.002, thread_ids={threading.get_ident()}
+    )
+    await task
+
+    doc = profiler.to_speedscope('test')
+    names = {f['name'] for f in doc['shared']['frames']}
+    assert '_spin' in names
+    [profile] = doc['profiles']
+    assert profile['type'] == 'sampled'
+    assert len(profile['samples']) == len(profile['weights'])
+    assert profile['endValue'] > 0
+
+
+@pytest.mark.asyncio
+async def test_only_one_profile_at_a_time():
+    first = asyncio.ensure_future(run_profile(0.2, 0.01))
+    await asyncio.sleep(0.01)
+    with pytest.raises(ProfilerBusy):
+        await run_profile(0.1, 0.01)
+    await first
+
+
+@pytest.mark.asyncio
+async def test_route_profile_stops_after_requests():
+    app = FastAPI()
+    app.add_middleware(ProfileRouteMiddleware)
+
+    @app.get('/work/{n}')
+    async def work(n: int):
+        _spin(0.02)
+        return {'n': n}
+
+    @app.get('/other')
+    async def other():
+        return {}
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url='http://test'
+    ) as client:
+        started = time.perf_counter()
+        profile = asyncio.ensure_future(
+            run_profile(5, 0.002, route='GET /work/{n}', requests=2)
+        )
+        await asyncio.sleep(0.01)
+        await client.get('/other')
+        await client.get('/work/1')
+        await client.get('/work/2')
+        profiler = await profile
+
+    assert time.perf_counter() - started < 2
+    assert profiler.samples > 0
+    names = {f['name'] for f in profiler.to_speedscope('x')['shared']['frames']}
+    assert 'work' in names and 'other' not in names
+
+
+@pytest.mark.asyncio
+async def test_tracemalloc_endpoint(app, client):
+    app.dependency_overrides[verify_metrics_creds] = lambda: None
+    response = await client.get(
+        'http://test/debug/tracemalloc', params={'seconds': 0, 'limit': 5}
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert len(body['top']) <= 5
+    assert {'file', 'line', 'size_kb', 'count'} <= set(body['top'][0])
+
+
+@pytest.mark.asyncio
+async def test_only_one_tracemalloc_snapshot_at_a_time(app, client):
+    app.dependency_overrides[verify_metrics_creds] = lambda: None
+    first = asyncio.ensure_future(
+        client.get('http://test/debug/tracemalloc', params={'seconds': 0.2})
+    )
+    await asyncio.sleep(0.05)
+    response = await client.get(
+        'http://test/debug/tracemalloc', params={'seconds': 0}
+    )
+    assert response.status_code == 409
+    assert (await first).status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_debug_endpoints_need_credentials(client):
+    response = await client.get('http://test/debug/profile')
+    assert response.status_code == 401
@@ -0,0 +1,66 @@
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import create_engine, text
+
+from monitoring.query_stats import (
+    QueryStatsMiddleware,
+    assert_max_queries,
+    count_queries,
+    install_query_stats,
+)
+
+
+@pytest.fixture(scope='module')
+def engine():
+    engine = create_engine('sqlite://')
+    install_query_stats(engine)
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE t (id INTEGER)'))
+        conn.execute(text('INSERT INTO t VALUES (1), (2), (3)'))
+    return engine
+
+
+def test_counts_statements_only_inside_block(engine):
+    with engine.connect() as conn:
+        conn.execute(text('SELECT 1'))
+        with count_queries() as stats:
+            for i in range(6):
+                conn.execute(text('SELECT id FROM t WHERE id = :i'), {'i': i})
+            conn.execute(text('UPDATE t SET id = id'))
+
+    assert stats.queries == 7
+    assert stats.rows == 3
+    assert stats.db_time > 0
+    [(statement, count)] = stats.repeated(5)
+    assert count == 6 and statement.startswith('SELECT id FROM t')
+
+
+def test_assert_max_queries(engine):
+    with engine.connect() as conn:
+        with assert_max_queries(2):
+            conn.execute(text('SELECT 1'))
+            conn.execute(text('SELECT 2'))
+        with pytest.raises(AssertionError, match='budget is 1'):
+            with assert_max_queries(1):
+                conn.execute(text('SELECT 1'))
+                conn.execute(text('SELECT 2'))
+
+
+@pytest.mark.asyncio
+async def test_middleware_sets_server_timing(engine):
+    app = FastAPI()
+    app.add_middleware(QueryStatsMiddleware, budget=1)
+
+    @app.get('/items')
+    async def items():
+        with engine.connect() as conn:
+            return {'ids': conn.execute(text('SELECT id FROM t')).scalars().all()}
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url='http://test'
+    ) as client:
+        response = await client.get('/items')
+
+    assert response.status_code == 200
+    assert 'desc="1 queries' in response.headers['server-timing']
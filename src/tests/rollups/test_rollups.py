@@ -0,0 +1,157 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import select
+
+from constants import ROLLUP_FORCE_EDGES, ROLLUP_MAX_TIMELINE_BUCKETS
+from core.hits_codec import encode_hits
+from database.models import SprintRollups, Sprints
+from web.rollups.services import (
+    build_sprint_rollup,
+    get_rollup_summary,
+    save_sprint_rollups,
+)
+from web.sensors.archive import archive_cache
+
+
+def _upserted(statement) -> list[dict]:
+    return [
+        {getattr(column, 'key', column): value for column, value in row.items()}
+        for row in statement._multi_values[0]
+    ]
+
+
+def test_build_sprint_rollup_buckets_forces_and_time():
+    hits = [
+        {'timeMs': 0, 'maxAccel': 4.0},
+        {'timeMs': 500, 'maxAccel': 15.0},
+        {'timeMs': 1200, 'maxAccel': 15.5},
+        {'timeMs': 2500, 'maxAccel': 250.0},
+        {'timeMs': None, 'maxAccel': 12.0},
+        {'timeMs': 2600},
+    ]
+    rollup = build_sprint_rollup(hits, 500.0)
+
+    assert rollup['hit_count'] == 5
+    assert rollup['timed_count'] == 4
+    assert rollup['synced_count'] == 3
+    assert rollup['force_max'] == 250.0
+    hist = rollup['force_hist']
+    assert len(hist) == len(ROLLUP_FORCE_EDGES) and sum(hist) == 5
+    assert hist[0] == 1 and hist[2] == 1 and hist[3] == 2 and hist[-1] == 1
+    assert rollup['timeline_bucket_ms'] == 1000
+    assert rollup['timeline'] == [2, 1, 1]
+    assert rollup['duration_ms'] == 2500
+
+
+def test_long_sprint_timeline_is_downsampled():
+    hits = [{'timeMs': t * 100, 'maxAccel': 20.0} for t in range(6000)]
+    rollup = build_sprint_rollup(hits, 500.0)
+
+    assert len(rollup['timeline']) <= ROLLUP_MAX_TIMELINE_BUCKETS
+    assert rollup['timeline_bucket_ms'] == 8000
+    assert sum(rollup['timeline']) == 6000
+
+
+def test_empty_sprint_rollup():
+    rollup = build_sprint_rollup([], 500.0)
+    assert rollup['hit_count'] == 0
+    assert rollup['timeline'] == []
+    assert rollup['force_max'] == 0.0
+
+
+@pytest.mark.asyncio
+async def test_save_sprint_rollups_is_one_upsert(scripted_session):
+    sprints = [
+        SimpleNamespace(
+            slot_id=1,
+            sprint_id=sprint_id,
+            sensor_id=sensor_id,
+            data={'total_hits': 1, 'blink_interval': 500},
+            hits_blob=encode_hits([0], [20.0]),
+            archived_at=None,
+            result={'tempo': 100.0, 'power': 80.0, 'energy': 90.0},
+        )
+        for sprint_id in (1, 2)
+        for sensor_id in ('BAG01', 'BAG02', None)
+    ]
+    session = scripted_session()
+    await save_sprint_rollups(session, sprints)
+
+    [statement] = session.writes('sprint_rollups')
+    upserted = _upserted(statement)
+    assert [
+        (row['sprint_id'], row['sensor_id'], row['hit_count'])
+        for row in upserted
+    ] == [(1, 'BAG01', 1), (1, 'BAG02', 1), (2, 'BAG01', 1), (2, 'BAG02', 1)]
+    updated = {
+        getattr(column, 'key', column)
+        for column, _ in statement._post_values_clause.update_values_to_set
+    }
+    assert updated == set(upserted[0]) - {'slot_id', 'sprint_id', 'sensor_id'}
+
+
+@pytest.mark.asyncio
+async def test_archived_sprint_rollup_is_built_from_the_archive(
+    rows, scripted_session
+):
+    archive_cache.clear()
+    archived_at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    def sprint(pk):
+        return Sprints(
+            id=pk,
+            slot_id=1,
+            sprint_id=pk,
+            sensor_id=f'BAG{pk}',
+            data={'total_hits': 3, 'blink_interval': 500},
+            hits_blob=None,
+            archived_at=archived_at,
+            result={'tempo': 100.0, 'power': 80.0, 'energy': 90.0},
+        )
+
+    blob = encode_hits([0, 500, 1000], [20.0, 30.0, 250.0])
+    archive = rows([SimpleNamespace(sprint_pk=201, hits_blob=blob)])
+    # 202 has no archive row, its rollup is left alone
+    session = scripted_session([archive])
+    await save_sprint_rollups(session, [sprint(201), sprint(202)])
+
+    [statement] = session.writes('sprint_rollups')
+    [values] = _upserted(statement)
+    assert values['sensor_id'] == 'BAG201'
+    assert values['hit_count'] == 3
+    assert values['force_max'] == 250.0
+    assert sum(values['force_hist']) == 3
+    assert values['timeline'] != []
+
+
+@pytest.mark.asyncio
+async def test_rollup_summary_merges_histograms(rows, scripted_session):
+    day = datetime(2026, 10, 19, tzinfo=timezone.utc)
+    summary_rows = [
+        SimpleNamespace(
+            period_start=day,
+            sprints=2,
+            hits=10,
+            timed_hits=8,
+            synced_hits=6,
+            force_sum=250.0,
+            force_max=60.0,
+            tempo=75.0,
+            power=None,
+            energy=50.123,
+        )
+    ]
+    hist_rows = [
+        SimpleNamespace(period_start=day, bucket=1, count=3),
+        SimpleNamespace(period_start=day, bucket=4, count=7),
+    ]
+    session = scripted_session([rows(summary_rows), rows(hist_rows)])
+    [item] = await get_rollup_summary(session, select(SprintRollups), 'week')
+
+    assert item['sync_rate'] == 75.0
+    assert item['avg_force'] == 25.0
+    assert item['power'] is None and item['energy'] == 50.12
+    assert item['force_hist'][:4] == [3, 0, 0, 7]
+    assert len(item['force_hist']) == len(ROLLUP_FORCE_EDGES)
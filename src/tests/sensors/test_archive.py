@@ -0,0 +1,80 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import inspect
+
+from core.hits_codec import decode_hits, encode_hits
+from database.models import Sprints
+from web.sensors.archive import (
+    archive_cache,
+    archive_slot_hits,
+    load_archived_hits,
+    unarchive,
+)
+
+
+def _sprint(pk, archived=True, blob=None):
+    return Sprints(
+        id=pk,
+        slot_id=1,
+        sprint_id=1,
+        sensor_id=f'BAG{pk}',
+        data={'total_hits': 2},
+        hits_blob=blob,
+        archived_at=datetime.now(timezone.utc) if archived else None,
+    )
+
+
+@pytest.mark.asyncio
+async def test_archived_hits_are_read_through_and_cached(rows, scripted_session):
+    archive_cache.clear()
+    blob = encode_hits([0, 500], [20.0, 30.5])
+    hot_blob = encode_hits([1], [1.0])
+    archived, hot = _sprint(101), _sprint(102, archived=False, blob=hot_blob)
+    session = scripted_session(
+        [rows([SimpleNamespace(sprint_pk=101, hits_blob=blob)])]
+    )
+
+    await load_archived_hits(session, [archived, hot])
+
+    assert len(session.executed) == 1
+    assert decode_hits(archived.hits_blob) == ([0, 500], [20.0, 30.5])
+    assert not inspect(archived).attrs.hits_blob.history.has_changes()
+    assert hot.hits_blob == hot_blob
+
+    again = _sprint(101)
+    await load_archived_hits(session, [again])
+    assert len(session.executed) == 1
+    assert again.hits_blob == blob
+
+
+@pytest.mark.asyncio
+async def test_unarchive_makes_hot_copy_authoritative(rows, scripted_session):
+    archive_cache.clear()
+    blob = encode_hits([0], [20.0])
+    sprint = _sprint(103)
+    session = scripted_session(
+        [rows([SimpleNamespace(sprint_pk=103, hits_blob=blob)])]
+    )
+    await load_archived_hits(session, [sprint])
+    unarchive(sprint)
+
+    assert sprint.archived_at is None
+    assert 'hits_blob' in inspect(sprint).committed_state
+    assert archive_cache.get(103) is None
+
+
+@pytest.mark.asyncio
+async def test_archive_slot_hits_copies_then_clears_locked_rows(
+    rows, scripted_session
+):
+    session = scripted_session([rows(), rows(), rows(), rows(rowcount=4)])
+    assert await archive_slot_hits(session, 7) == 4
+
+    assert session.locking('sprints')
+    [copy] = session.writes('sprint_hits_archive')
+    assert copy.is_insert
+    [clear] = session.writes('sprints')
+    assert clear.is_update
+    assert session.executed.index(copy) < session.executed.index(clear)
@@ -21,6 +21,7 @@ class FakeDBSessionPersist:
         self._objects = []
         self._commit_calls = 0
         self._fail_commits = fail_commits
+        self.executed = []
 
     async def scalar(self, _query):
         return self._objects[-1] if self._objects else None
@@ -29,6 +30,9 @@ class FakeDBSessionPersist:
         if obj not in self._objects:
             self._objects.append(obj)
 
+    async def execute(self, statement):
+        self.executed.append(statement)
+
     async def commit(self):
         from sqlalchemy.exc import IntegrityError
         self._commit_calls += 1
@@ -101,6 +105,7 @@ async def test_hits_bulk_retries_once_on_integrity_error(client, app):
         assert body["status"] == "ok"
         assert body["is_last"] is True
         assert session._commit_calls >= 2
+        assert [s.table.name for s in session.executed] == ['sprint_rollups'] * 2
     finally:
         app.dependency_overrides[get_db_session] = old
 
@@ -122,3 +127,104 @@ async def test_hits_bulk_returns_409_after_two_failures(client, app):
         assert r.status_code == 409
     finally:
         app.dependency_overrides[get_db_session] = old
+
+
+@pytest.mark.asyncio
+async def test_hits_bulk_records_ingest_metrics(client, app):
+    from prometheus_client import REGISTRY
+
+    def sample(name, labels=None):
+        return REGISTRY.get_sample_value(name, labels or {}) or 0.0
+
+    session = FakeDBSessionPersist(fail_commits=2)
+    app.dependency_overrides[get_db_session] = lambda: session
+    await app.state.sensors.upsert('DEV-M', '10.0.0.5')
+    hits_before = sample('fitbox_sensor_hits_total', {'device': 'DEV-M'})
+    retries_before = sample('fitbox_ingest_retries_total')
+    conflicts_before = sample('fitbox_ingest_conflicts_total')
+    payload = {
+        "session_id": "13",
+        "sprint_id": "23",
+        "device_id": "DEV-M",
+        "hits": [{"timeMs": 100, "maxAccel": 20.0}] * 3,
+        "blink_interval": "150",
+        "is_last": False,
+    }
+    r = await client.post('/sensors/hits/bulk', json=payload)
+
+    assert r.status_code == 409
+    assert sample('fitbox_sensor_hits_total', {'device': 'DEV-M'}) == hits_before + 3
+    assert sample('fitbox_ingest_retries_total') == retries_before + 1
+    assert sample('fitbox_ingest_conflicts_total') == conflicts_before + 1
+    assert sample('fitbox_sensor_devices', {'state': 'active'}) >= 1
+
+
+@pytest.mark.asyncio
+async def test_hits_bulk_labels_unregistered_devices_as_unknown(
+    client, app, monkeypatch
+):
+    from prometheus_client import REGISTRY
+    from monitoring import metrics
+
+    def sample(device):
+        return REGISTRY.get_sample_value(
+            'fitbox_sensor_hits_total', {'device': device}
+        ) or 0.0
+
+    monkeypatch.setattr(metrics, 'SENSOR_HITS_MAX_DEVICES', 1)
+    monkeypatch.setattr(metrics, '_hits_devices', set())
+    await app.state.sensors.upsert('BAG-1', '10.0.0.1')
+    await app.state.sensors.upsert('BAG-2', '10.0.0.2')
+    unknown_before = sample('unknown')
+    payload = {
+        "session_id": "13",
+        "sprint_id": "23",
+        "hits": [{"timeMs": 100, "maxAccel": 20.0}],
+        "blink_interval": "150",
+        "is_last": False,
+    }
+    for device_id in ('BAG-1', 'BAG-2', 'random-1', 'random-1'):
+        r = await client.post(
+            '/sensors/hits/bulk', json={**payload, 'device_id': device_id}
+        )
+        assert r.status_code == 200
+
+    assert sample('BAG-1') >= 1
+    assert REGISTRY.get_sample_value(
+        'fitbox_sensor_hits_total', {'device': 'random-1'}
+    ) is None
+    assert sample('unknown') == unknown_before + 3
+
+
+@pytest.mark.asyncio
+async def test_hits_bulk_stores_encoded_hits(client, app):
+    from core.hits_codec import decode_hits
+    from web.sensors.services import calculate_sprint_metrics
+
+    session = FakeDBSessionPersist()
+    app.dependency_overrides[get_db_session] = lambda: session
+    hits = [
+        {"timeMs": 500 * i + (i % 3) * 40, "maxAccel": 10.0 + i * 0.25}
+        for i in range(30)
+    ]
+    payload = {
+        "session_id": "14",
+        "sprint_id": "24",
+        "device_id": "DEV-E",
+        "blink_interval": "500",
+    }
+    for start, is_last in ((0, False), (10, False), (20, True)):
+        r = await client.post('/sensors/hits/bulk', json={
+            **payload,
+            "hits": hits[start:start + 10],
+            "is_last": is_last,
+        })
+        assert r.status_code == 200
+    body = r.json()
+
+    [sprint] = session._objects
+    assert 'hits' not in sprint.data
+    assert sprint.data['total_hits'] == body['total'] == 30
+    times, forces = decode_hits(sprint.hits_blob)
+    assert [{"timeMs": t, "maxAccel": f} for t, f in zip(times, forces)] == hits
+    assert body['result'] == calculate_sprint_metrics(hits, 500.0, 30)
@@ -0,0 +1,39 @@
+import itertools
+import random
+
+import pytest
+
+from benchmarks.datagen import make_hits
+from web.sensors.services import (
+    calculate_sprint_metrics,
+    calculate_sprint_metrics_grid,
+    prepare_sprint_hits,
+)
+
+GRID = list(
+    itertools.product(
+        [None, 5.0, 13.5, 25.0, 100.0],
+        [None, 0.01, 0.2],
+        [None, 50, 80, 100],
+    )
+)
+
+
+@pytest.mark.parametrize('count', [1, 3, 40, 400])
+def test_grid_matches_calculate_sprint_metrics(count):
+    hits = make_hits(random.Random(count), count, blink_interval=500)
+    profile = prepare_sprint_hits(hits, 500.0, count)
+    results = calculate_sprint_metrics_grid(profile, GRID)
+    for params, result in zip(GRID, results):
+        assert result == calculate_sprint_metrics(hits, 500.0, count, *params)
+
+
+def test_grid_without_hits_returns_empty_results():
+    assert prepare_sprint_hits([], 500.0, 0) is None
+    assert calculate_sprint_metrics_grid(None, GRID[:2]) == [{}, {}]
+
+
+@pytest.mark.asyncio
+async def test_what_if_requires_scope(client):
+    r = await client.post('/slots/results/what-if', json={})
+    assert r.status_code == 400
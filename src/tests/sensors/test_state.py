@@ -89,3 +89,16 @@ async def test_touch_ip_mismatch_drop_policy():
     await st.touch('D5', ip='11.11.11.11')
     snap = await st.snapshot()
     assert 'D5' not in snap
+
+
+@pytest.mark.asyncio
+async def test_is_registered_needs_a_known_ip():
+    st = SensorsState()
+    await st.update_on_hit('D1')
+    await st.upsert('D2', '1.1.1.2')
+    await st.upsert('D3', '1.1.1.3')
+    await st.touch('D3', ip='9.9.9.9')
+    assert st.is_registered('D1') is False
+    assert st.is_registered('D2') is True
+    assert st.is_registered('D3') is False
+    assert st.is_registered('D4') is False
@@ -0,0 +1,51 @@
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from web.slots.services import process_bookings_results
+
+
+def _booking(slot_id, sensor_id):
+    return SimpleNamespace(
+        slot_id=slot_id,
+        sensor_id=sensor_id,
+        user_id=uuid.uuid4(),
+        sprints_data=None,
+        power=None,
+        energy=None,
+        tempo=None,
+    )
+
+
+@pytest.mark.asyncio
+async def test_process_bookings_results_fills_each_booking(
+    rows, scripted_session
+):
+    results = [
+        (1, 'BAG01', 1, {'power': 100.0, 'energy': 80.0, 'tempo': 60.0}),
+        (1, 'BAG01', 2, {'power': 50.0, 'energy': 40.0, 'tempo': 30.0}),
+        (1, 'BAG02', 1, None),
+    ]
+    bookings = [
+        _booking(1, 'BAG01'),
+        _booking(1, 'BAG02'),
+        _booking(1, None),
+    ]
+    for _ in range(20):
+        bookings.append(_booking(1, 'BAG99'))
+    session = scripted_session([rows(results)])
+
+    await process_bookings_results(bookings, session)
+
+    first, second, unbound = bookings[:3]
+    assert first.sprints_data == {
+        '1': {'power': 100.0, 'energy': 80.0, 'tempo': 60.0},
+        '2': {'power': 50.0, 'energy': 40.0, 'tempo': 30.0},
+    }
+    assert (first.power, first.energy, first.tempo) == (75.0, 60.0, 45.0)
+    assert second.sprints_data == {'1': {}}
+    assert (second.power, second.energy, second.tempo) == (0.0, 0.0, 0.0)
+    assert unbound.sprints_data == {}
+    assert unbound.power is None
+    assert len(session.writes('user')) == 1
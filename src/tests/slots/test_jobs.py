@@ -0,0 +1,154 @@
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from core.jobs import JobContext, JobQueue
+from dependencies import get_cache, get_db_session, get_jobs
+from web.slots.jobs import (
+    COMPLETE_TRAINING,
+    RECALCULATE_SLOT_RESULTS,
+    complete_training_job,
+    recalculate_slot_results_job,
+)
+from web.users.users import current_user
+
+
+class FakeJobQueue:
+    def __init__(self):
+        self.jobs = {}
+
+    async def submit(self, kind, params):
+        key = JobQueue.dedup_key(kind, params)
+        if key in self.jobs:
+            return self.jobs[key], False
+        job = SimpleNamespace(id=len(self.jobs) + 1, kind=kind, status='pending')
+        self.jobs[key] = job
+        return job, True
+
+
+class FakeSlotSession:
+    def __init__(self, slot):
+        self._slot = slot
+
+    async def scalar(self, _query):
+        return self._slot
+
+
+@pytest.fixture
+def jobs(app):
+    queue = FakeJobQueue()
+    app.dependency_overrides[get_jobs] = lambda: queue
+    app.dependency_overrides[get_cache] = lambda: None
+    app.dependency_overrides[current_user] = lambda: SimpleNamespace(
+        id='u1', is_superuser=True
+    )
+    return queue
+
+
+def _use_slot(app, slot):
+    app.dependency_overrides[get_db_session] = lambda: FakeSlotSession(slot)
+
+
+@pytest.mark.asyncio
+async def test_complete_training_is_queued_and_deduplicated(client, app, jobs):
+    _use_slot(app, SimpleNamespace(id=5, is_done=False, bookings=[]))
+    r1 = await client.post('/slots/complete_training/5')
+    r2 = await client.post('/slots/complete_training/5')
+    assert r1.status_code == r2.status_code == 202
+    assert r1.json()['kind'] == COMPLETE_TRAINING
+    assert r1.json()['deduplicated'] is False
+    assert r2.json()['deduplicated'] is True
+    assert r1.json()['job_id'] == r2.json()['job_id']
+
+
+@pytest.mark.asyncio
+async def test_complete_training_rejects_done_slot(client, app, jobs):
+    _use_slot(app, SimpleNamespace(id=5, is_done=True, bookings=[]))
+    r = await client.post('/slots/complete_training/5')
+    assert r.status_code == 400
+    assert jobs.jobs == {}
+
+
+@pytest.mark.asyncio
+async def test_slot_recalculate_returns_job(client, app, jobs):
+    _use_slot(app, SimpleNamespace(id=7, is_done=True, bookings=[]))
+    r = await client.post('/slots/results/7?recalculate=true')
+    assert r.status_code == 202
+    assert r.json()['kind'] == RECALCULATE_SLOT_RESULTS
+
+
+def test_dedup_key_ignores_param_order():
+    assert JobQueue.dedup_key('k', {'a': 1, 'b': 2}) == JobQueue.dedup_key(
+        'k', {'b': 2, 'a': 1}
+    )
+
+
+def _booking(sensor_id):
+    return SimpleNamespace(
+        slot_id=5,
+        sensor_id=sensor_id,
+        user_id=uuid.uuid4(),
+        sprints_data=None,
+        power=None,
+        energy=None,
+        tempo=None,
+    )
+
+
+def _context(session, params):
+    reported = []
+
+    async def progress(fraction):
+        reported.append(fraction)
+
+    ctx = JobContext(
+        job_id=1,
+        params=params,
+        db_session=session,
+        cache=None,
+        progress=progress,
+    )
+    return ctx, reported
+
+
+@pytest.mark.asyncio
+async def test_complete_training_reports_progress_per_booking(
+    rows, scripted_session
+):
+    bookings = [_booking('BAG01'), _booking('BAG02'), _booking(None)]
+    slot = SimpleNamespace(id=5, is_done=False, bookings=bookings)
+    session = scripted_session(
+        [rows([(5, 'BAG01', 1, {'power': 10.0})])], scalars=[slot]
+    )
+    ctx, reported = _context(session, {'slot_id': 5})
+
+    result = await complete_training_job(ctx)
+
+    assert result == {'slot_id': 5, 'bookings': 3}
+    assert slot.is_done is True
+    assert reported == [1 / 3, 2 / 3, 1.0]
+
+
+@pytest.mark.asyncio
+async def test_slot_recalculation_reports_sprints_then_bookings(
+    rows, scripted_session
+):
+    bookings = [_booking('BAG01'), _booking('BAG02')]
+    slot = SimpleNamespace(id=5, is_done=True, bookings=bookings)
+    sprints = [
+        SimpleNamespace(
+            slot_id=5,
+            sprint_id=1,
+            sensor_id=None,
+            data={'total_hits': 0},
+            hits_blob=None,
+            archived_at=None,
+        )
+    ]
+    session = scripted_session([rows(sprints), rows()], scalars=[slot])
+    ctx, reported = _context(session, {'slot_id': 5})
+
+    await recalculate_slot_results_job(ctx)
+
+    assert reported == [0.5, 0.75, 1.0]
@@ -0,0 +1,208 @@
+import uuid
+from datetime import date, datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from dependencies import get_cache, get_db_session
+from web.slots.schedule import (
+    BUILT_FIELD,
+    get_week_schedule,
+    refresh_schedule,
+    week_start,
+)
+from web.users.users import UserManager, current_user
+
+
+class MemoryCache:
+    def __init__(self):
+        self.hashes = {}
+        self.published = []
+
+    async def hgetall_json(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    async def replace_hash_json(self, key, mapping, ttl=None):
+        self.hashes[key] = dict(mapping)
+
+    async def hset_json(self, key, field, value, ttl=None):
+        self.hashes.setdefault(key, {})[field] = value
+
+    async def hdel(self, key, *fields):
+        for field in fields:
+            self.hashes.get(key, {}).pop(field, None)
+
+    async def publish(self, channel, message):
+        self.published.append((channel, message))
+
+
+class BrokenCache:
+    async def hgetall_json(self, key):
+        raise ConnectionError('redis is down')
+
+
+def _row(slot_id, time, places=10, booked=None):
+    booked = booked or []
+    return SimpleNamespace(
+        id=slot_id,
+        type='sprint',
+        time=time,
+        number_of_places=places,
+        booked_count=len(booked),
+        user_ids=booked or None,
+    )
+
+
+WEEK = date(2025, 1, 6)
+
+
+@pytest.fixture
+def slots_session(rows, scripted_session):
+    """Every query returns the same slot rows."""
+    return lambda slots: scripted_session(lambda _: rows(slots))
+
+
+@pytest.mark.asyncio
+async def test_week_is_built_once_then_served_from_cache(slots_session):
+    member = uuid.uuid4()
+    session = slots_session([
+        _row(2, datetime(2025, 1, 8, 18, tzinfo=timezone.utc), 2, [member]),
+        _row(1, datetime(2025, 1, 6, 9, tzinfo=timezone.utc)),
+    ])
+    cache = MemoryCache()
+
+    first = await get_week_schedule(session, cache, WEEK)
+    second = await get_week_schedule(session, cache, WEEK)
+
+    assert len(session.executed) == 1
+    assert first == second
+    assert [e['id'] for e in first] == [1, 2]
+    assert first[1]['free_places'] == 1
+    assert first[1]['booked_user_ids'] == [str(member)]
+    assert BUILT_FIELD in cache.hashes['schedule-2025-01-06']
+
+
+@pytest.mark.asyncio
+async def test_schedule_falls_back_to_database_without_redis(slots_session):
+    session = slots_session([_row(1, datetime(2025, 1, 6, 9, tzinfo=timezone.utc))])
+    entries = await get_week_schedule(session, BrokenCache(), WEEK)
+    assert [e['id'] for e in entries] == [1]
+
+
+@pytest.mark.asyncio
+async def test_refresh_rewrites_only_changed_slots(slots_session):
+    cache = MemoryCache()
+    old_time = datetime(2025, 1, 7, 9, tzinfo=timezone.utc)
+    await get_week_schedule(
+        slots_session([_row(1, old_time), _row(2, old_time)]), cache, WEEK
+    )
+    moved = _row(1, datetime(2025, 1, 14, 9, tzinfo=timezone.utc), 4)
+
+    await refresh_schedule(
+        slots_session([moved]), cache, [1], moved_from=[(1, old_time)]
+    )
+
+    assert set(cache.hashes['schedule-2025-01-06']) == {'2', BUILT_FIELD}
+    assert cache.hashes['schedule-2025-01-13']['1']['capacity'] == 4
+    # a partial week is rebuilt on the next read
+    session = slots_session([moved])
+    await get_week_schedule(session, cache, date(2025, 1, 13))
+    assert len(session.executed) == 1
+
+
+@pytest.mark.asyncio
+async def test_deleting_a_member_refreshes_their_slots(rows, scripted_session):
+    member = uuid.uuid4()
+    time = datetime(2025, 1, 8, 18, tzinfo=timezone.utc)
+    cache = MemoryCache()
+    await get_week_schedule(
+        scripted_session([rows([_row(2, time, 2, [member])])]), cache, WEEK
+    )
+    session = scripted_session([
+        rows([SimpleNamespace(id=2)]),
+        rows([_row(2, time, 2)]),
+    ])
+    manager = UserManager(SimpleNamespace(session=session))
+    request = SimpleNamespace(
+        app=SimpleNamespace(state=SimpleNamespace(cache=cache))
+    )
+    user = SimpleNamespace(id=member)
+
+    await manager.on_before_delete(user, request)
+    await manager.on_after_delete(user, request)
+
+    entry = cache.hashes['schedule-2025-01-06']['2']
+    assert entry['free_places'] == 2
+    assert entry['booked_user_ids'] == []
+
+
+@pytest.mark.asyncio
+async def test_deleting_a_member_promotes_from_the_waitlist(
+    rows, scripted_session
+):
+    member, waiter = uuid.uuid4(), uuid.uuid4()
+    time = datetime(2025, 1, 8, 18, tzinfo=timezone.utc)
+    cache = MemoryCache()
+    session = scripted_session(
+        [
+            rows([SimpleNamespace(id=2)]),
+            rows([SimpleNamespace(id=9, user_id=waiter)]),
+            rows(),
+            rows(),
+            rows([_row(2, time, 1, [waiter])]),
+        ],
+        [False, 2, 31],
+    )
+    manager = UserManager(SimpleNamespace(session=session))
+    request = SimpleNamespace(
+        app=SimpleNamespace(state=SimpleNamespace(cache=cache))
+    )
+    user = SimpleNamespace(id=member)
+
+    await manager.on_before_delete(user, request)
+    assert cache.published == []
+    [booking] = session.writes('bookings')
+    assert booking.is_insert
+    await manager.on_after_delete(user, request)
+
+    [(_, message)] = cache.published
+    assert message == {
+        'event': 'promoted',
+        'user_id': str(waiter),
+        'slot_id': 2,
+        'booking_id': 31,
+    }
+    entry = cache.hashes['schedule-2025-01-06']['2']
+    assert entry['booked_user_ids'] == [str(waiter)]
+
+
+def test_week_start_is_monday():
+    assert week_start(date(2025, 1, 12)) == WEEK
+    assert week_start(WEEK) == WEEK
+
+
+@pytest.mark.asyncio
+async def test_schedule_endpoint_marks_own_bookings(app, client, slots_session):
+    member = uuid.uuid4()
+    session = slots_session([
+        _row(1, datetime(2025, 1, 6, 9, tzinfo=timezone.utc)),
+        _row(2, datetime(2025, 1, 8, 18, tzinfo=timezone.utc), 2, [member]),
+    ])
+    app.dependency_overrides[current_user] = lambda: SimpleNamespace(
+        id=member, is_superuser=False
+    )
+    app.dependency_overrides[get_cache] = lambda: MemoryCache()
+    app.dependency_overrides[get_db_session] = lambda: session
+
+    response = await client.get('/slots/schedule', params={'week': '2025-01-09'})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body['week_start'] == '2025-01-06'
+    assert [(s['id'], s['is_booked']) for s in body['slots']] == [
+        (1, False),
+        (2, True),
+    ]
+    assert set(body['slots'][0]) == {
+        'id', 'type', 'time', 'capacity', 'free_places', 'is_booked'
+    }
@@ -0,0 +1,55 @@
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from web.slots.services import SprintResultException, get_sprint_energy_list
+
+
+class RowsSession:
+    def __init__(self, rows):
+        self._rows = rows
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        return iter(self._rows)
+
+
+def _row(sensor_id, result, user_id=None):
+    return SimpleNamespace(
+        sensor_id=sensor_id,
+        result=result,
+        id=user_id,
+        name='Name',
+        last_name='Last',
+        photo_url=None,
+    )
+
+
+@pytest.mark.asyncio
+async def test_sprint_leaderboard_is_one_query():
+    me, other = uuid.uuid4(), uuid.uuid4()
+    session = RowsSession([
+        _row('BAG02', {'power': 90, 'energy': 70, 'tempo': 50}, other),
+        _row('BAG01', None, me),
+    ])
+
+    energy_list, can_see = await get_sprint_energy_list(
+        1, 2, SimpleNamespace(id=me), session
+    )
+
+    assert len(session.statements) == 1
+    assert can_see is True
+    assert [e['id'] for e in energy_list] == [str(other), str(me)]
+    assert energy_list[1]['energy'] == 0
+
+
+@pytest.mark.asyncio
+async def test_sprint_leaderboard_unbound_sensor():
+    session = RowsSession([_row('BAG03', {'energy': 1})])
+
+    with pytest.raises(SprintResultException):
+        await get_sprint_energy_list(
+            1, 2, SimpleNamespace(id=uuid.uuid4()), session
+        )
@@ -0,0 +1,110 @@
+import io
+import os
+import uuid
+
+import pytest
+from fastapi import UploadFile
+from PIL import Image
+
+from constants import PHOTO_RENDITIONS
+from web.users import photos
+from web.users.photos import (
+    PhotoError,
+    delete_photo,
+    photo_filenames,
+    render_photo,
+    rendition_name,
+    store_photo,
+)
+
+
+def _jpeg(size=(1600, 1200)) -> bytes:
+    buf = io.BytesIO()
+    Image.new('RGB', size, (200, 30, 30)).save(buf, format='JPEG')
+    return buf.getvalue()
+
+
+@pytest.fixture
+def photo_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(photos, 'PHOTO_DIR', str(tmp_path))
+    return tmp_path
+
+
+def test_rendition_name():
+    stem = 'ab' * 12
+    assert rendition_name(f'{stem}-full.webp', 'thumb') == f'{stem}-thumb.webp'
+    legacy = f'{uuid.uuid4()}--2025-01-01T10:00:00.webp'
+    assert rendition_name(legacy, 'thumb') == legacy
+    assert photo_filenames(legacy) == [legacy]
+    assert rendition_name(None, 'thumb') is None
+
+
+def test_render_photo_writes_every_rendition(tmp_path):
+    src = tmp_path / 'upload'
+    src.write_bytes(_jpeg())
+
+    written = render_photo(str(src), str(tmp_path), 'c' * 24)
+
+    assert len(written) == len(PHOTO_RENDITIONS)
+    for rendition, size in PHOTO_RENDITIONS.items():
+        with Image.open(tmp_path / f'{"c" * 24}-{rendition}.webp') as img:
+            assert img.format == 'WEBP'
+            assert max(img.size) == size
+    assert not [p for p in os.listdir(tmp_path) if p.startswith('.tmp-')]
+
+
+def test_render_photo_rejects_garbage(tmp_path):
+    src = tmp_path / 'upload'
+    src.write_bytes(b'not an image')
+    with pytest.raises(PhotoError):
+        render_photo(str(src), str(tmp_path), 'd' * 24)
+
+
+@pytest.mark.asyncio
+async def test_store_photo_is_content_addressed(photo_dir, monkeypatch):
+    calls = []
+
+    async def _run(fn, *args):
+        calls.append(args)
+        return fn(*args)
+
+    monkeypatch.setattr(photos.photo_processing, 'run', _run)
+    user_id = uuid.uuid4()
+    content = _jpeg()
+
+    first = await store_photo(
+        UploadFile(io.BytesIO(content), filename='a.jpg'), user_id
+    )
+    second = await store_photo(
+        UploadFile(io.BytesIO(content), filename='b.jpg'), user_id
+    )
+
+    assert first == second
+    assert first.endswith('-full.webp')
+    assert len(calls) == 1
+    assert sorted(os.listdir(photo_dir)) == sorted(photo_filenames(first))
+
+    delete_photo(first)
+    assert os.listdir(photo_dir) == []
+
+
+@pytest.mark.asyncio
+async def test_store_photo_rejects_empty_upload(photo_dir):
+    with pytest.raises(PhotoError):
+        await store_photo(
+            UploadFile(io.BytesIO(b''), filename='a.jpg'), uuid.uuid4()
+        )
+    assert os.listdir(photo_dir) == []
+
+
+def test_find_orphaned_photos(tmp_path):
+    kept = photo_filenames(f'{"e" * 24}-full.webp')
+    for name in kept + ['orphan.webp', 'fresh.webp']:
+        (tmp_path / name).write_bytes(b'x')
+    old = 1_000_000
+    for name in kept + ['orphan.webp']:
+        os.utime(tmp_path / name, (old, old))
+
+    orphans = photos.find_orphaned_photos(set(kept), str(tmp_path), old + 60)
+
+    assert orphans == ['orphan.webp']
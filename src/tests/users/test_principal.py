@@ -0,0 +1,126 @@
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from web.users.users import (
+    AuthPrincipal,
+    CustomJWTStrategy,
+    UserManager,
+    calc_token_version,
+    invalidate_principal,
+)
+
+
+class FakeResult:
+    def __init__(self, row):
+        self._row = row
+
+    def one_or_none(self):
+        return self._row
+
+
+class ProjectionSession:
+    def __init__(self, row):
+        self.row = row
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        return FakeResult(self.row)
+
+
+def _strategy():
+    return CustomJWTStrategy(secret='test-secret', lifetime_seconds=60)
+
+
+def _manager(row):
+    session = ProjectionSession(row)
+    return UserManager(SimpleNamespace(session=session)), session
+
+
+def _row(user_id, hashed_password='hash-1', is_superuser=False):
+    return SimpleNamespace(
+        id=user_id,
+        email='a@b.c',
+        is_active=True,
+        is_superuser=is_superuser,
+        is_verified=False,
+        hashed_password=hashed_password,
+    )
+
+
+async def _token(strategy, user_id, hashed_password='hash-1'):
+    return await strategy.write_token(
+        SimpleNamespace(
+            id=user_id,
+            is_superuser=False,
+            email='a@b.c',
+            hashed_password=hashed_password,
+        )
+    )
+
+
+@pytest.mark.asyncio
+async def test_read_token_loads_narrow_principal():
+    user_id = uuid.uuid4()
+    strategy = _strategy()
+    token = await _token(strategy, user_id)
+    manager, session = _manager(_row(user_id))
+
+    principal = await strategy.read_token(token, manager)
+
+    assert principal == AuthPrincipal(
+        user_id, 'a@b.c', True, False, False, calc_token_version('hash-1')
+    )
+    [statement] = session.statements
+    assert [c.name for c in statement.selected_columns] == [
+        'id',
+        'email',
+        'is_active',
+        'is_superuser',
+        'is_verified',
+        'hashed_password',
+    ]
+
+
+@pytest.mark.asyncio
+async def test_read_token_unknown_user_or_bad_token():
+    strategy = _strategy()
+    token = await _token(strategy, uuid.uuid4())
+    manager, _ = _manager(None)
+
+    assert await strategy.read_token(token, manager) is None
+    assert await strategy.read_token('garbage', manager) is None
+
+
+@pytest.mark.asyncio
+async def test_principal_is_cached_until_invalidated():
+    user_id = uuid.uuid4()
+    strategy = _strategy()
+    token = await _token(strategy, user_id)
+    manager, session = _manager(_row(user_id))
+
+    await strategy.read_token(token, manager)
+    await strategy.read_token(token, manager)
+    assert len(session.statements) == 1
+
+    session.row = _row(user_id, is_superuser=True)
+    invalidate_principal(user_id)
+    principal = await strategy.read_token(token, manager)
+
+    assert len(session.statements) == 2
+    assert principal.is_superuser is True
+
+
+@pytest.mark.asyncio
+async def test_token_from_before_password_change_is_rejected():
+    user_id = uuid.uuid4()
+    strategy = _strategy()
+    old_token = await _token(strategy, user_id, 'hash-1')
+    manager, session = _manager(_row(user_id, 'hash-2'))
+
+    assert await strategy.read_token(old_token, manager) is None
+    new_token = await _token(strategy, user_id, 'hash-2')
+    assert await strategy.read_token(new_token, manager) is not None
+    invalidate_principal(user_id)
@@ -0,0 +1,173 @@
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+import constants
+from database.models import Records, User
+from dependencies import get_db_session
+from web.users.routers import _me_version, get_user_or_404
+from web.users.services import (
+    calc_status,
+    get_user_profile,
+    parse_expand,
+    user_bookings_query,
+)
+from web.users.users import current_active_user, get_user_manager
+
+USER_ID = uuid.UUID('00000000-0000-0000-0000-000000000001')
+
+
+def _user():
+    return SimpleNamespace(
+        id=USER_ID,
+        email='member@example.com',
+        name='Anna',
+        last_name='Ivanova',
+        father_name=None,
+        phone=None,
+        telegram_id=None,
+        photo_url=None,
+        gender=None,
+        date_of_birth=None,
+        created_at=datetime(2024, 1, 1, tzinfo=timezone.utc),
+        updated_at=None,
+        score=None,
+        bookings=[],
+        records=[],
+        transactions=[],
+        is_active=True,
+        is_verified=False,
+        is_superuser=False,
+    )
+
+
+@pytest.fixture
+def profile_session(rows, scripted_session):
+    def make(user, stats=(3, 120.0), items=()):
+        return scripted_session(
+            lambda s: rows(items) if s.is_select and s._limit else rows([stats]),
+            [user],
+        )
+
+    return make
+
+
+def test_parse_expand():
+    assert parse_expand(None) == set()
+    assert parse_expand(' records, bookings,') == {'records', 'bookings'}
+    with pytest.raises(ValueError, match='friends'):
+        parse_expand('bookings,friends')
+
+
+@pytest.mark.asyncio
+async def test_profile_loads_only_the_user_and_booking_totals(profile_session):
+    session = profile_session(_user())
+
+    user, sections = await get_user_profile(session, USER_ID, set())
+
+    assert sections == {}
+    assert (user.count_trainings, user.energy) == (3, 120.0)
+    assert user.status == calc_status(120.0)
+    user_query = session.executed[0]
+    assert [d['entity'] for d in user_query.column_descriptions] == [User]
+    assert {
+        dict(load.strategy)['lazy']
+        for option in user_query._with_options
+        for load in option.context
+    } == {'noload'}
+
+
+@pytest.mark.asyncio
+async def test_profile_expands_latest_items_only(profile_session):
+    session = profile_session(_user(), items=['r'])
+
+    _, sections = await get_user_profile(session, USER_ID, {'records'})
+
+    assert sections == {'records': ['r']}
+    [records_query] = [
+        s for s in session.executed if s.column_descriptions[0]['entity'] is Records
+    ]
+    assert records_query._limit == constants.USER_EXPAND_LIMIT
+
+
+@pytest.mark.asyncio
+async def test_profile_of_missing_user(profile_session):
+    assert await get_user_profile(
+        profile_session(None), USER_ID, {'bookings'}
+    ) is None
+
+
+def test_bookings_query_does_not_cascade_into_slot_history():
+    query = user_bookings_query(USER_ID)
+    strategies = {
+        '.'.join(str(p.key) for p in load.path.natural_path[1::2]):
+            dict(load.strategy)['lazy']
+        for option in query._with_options
+        for load in option.context
+    }
+    assert strategies == {
+        'user': 'noload',
+        'slot': 'selectin',
+        'slot.bookings': 'noload',
+        'slot.sprints': 'noload',
+    }
+
+
+@pytest.mark.asyncio
+async def test_me_is_slim_by_default(app, client, profile_session):
+    session = profile_session(_user())
+    app.dependency_overrides[current_active_user] = (
+        lambda: SimpleNamespace(id=USER_ID)
+    )
+    app.dependency_overrides[get_db_session] = lambda: session
+    app.dependency_overrides[_me_version] = lambda: 'v1'
+
+    response = await client.get('/users/me')
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body['count_trainings'] == 3
+    assert body['bookings'] is None
+    assert body['records'] is None
+    assert body['transactions'] is None
+    assert response.headers['ETag']
+
+
+@pytest.mark.asyncio
+async def test_me_rejects_unknown_expand(app, client, profile_session):
+    app.dependency_overrides[current_active_user] = (
+        lambda: SimpleNamespace(id=USER_ID)
+    )
+    app.dependency_overrides[get_db_session] = lambda: profile_session(_user())
+    app.dependency_overrides[_me_version] = lambda: 'v1'
+
+    response = await client.get('/users/me', params={'expand': 'friends'})
+
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_patched_user_comes_back_without_history(
+    app, client, profile_session
+):
+    stored = _user()
+    stored.bookings = [SimpleNamespace(id=1)]
+
+    class FakeUserManager:
+        async def update(self, user_update, user, safe, request):
+            user.name = user_update.name
+            return user
+
+    app.dependency_overrides[get_user_or_404] = lambda: stored
+    app.dependency_overrides[get_user_manager] = lambda: FakeUserManager()
+    app.dependency_overrides[get_db_session] = lambda: profile_session(stored)
+
+    response = await client.patch(f'/users/{USER_ID}', json={'name': 'Anya'})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body['name'] == 'Anya'
+    assert body['count_trainings'] == 3
+    assert body['bookings'] is None
@@ -0,0 +1,138 @@
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from dependencies import get_cache
+from web.users.users import current_user
+from web.waitlist.services import (
+    WaitlistError,
+    join_waitlist,
+    notify_promoted,
+    promote_from_waitlist,
+    waitlist_query,
+)
+
+
+@pytest.fixture
+def promotion_session(rows, scripted_session):
+    """Hands out ``entries`` as the head of the queue, one per lookup."""
+
+    def make(entries, scalars):
+        queue = [rows([entry]) for entry in entries]
+        return scripted_session(
+            lambda s: queue.pop(0) if s.is_select and queue else rows(),
+            scalars,
+        )
+
+    return make
+
+
+def _sql(statement):
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+@pytest.mark.asyncio
+async def test_promotion_books_in_queue_order(promotion_session):
+    first, second, third = (uuid.uuid4() for _ in range(3))
+    entries = [
+        SimpleNamespace(id=1, user_id=first),
+        SimpleNamespace(id=2, user_id=second),
+        SimpleNamespace(id=3, user_id=third),
+    ]
+    # first booked, second already had a booking, third finds no place
+    session = promotion_session(entries, [False, 7, 100, 7, None, None, 7])
+
+    promoted = await promote_from_waitlist(session, 7)
+
+    assert promoted == [
+        {
+            'event': 'promoted',
+            'user_id': str(first),
+            'slot_id': 7,
+            'booking_id': 100,
+        }
+    ]
+    assert session.locking('waitlist_entries')
+    # both promoted entries leave the queue, the third stays
+    assert len(session.writes('waitlist_entries')) == 2
+    # two places reserved, the second given back before moving on
+    reserve_1, reserve_2, release, reserve_3 = session.writes('slots')
+    assert release.is_update
+    assert len(session.writes('bookings')) == 2
+
+
+@pytest.mark.asyncio
+async def test_no_promotion_into_a_finished_class(promotion_session):
+    entry = SimpleNamespace(id=1, user_id=uuid.uuid4())
+    session = promotion_session([entry], [True, 7, 100])
+
+    assert await promote_from_waitlist(session, 7) == []
+    assert session.writes('slots') == []
+    assert session.writes('bookings') == []
+
+
+@pytest.mark.asyncio
+async def test_join_waitlist_locks_the_slot(rows, scripted_session):
+    full = SimpleNamespace(is_done=False, number_of_places=2, booked_count=2)
+    session = scripted_session([rows([full])], scalars=[None, 11])
+
+    assert await join_waitlist(session, 7, uuid.uuid4()) == 11
+    assert session.locking('slots')
+    assert len(session.writes('waitlist_entries')) == 1
+
+    free = SimpleNamespace(is_done=False, number_of_places=2, booked_count=1)
+    session = scripted_session([rows([free])])
+    with pytest.raises(WaitlistError):
+        await join_waitlist(session, 7, uuid.uuid4())
+    assert session.writes('waitlist_entries') == []
+
+
+@pytest.mark.asyncio
+async def test_notify_survives_a_broken_channel():
+    class BrokenCache:
+        async def publish(self, channel, message):
+            raise ConnectionError('redis is down')
+
+    await notify_promoted(
+        BrokenCache(),
+        [{'user_id': 'u', 'slot_id': 1, 'booking_id': 2, 'event': 'promoted'}],
+    )
+
+
+def test_waitlist_positions_are_ranked_per_slot():
+    sql = _sql(waitlist_query(user_id=uuid.uuid4()))
+    assert (
+        'row_number() OVER (PARTITION BY waitlist_entries.slot_id'
+        ' ORDER BY waitlist_entries.id)' in sql
+    )
+
+
+@pytest.mark.asyncio
+async def test_events_stream_pushes_promotions(app, client):
+    user_id = uuid.uuid4()
+
+    class FakeCache:
+        channel = None
+
+        async def listen(self, channel, timeout):
+            FakeCache.channel = channel
+            yield None
+            yield {'event': 'promoted', 'slot_id': 7, 'booking_id': 100}
+
+    app.dependency_overrides[current_user] = lambda: SimpleNamespace(
+        id=user_id, is_superuser=False
+    )
+    app.dependency_overrides[get_cache] = lambda: FakeCache()
+
+    response = await client.get('/waitlist/events')
+
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/event-stream')
+    assert FakeCache.channel == f'waitlist-{user_id}'
+    assert response.text == (
+        ': connected\n\n'
+        ': keep-alive\n\n'
+        'event: promoted\ndata: {"slot_id": 7, "booking_id": 100}\n\n'
+    )
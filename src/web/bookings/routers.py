@@ -1,13 +1,15 @@
 import sqlalchemy
 from fastapi import APIRouter, Depends
 from fastapi_filter import FilterDepends
-from sqlalchemy import select
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 from starlette.responses import Response
 
-from database.models import Bookings, User
-from dependencies import get_db_session
+from core.etag import conditional_get
+from core.simple_cache import Cache
+from database.models import Bookings, Slots, User
+from dependencies import get_cache, get_db_session
 from starlette.exceptions import HTTPException
 
 from main_schemas import ResponseErrorBody
@@ -16,6 +18,8 @@ from web.bookings.schemas import (
     Booking,
     BookingCreateInput,
     BookingCreateByAdminInput,
+    BulkBookingInput,
+    BulkBookingResult,
     DetailedBooking,
 )
 from web.bookings.services import (
@@ -23,10 +27,17 @@ from web.bookings.services import (
     NotFoundSlotError,
     DuplicateBookingError,
     ExcessiveBookingError,
+    BulkBookingError,
+    BOOKING_CREATED,
+    create_bulk_bookings,
+    get_series_slot_ids,
+    release_places,
     update_booking_in_db,
     calculate_sprints_data, calculate_booking_metrics,
 )
-from web.users.users import current_superuser, current_user
+from web.users.users import AuthPrincipal, current_superuser, current_user
+from web.slots.schedule import refresh_schedule
+from web.waitlist.services import notify_promoted, promote_from_waitlist
 
 router = APIRouter(
     prefix='/bookings',
@@ -34,10 +45,30 @@ router = APIRouter(
 )
 
 
+async def _bookings_version(
+    booking_filter: BookingsFilter = FilterDepends(BookingsFilter),
+    db_session: AsyncSession = Depends(get_db_session),
+):
+    bookings = booking_filter.filter(
+        select(Bookings.id, Bookings.slot_id, Bookings.updated_at)
+    ).subquery()
+    query = select(
+        func.count(),
+        func.max(bookings.c.updated_at),
+        select(func.max(Slots.updated_at))
+        .where(Slots.id.in_(select(bookings.c.slot_id)))
+        .scalar_subquery(),
+    ).select_from(bookings)
+    return tuple((await db_session.execute(query)).one())
+
+
 @router.get(
     '/',
     response_model=list[Booking],
-    dependencies=[Depends(current_superuser)],
+    dependencies=[
+        Depends(current_superuser),
+        Depends(conditional_get(_bookings_version)),
+    ],
 )
 async def get_all_bookings(
     db_session: AsyncSession = Depends(get_db_session),
@@ -57,7 +88,7 @@ async def get_all_bookings(
 async def get_booking_by_id(
     booking_id: int,
     db_session: AsyncSession = Depends(get_db_session),
-    user: User = Depends(current_user),
+    user: AuthPrincipal = Depends(current_user),
 ):
     query = select(Bookings).where(Bookings.id == booking_id)
     booking = await db_session.scalar(query)
@@ -91,7 +122,8 @@ async def get_booking_by_id(
 async def create_user_booking(
     booking_input: BookingCreateInput,
     db_session: AsyncSession = Depends(get_db_session),
-    user: User = Depends(current_user),
+    user: AuthPrincipal = Depends(current_user),
+    cache: Cache = Depends(get_cache),
 ):
     if user.is_superuser:
         raise HTTPException(
@@ -115,6 +147,7 @@ async def create_user_booking(
         db_session.add(db_booking)
         await db_session.commit()
         await db_session.refresh(db_booking)
+        await refresh_schedule(db_session, cache, [db_booking.slot_id])
         return db_booking
     except sqlalchemy.exc.IntegrityError as e:
         raise HTTPException(
@@ -140,6 +173,7 @@ async def create_user_booking(
 async def create_admin_booking(
     booking_input: BookingCreateByAdminInput,
     db_session: AsyncSession = Depends(get_db_session),
+    cache: Cache = Depends(get_cache),
 ):
     query = select(User).filter(User.id == booking_input.user_id)
     user = await db_session.scalar(query)
@@ -164,6 +198,7 @@ async def create_admin_booking(
         db_session.add(db_booking)
         await db_session.commit()
         await db_session.refresh(db_booking)
+        await refresh_schedule(db_session, cache, [db_booking.slot_id])
         return db_booking
     except sqlalchemy.exc.IntegrityError as e:
         raise HTTPException(
@@ -172,6 +207,59 @@ async def create_admin_booking(
         )
 
 
+@router.post(
+    '/bulk',
+    response_model=BulkBookingResult,
+    status_code=status.HTTP_200_OK,
+    responses={
+        status.HTTP_400_BAD_REQUEST: {
+            'model': ResponseErrorBody,
+        },
+    },
+    dependencies=[Depends(current_superuser)],
+)
+async def create_bulk_admin_bookings(
+    booking_input: BulkBookingInput,
+    db_session: AsyncSession = Depends(get_db_session),
+    cache: Cache = Depends(get_cache),
+):
+    try:
+        slot_ids = list(booking_input.slot_ids)
+        if booking_input.series is not None:
+            slot_ids += await get_series_slot_ids(
+                db_session,
+                booking_input.series.slot_id,
+                booking_input.series.weeks,
+            )
+        outcomes = await create_bulk_bookings(
+            db_session,
+            slot_ids,
+            booking_input.user_ids,
+            booking_input.created_at,
+            booking_input.source_record,
+        )
+        await db_session.commit()
+    except (NotFoundSlotError, BulkBookingError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f'Can not create Bookings: {e}',
+        )
+    except sqlalchemy.exc.IntegrityError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f'Some error while creating Bookings: {e}',
+        )
+    await refresh_schedule(
+        db_session,
+        cache,
+        {o['slot_id'] for o in outcomes if o['status'] == BOOKING_CREATED},
+    )
+    return {
+        'created': sum(1 for o in outcomes if o['status'] == BOOKING_CREATED),
+        'outcomes': outcomes,
+    }
+
+
 @router.delete(
     '/{booking_id}',
     status_code=status.HTTP_204_NO_CONTENT,
@@ -185,7 +273,8 @@ async def create_admin_booking(
 async def delete_booking(
     booking_id: int,
     db_session: AsyncSession = Depends(get_db_session),
-    user: User = Depends(current_user),
+    user: AuthPrincipal = Depends(current_user),
+    cache: Cache = Depends(get_cache),
 ):
     query = select(Bookings).filter(Bookings.id == booking_id)
     booking = await db_session.scalar(query)
@@ -200,6 +289,11 @@ async def delete_booking(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail='You do not have permission to delete this booking',
             )
+    await release_places(db_session, booking.slot_id)
     await db_session.delete(booking)
+    slot_id = booking.slot_id
+    promoted = await promote_from_waitlist(db_session, slot_id)
     await db_session.commit()
+    await notify_promoted(cache, promoted)
+    await refresh_schedule(db_session, cache, [slot_id])
     return Response(status_code=status.HTTP_204_NO_CONTENT)
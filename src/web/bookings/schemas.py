@@ -48,3 +48,28 @@ class BookingCreateByAdminInput(BaseModel):
     created_at: datetime
     slot_id: int
     source_record: str | None = None
+
+
+class BookingSeries(BaseModel):
+    slot_id: int
+    weeks: int
+
+
+class BulkBookingInput(BaseModel):
+    user_ids: list[uuid.UUID]
+    slot_ids: list[int] = []
+    series: BookingSeries | None = None
+    created_at: datetime
+    source_record: str | None = None
+
+
+class BulkBookingOutcome(BaseModel):
+    user_id: uuid.UUID
+    slot_id: int
+    status: str
+    booking_id: int | None = None
+
+
+class BulkBookingResult(BaseModel):
+    created: int
+    outcomes: list[BulkBookingOutcome]
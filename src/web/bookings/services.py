@@ -1,4 +1,18 @@
-from sqlalchemy import select
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Iterable
+
+from sqlalchemy import (
+    BigInteger,
+    Integer,
+    column,
+    func,
+    select,
+    update,
+    values,
+)
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from constants import (
@@ -6,6 +20,8 @@ from constants import (
     KOEF_POWER,
     DEGREE_POWER,
     TEMPO_BORDER_PERCENT,
+    MAX_BULK_BOOKINGS,
+    MAX_BOOKING_SERIES_WEEKS,
 )
 from database.models import Slots, Bookings, User, Sprints
 
@@ -22,28 +38,237 @@ class ExcessiveBookingError(Exception):
     pass
 
 
+class BulkBookingError(Exception):
+    pass
+
+
+BOOKING_CREATED = 'created'
+BOOKING_DUPLICATE = 'duplicate'
+BOOKING_FULL = 'full'
+BOOKING_SLOT_NOT_FOUND = 'slot_not_found'
+BOOKING_USER_NOT_FOUND = 'user_not_found'
+BOOKING_SUPERUSER = 'superuser'
+
+
+async def reserve_places(
+    db_session: AsyncSession, slot_id: int, places: int = 1
+) -> None:
+    """Take ``places`` in the slot in the caller's transaction, or fail if
+    they are not free. The conditional update locks only this slot's row
+    until commit, so concurrent bookings of one slot queue up behind each
+    other and the count can not go past number_of_places."""
+    query = (
+        update(Slots)
+        .where(
+            Slots.id == slot_id,
+            Slots.booked_count + places <= Slots.number_of_places,
+        )
+        .values(booked_count=Slots.booked_count + places)
+        .returning(Slots.id)
+        .execution_options(synchronize_session=False)
+    )
+    if await db_session.scalar(query) is not None:
+        return
+    query = select(Slots.id).where(Slots.id == slot_id)
+    if await db_session.scalar(query) is None:
+        raise NotFoundSlotError(f'Slot with id {slot_id} not found')
+    raise ExcessiveBookingError('This slot is already fully booked.')
+
+
+async def release_places(
+    db_session: AsyncSession, slot_id: int, places: int = 1
+) -> None:
+    await db_session.execute(
+        update(Slots)
+        .where(Slots.id == slot_id)
+        .values(booked_count=func.greatest(Slots.booked_count - places, 0))
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def release_user_places(
+    db_session: AsyncSession, user_id: uuid.UUID
+) -> list[int]:
+    """Give back the places of every booking of a user about to be
+    deleted; the bookings themselves go with the user's row. Returns the
+    ids of the slots that got places back."""
+    booked = (
+        select(Bookings.slot_id, func.count().label('places'))
+        .where(Bookings.user_id == user_id)
+        .group_by(Bookings.slot_id)
+        .subquery()
+    )
+    result = await db_session.execute(
+        update(Slots)
+        .where(Slots.id == booked.c.slot_id)
+        .values(
+            booked_count=func.greatest(
+                Slots.booked_count - booked.c.places, 0
+            )
+        )
+        .returning(Slots.id)
+        .execution_options(synchronize_session=False)
+    )
+    return [row.id for row in result.all()]
+
+
 async def check_before_create(
     slot_id: int,
     user: User,
     db_session: AsyncSession,
 ) -> None:
-    query = select(Slots).filter(Slots.id == slot_id)
-    slot = await db_session.scalar(query)
-    if slot is None:
+    """Reserves the place for the booking as well; the caller inserts it
+    in the same transaction."""
+    query = select(Bookings.id).where(
+        Bookings.user_id == user.id, Bookings.slot_id == slot_id
+    )
+    if await db_session.scalar(query.limit(1)) is not None:
+        raise DuplicateBookingError(
+            'Already exist booking for this user in this slot.'
+        )
+    await reserve_places(db_session, slot_id)
+
+
+async def get_series_slot_ids(
+    db_session: AsyncSession, slot_id: int, weeks: int
+) -> list[int]:
+    """Slots of the same type at the same time of week as ``slot_id``,
+    for ``weeks`` weeks starting with it."""
+    if not 1 <= weeks <= MAX_BOOKING_SERIES_WEEKS:
+        raise BulkBookingError(
+            f'Series must be 1 to {MAX_BOOKING_SERIES_WEEKS} weeks long.'
+        )
+    query = select(Slots.type, Slots.time).where(Slots.id == slot_id)
+    first = (await db_session.execute(query)).first()
+    if first is None:
         raise NotFoundSlotError(f'Slot with id {slot_id} not found')
-    query = select(Bookings).filter(Bookings.user_id == user.id)
-    result = await db_session.execute(query)
-    exists_user_bookings = result.scalars().all()
-    for booking in exists_user_bookings:
-        if booking.slot_id == slot_id:
-            raise DuplicateBookingError(
-                'Already exist booking for this user in this slot.'
+    query = (
+        select(Slots.id)
+        .where(
+            Slots.type.is_not_distinct_from(first.type),
+            Slots.time.in_(
+                [first.time + timedelta(weeks=i) for i in range(weeks)]
+            ),
+        )
+        .order_by(Slots.time.asc())
+    )
+    return list((await db_session.scalars(query)).all())
+
+
+async def create_bulk_bookings(
+    db_session: AsyncSession,
+    slot_ids: Iterable[int],
+    user_ids: Iterable[uuid.UUID],
+    created_at: datetime,
+    source_record: str | None = None,
+) -> list[dict]:
+    """Book every user into every slot, as far as places allow, in the
+    caller's transaction. The slots are locked while their booked counts
+    are read, existing bookings come from one aggregate query and the
+    bookings are inserted in one statement. Returns the outcome of every
+    (user, slot) pair; slots are filled in the order users are given."""
+    slot_ids = list(dict.fromkeys(slot_ids))
+    user_ids = list(dict.fromkeys(user_ids))
+    if not slot_ids or not user_ids:
+        raise BulkBookingError('At least one slot and one user are required.')
+    if len(slot_ids) * len(user_ids) > MAX_BULK_BOOKINGS:
+        raise BulkBookingError(
+            f'Too many bookings: {len(slot_ids) * len(user_ids)}'
+            f' > {MAX_BULK_BOOKINGS}.'
+        )
+
+    # locked in id order so bulk requests do not deadlock each other;
+    # reserve_places waits on the same row locks
+    query = (
+        select(Slots.id, Slots.number_of_places, Slots.booked_count)
+        .where(Slots.id.in_(slot_ids))
+        .order_by(Slots.id.asc())
+        .with_for_update()
+    )
+    slots = {row.id: row for row in (await db_session.execute(query)).all()}
+    query = (
+        select(
+            Bookings.slot_id,
+            func.array_agg(Bookings.user_id).label('user_ids'),
+        )
+        .where(
+            Bookings.slot_id.in_(slot_ids),
+            Bookings.user_id.in_(user_ids),
+        )
+        .group_by(Bookings.slot_id)
+    )
+    booked = {
+        row.slot_id: set(row.user_ids)
+        for row in (await db_session.execute(query)).all()
+    }
+    query = select(User.id, User.is_superuser).where(User.id.in_(user_ids))
+    users = {
+        row.id: row.is_superuser
+        for row in (await db_session.execute(query)).all()
+    }
+
+    outcomes = {}
+    rows = []
+    for slot_id in slot_ids:
+        slot = slots.get(slot_id)
+        booked_users = booked.get(slot_id, set())
+        free = slot.number_of_places - slot.booked_count if slot else 0
+        for user_id in user_ids:
+            if slot is None:
+                status = BOOKING_SLOT_NOT_FOUND
+            elif user_id not in users:
+                status = BOOKING_USER_NOT_FOUND
+            elif users[user_id]:
+                status = BOOKING_SUPERUSER
+            elif user_id in booked_users:
+                status = BOOKING_DUPLICATE
+            elif free <= 0:
+                status = BOOKING_FULL
+            else:
+                free -= 1
+                rows.append(
+                    {
+                        'user_id': user_id,
+                        'slot_id': slot_id,
+                        'created_at': created_at,
+                        'source_record': source_record,
+                    }
+                )
+                # booked concurrently if the insert skips it
+                status = BOOKING_DUPLICATE
+            outcomes[(user_id, slot_id)] = {
+                'user_id': user_id,
+                'slot_id': slot_id,
+                'status': status,
+                'booking_id': None,
+            }
+
+    if rows:
+        statement = (
+            insert(Bookings)
+            .values(rows)
+            .on_conflict_do_nothing(constraint='uix_user_slot')
+            .returning(Bookings.id, Bookings.user_id, Bookings.slot_id)
+        )
+        created = defaultdict(int)
+        for row in (await db_session.execute(statement)).all():
+            outcome = outcomes[(row.user_id, row.slot_id)]
+            outcome['status'] = BOOKING_CREATED
+            outcome['booking_id'] = row.id
+            created[row.slot_id] += 1
+        if created:
+            counts = values(
+                column('slot_id', BigInteger),
+                column('places', Integer),
+                name='created',
+            ).data(list(created.items()))
+            await db_session.execute(
+                update(Slots)
+                .where(Slots.id == counts.c.slot_id)
+                .values(booked_count=Slots.booked_count + counts.c.places)
+                .execution_options(synchronize_session=False)
             )
-    query = select(Bookings).filter(Bookings.slot_id == slot_id)
-    result = await db_session.execute(query)
-    exists_slot_bookings = result.scalars().all()
-    if len(exists_slot_bookings) >= slot.number_of_places:
-        raise ExcessiveBookingError('This slot is already fully booked.')
+    return list(outcomes.values())
 
 
 async def update_booking_in_db(
@@ -75,6 +300,29 @@ async def calculate_sprints_data(
     return sprints_data
 
 
+async def calculate_slots_sprints_data(
+    slot_ids: Iterable[int],
+    db_session: AsyncSession,
+) -> dict[tuple[int, str], dict]:
+    """calculate_sprints_data for every sensor of the given slots in one
+    query, keyed by (slot_id, sensor_id). Only results are selected, the
+    raw hits stay in the database."""
+    query = select(
+        Sprints.slot_id,
+        Sprints.sensor_id,
+        Sprints.sprint_id,
+        Sprints.result,
+    ).where(
+        Sprints.slot_id.in_(set(slot_ids)),
+        Sprints.sensor_id.is_not(None),
+    )
+    result = await db_session.execute(query)
+    sprints_data = defaultdict(dict)
+    for slot_id, sensor_id, sprint_id, sprint_result in result:
+        sprints_data[(slot_id, sensor_id)][str(sprint_id)] = sprint_result or {}
+    return sprints_data
+
+
 def calculate_booking_metrics(booking, sprints_data: dict) -> None:
     len_sprints_data = len(sprints_data)
     if len_sprints_data > 0:
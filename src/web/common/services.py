@@ -1,8 +1,8 @@
 import contextlib
 import logging
-from logging import config as logging_config
 
 import settings
+from core.log_pipeline import setup_logging
 from database.models.users import get_user_db
 from dependencies import get_db_session
 from fastapi_users.exceptions import UserAlreadyExists
@@ -10,7 +10,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from web.users.schemas import UserCreate
 from web.users.users import get_user_manager
 
-logging_config.dictConfig(settings.LOGGING)
+setup_logging(settings.LOGGING)
 logger = logging.getLogger('control')
 
 
@@ -0,0 +1,91 @@
+import threading
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Query
+from starlette import status
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+
+from main_schemas import ResponseErrorBody
+from monitoring.instumentator import verify_metrics_creds
+from monitoring.profiler import ProfilerBusy, run_profile, tracemalloc_top
+
+router = APIRouter(
+    prefix='/debug',
+    tags=['debug'],
+    dependencies=[Depends(verify_metrics_creds)],
+    include_in_schema=False,
+)
+
+
+@router.get(
+    '/profile',
+    responses={
+        status.HTTP_409_CONFLICT: {
+            'model': ResponseErrorBody,
+        },
+    },
+)
+async def profile(
+    seconds: float = Query(10, gt=0, le=300),
+    interval_ms: float = Query(5, ge=1, le=100),
+    route: str | None = Query(
+        None, description='e.g. "POST /api/v1/sensors/hits/bulk"'
+    ),
+    requests: int | None = Query(None, gt=0),
+    all_threads: bool = False,
+):
+    """Sample the running process and return a speedscope profile.
+
+    By default only the event loop thread is sampled for ``seconds``.
+    With ``route`` only stacks serving that route are kept, and with
+    ``requests`` the profile ends once that many of its requests have
+    finished (``seconds`` still caps it).
+    """
+    thread_ids = None if all_threads else {threading.get_ident()}
+    try:
+        profiler = await run_profile(
+            seconds,
+            interval_ms / 1000,
+            thread_ids=thread_ids,
+            route=route,
+            requests=requests if route else None,
+        )
+    except ProfilerBusy as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e),
+        )
+    name = route or ('all threads' if all_threads else 'event loop')
+    return JSONResponse(
+        profiler.to_speedscope(f'fitbox: {name}'),
+        headers={
+            'Content-Disposition': (
+                'attachment; filename="fitbox.speedscope.json"'
+            ),
+        },
+    )
+
+
+@router.get(
+    '/tracemalloc',
+    responses={
+        status.HTTP_409_CONFLICT: {
+            'model': ResponseErrorBody,
+        },
+    },
+)
+async def tracemalloc_snapshot(
+    seconds: float = Query(10, ge=0, le=300),
+    limit: int = Query(30, gt=0, le=500),
+    group_by: Literal['lineno', 'filename', 'traceback'] = 'lineno',
+):
+    """Top allocation sites, traced for ``seconds`` unless tracemalloc
+    is already running."""
+    try:
+        return await tracemalloc_top(seconds, limit, group_by)
+    except ProfilerBusy as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e),
+        )
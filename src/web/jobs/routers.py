@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends
+from starlette import status
+from starlette.exceptions import HTTPException
+
+from core.jobs import JobQueue
+from dependencies import get_jobs
+from main_schemas import ResponseErrorBody
+from web.jobs.schemas import Job
+from web.users.users import current_user
+
+router = APIRouter(
+    prefix='/jobs',
+    tags=['jobs'],
+)
+
+
+@router.get(
+    '/{job_id:int}',
+    response_model=Job,
+    responses={
+        status.HTTP_404_NOT_FOUND: {
+            'model': ResponseErrorBody,
+        },
+    },
+    dependencies=[Depends(current_user)],
+)
+async def get_job(
+    job_id: int,
+    jobs: JobQueue = Depends(get_jobs),
+):
+    job = await jobs.get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f'Job with id {job_id} not found',
+        )
+    return job
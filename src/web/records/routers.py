@@ -13,7 +13,7 @@ from starlette.exceptions import HTTPException
 from main_schemas import ResponseErrorBody
 from web.records.filters import RecordsFilter
 from web.records.schemas import Record, RecordCreateInput, RecordCreateByAdminInput
-from web.users.users import current_superuser, current_user
+from web.users.users import AuthPrincipal, current_superuser, current_user
 
 router = APIRouter(
     prefix='/records',
@@ -52,7 +52,7 @@ async def get_all_records(
 async def create_user_record(
     record_input: RecordCreateInput,
     db_session: AsyncSession = Depends(get_db_session),
-    user: User = Depends(current_user)
+    user: AuthPrincipal = Depends(current_user)
 ):
     if user.is_superuser:
         raise HTTPException(
@@ -143,7 +143,7 @@ async def create_admin_record(
 async def delete_record(
     record_id: int,
     db_session: AsyncSession = Depends(get_db_session),
-    user: User = Depends(current_user)
+    user: AuthPrincipal = Depends(current_user)
 ):
     query = select(Records).filter(Records.id == record_id)
     record = await db_session.scalar(query)
@@ -0,0 +1,17 @@
+import uuid
+from datetime import datetime
+
+from fastapi_filter.contrib.sqlalchemy import Filter
+from pydantic import Field
+
+from database.models import SprintRollups
+
+
+class RollupsFilter(Filter):
+    user_id__in: list[uuid.UUID] | None = Field(default=None)
+    sensor_id__in: list[str] | None = Field(default=None)
+    slot_time__gte: datetime | None = Field(default=None)
+    slot_time__lt: datetime | None = Field(default=None)
+
+    class Constants(Filter.Constants):
+        model = SprintRollups
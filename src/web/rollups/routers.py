@@ -0,0 +1,87 @@
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Query
+from fastapi_filter import FilterDepends
+from sqlalchemy import Select, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from constants import ROLLUP_FORCE_EDGES
+from core.etag import conditional_get
+from database.models import SprintRollups
+from dependencies import get_db_session
+from web.rollups.filters import RollupsFilter
+from web.rollups.schemas import RollupSummaryResponse, SprintRollup
+from web.rollups.services import get_rollup_summary
+from web.users.users import AuthPrincipal, current_user
+
+router = APIRouter(
+    prefix='/rollups',
+    tags=['rollups'],
+)
+
+ROLLUPS_CACHE_CONTROL = 'private, max-age=60'
+
+
+def _scoped(
+    query: Select, rollups_filter: RollupsFilter, user: AuthPrincipal
+) -> Select:
+    query = rollups_filter.filter(query)
+    if not user.is_superuser:
+        query = query.where(SprintRollups.user_id == user.id)
+    return query
+
+
+async def _rollups_version(
+    rollups_filter: RollupsFilter = FilterDepends(RollupsFilter),
+    db_session: AsyncSession = Depends(get_db_session),
+    user: AuthPrincipal = Depends(current_user),
+):
+    # rollups only change when a sprint is finalized or recalculated
+    rollups = _scoped(
+        select(SprintRollups.updated_at), rollups_filter, user
+    ).subquery()
+    query = select(func.count(), func.max(rollups.c.updated_at))
+    row = (await db_session.execute(query)).one()
+    return None if user.is_superuser else user.id, *row
+
+
+@router.get(
+    '/',
+    response_model=list[SprintRollup],
+    dependencies=[
+        Depends(conditional_get(_rollups_version, ROLLUPS_CACHE_CONTROL)),
+    ],
+)
+async def get_rollups(
+    limit: int = Query(500, gt=0, le=5000),
+    rollups_filter: RollupsFilter = FilterDepends(RollupsFilter),
+    db_session: AsyncSession = Depends(get_db_session),
+    user: AuthPrincipal = Depends(current_user),
+):
+    query = _scoped(select(SprintRollups), rollups_filter, user)
+    query = query.order_by(
+        SprintRollups.slot_time.desc(), SprintRollups.sprint_id.asc()
+    ).limit(limit)
+    result = await db_session.scalars(query)
+    return result.all()
+
+
+@router.get(
+    '/summary',
+    response_model=RollupSummaryResponse,
+    dependencies=[
+        Depends(conditional_get(_rollups_version, ROLLUPS_CACHE_CONTROL)),
+    ],
+)
+async def get_rollups_summary(
+    period: Literal['day', 'week', 'month'] = 'day',
+    rollups_filter: RollupsFilter = FilterDepends(RollupsFilter),
+    db_session: AsyncSession = Depends(get_db_session),
+    user: AuthPrincipal = Depends(current_user),
+):
+    query = _scoped(select(SprintRollups), rollups_filter, user)
+    return {
+        'period': period,
+        'force_edges': list(ROLLUP_FORCE_EDGES),
+        'items': await get_rollup_summary(db_session, query, period),
+    }
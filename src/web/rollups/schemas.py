@@ -0,0 +1,45 @@
+import uuid
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class SprintRollup(BaseModel):
+    slot_id: int
+    sprint_id: int
+    sensor_id: str
+    user_id: uuid.UUID | None
+    slot_time: datetime | None
+    hit_count: int
+    timed_count: int
+    synced_count: int
+    force_sum: float
+    force_max: float
+    force_hist: list[int]
+    duration_ms: int
+    timeline_bucket_ms: int
+    timeline: list[int]
+    tempo: float | None
+    power: float | None
+    energy: float | None
+
+    model_config = {"from_attributes": True}
+
+
+class RollupSummary(BaseModel):
+    period_start: datetime | None
+    sprints: int
+    hits: int
+    sync_rate: float | None
+    avg_force: float | None
+    max_force: float | None
+    tempo: float | None
+    power: float | None
+    energy: float | None
+    force_hist: list[int]
+
+
+class RollupSummaryResponse(BaseModel):
+    period: str
+    force_edges: list[float]
+    items: list[RollupSummary]
@@ -0,0 +1,214 @@
+from bisect import bisect_right
+from datetime import datetime, timezone
+from typing import Sequence
+
+from sqlalchemy import Select, func, literal_column, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from constants import (
+    DEFAULT_BLINK_INTERVAL,
+    ROLLUP_FORCE_EDGES,
+    ROLLUP_MAX_TIMELINE_BUCKETS,
+    ROLLUP_TIMELINE_BUCKET_MS,
+)
+from database.models import Bookings, Slots, SprintRollups, Sprints
+from web.sensors.archive import load_archived_hits
+from web.sensors.services import (
+    get_forces_and_times,
+    get_sprint_columns,
+    is_synced_hit,
+)
+
+ROLLUP_PERIODS = ('day', 'week', 'month')
+
+
+def build_sprint_rollup(hits: list, blink_interval: float) -> dict:
+    """Compact aggregates of one sprint's hits: force histogram, how many
+    hits landed on the blink and hits per time bucket."""
+    return build_column_rollup(*get_forces_and_times(hits), blink_interval)
+
+
+def build_column_rollup(
+    forces: list[float], times: list[int | None], blink_interval: float
+) -> dict:
+    hist = [0] * len(ROLLUP_FORCE_EDGES)
+    for force in forces:
+        hist[max(bisect_right(ROLLUP_FORCE_EDGES, force) - 1, 0)] += 1
+
+    timed = [t for t in times if t is not None]
+    synced = sum(1 for t in timed if is_synced_hit(t, blink_interval))
+    duration = max(timed) - min(timed) if timed else 0
+    bucket_ms = ROLLUP_TIMELINE_BUCKET_MS
+    while duration // bucket_ms + 1 > ROLLUP_MAX_TIMELINE_BUCKETS:
+        bucket_ms *= 2
+    timeline = [0] * (duration // bucket_ms + 1) if timed else []
+    if timed:
+        start = min(timed)
+        for t in timed:
+            timeline[(t - start) // bucket_ms] += 1
+
+    return {
+        'hit_count': len(forces),
+        'timed_count': len(timed),
+        'synced_count': synced,
+        'force_sum': float(sum(forces)),
+        'force_max': float(max(forces, default=0.0)),
+        'force_hist': hist,
+        'duration_ms': duration,
+        'timeline_bucket_ms': bucket_ms,
+        'timeline': timeline,
+    }
+
+
+def _rollup_values(sprint: Sprints, now: datetime) -> dict:
+    data = sprint.data or {}
+    result = sprint.result or {}
+    values = build_column_rollup(
+        *get_sprint_columns(data, sprint.hits_blob),
+        float(data.get('blink_interval') or DEFAULT_BLINK_INTERVAL),
+    )
+    values.update(
+        slot_id=sprint.slot_id,
+        sprint_id=sprint.sprint_id,
+        sensor_id=sprint.sensor_id,
+        user_id=(
+            select(Bookings.user_id)
+            .where(
+                Bookings.slot_id == sprint.slot_id,
+                Bookings.sensor_id == sprint.sensor_id,
+            )
+            .limit(1)
+            .scalar_subquery()
+        ),
+        slot_time=(
+            select(Slots.time)
+            .where(Slots.id == sprint.slot_id)
+            .scalar_subquery()
+        ),
+        tempo=result.get('tempo'),
+        power=result.get('power'),
+        energy=result.get('energy'),
+        updated_at=now,
+    )
+    return values
+
+
+async def save_sprint_rollups(
+    db_session: AsyncSession, sprints: Sequence[Sprints]
+) -> None:
+    """Upsert the rollups of finalized sprints in one statement, in the
+    caller's transaction. The member and the class time are looked up
+    from the booking and the slot. Archived hits are read back first; a
+    sprint whose archive is missing keeps its previous rollup."""
+    await load_archived_hits(db_session, sprints)
+    rows = [
+        _rollup_values(sprint, datetime.now(timezone.utc))
+        for sprint in sprints
+        if sprint.sensor_id
+        and (sprint.archived_at is None or sprint.hits_blob is not None)
+    ]
+    if not rows:
+        return
+    statement = insert(SprintRollups).values(rows)
+    statement = statement.on_conflict_do_update(
+        constraint='uix_sprint_rollup',
+        set_={
+            name: statement.excluded[name]
+            for name in rows[0]
+            if name not in ('slot_id', 'sprint_id', 'sensor_id')
+        },
+    )
+    await db_session.execute(statement)
+
+
+def _period_start(period: str, column):
+    # inlined rather than bound, so SELECT and GROUP BY match
+    if period not in ROLLUP_PERIODS:
+        raise ValueError(f'Unknown rollup period {period}')
+    return func.date_trunc(literal_column(f"'{period}'"), column)
+
+
+def rollup_summary_query(query: Select, period: str) -> Select:
+    """Per-period totals over the rollups ``query`` selects from."""
+    rollups = query.subquery()
+    period_start = _period_start(period, rollups.c.slot_time)
+    return (
+        select(
+            period_start.label('period_start'),
+            func.count().label('sprints'),
+            func.sum(rollups.c.hit_count).label('hits'),
+            func.sum(rollups.c.timed_count).label('timed_hits'),
+            func.sum(rollups.c.synced_count).label('synced_hits'),
+            func.sum(rollups.c.force_sum).label('force_sum'),
+            func.max(rollups.c.force_max).label('force_max'),
+            func.avg(rollups.c.tempo).label('tempo'),
+            func.avg(rollups.c.power).label('power'),
+            func.avg(rollups.c.energy).label('energy'),
+        )
+        .group_by(period_start)
+        .order_by(period_start)
+    )
+
+
+def rollup_histogram_query(query: Select, period: str) -> Select:
+    """Force histograms summed bucket by bucket per period."""
+    rollups = query.subquery()
+    period_start = _period_start(period, rollups.c.slot_time)
+    buckets = (
+        func.unnest(rollups.c.force_hist)
+        .table_valued('count', with_ordinality='bucket')
+        .lateral('buckets')
+    )
+    return (
+        select(
+            period_start.label('period_start'),
+            buckets.c.bucket,
+            func.sum(buckets.c.count).label('count'),
+        )
+        .select_from(rollups.join(buckets, buckets.c.bucket > 0))
+        .group_by(period_start, buckets.c.bucket)
+    )
+
+
+async def get_rollup_summary(
+    db_session: AsyncSession, query: Select, period: str
+) -> list[dict]:
+    rows = (await db_session.execute(rollup_summary_query(query, period))).all()
+    hist_rows = await db_session.execute(rollup_histogram_query(query, period))
+    histograms: dict = {}
+    for row in hist_rows:
+        hist = histograms.setdefault(
+            row.period_start, [0] * len(ROLLUP_FORCE_EDGES)
+        )
+        if row.bucket <= len(hist):
+            hist[row.bucket - 1] = int(row.count)
+
+    summary = []
+    for row in rows:
+        hits = int(row.hits or 0)
+        timed = int(row.timed_hits or 0)
+        summary.append(
+            {
+                'period_start': row.period_start,
+                'sprints': row.sprints,
+                'hits': hits,
+                'sync_rate': (
+                    round(100.0 * int(row.synced_hits or 0) / timed, 2)
+                    if timed else None
+                ),
+                'avg_force': round(row.force_sum / hits, 2) if hits else None,
+                'max_force': row.force_max,
+                'tempo': _round(row.tempo),
+                'power': _round(row.power),
+                'energy': _round(row.energy),
+                'force_hist': histograms.get(
+                    row.period_start, [0] * len(ROLLUP_FORCE_EDGES)
+                ),
+            }
+        )
+    return summary
+
+
+def _round(value):
+    return round(float(value), 2) if value is not None else None
@@ -0,0 +1,159 @@
+from datetime import datetime, timedelta, timezone
+from typing import Sequence
+
+from sqlalchemy import Text, literal, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import flag_modified, set_committed_value
+
+import settings
+from core.hits_codec import encode_hits
+from core.ttl_cache import TTLCache
+from database.models import Slots, SprintHitsArchive, Sprints
+
+ARCHIVE_CACHE_TTL = 60 * 60
+
+archive_cache = TTLCache(
+    ttl=ARCHIVE_CACHE_TTL, maxsize=settings.HITS_ARCHIVE_CACHE_SIZE
+)
+
+
+async def load_archived_hits(
+    db_session: AsyncSession, sprints: Sequence[Sprints]
+) -> None:
+    """Put archived raw hits back on ``sprints`` so the usual readers see
+    them. The value is set as if loaded from the database, so it is not
+    written back to ``sprints`` on commit."""
+    missing = {}
+    for sprint in sprints:
+        if sprint.archived_at is None or sprint.hits_blob is not None:
+            continue
+        blob = archive_cache.get(sprint.id)
+        if blob is None:
+            missing[sprint.id] = sprint
+        else:
+            set_committed_value(sprint, 'hits_blob', blob)
+    if not missing:
+        return
+    rows = await db_session.execute(
+        select(SprintHitsArchive.sprint_pk, SprintHitsArchive.hits_blob)
+        .where(SprintHitsArchive.sprint_pk.in_(missing))
+    )
+    for row in rows:
+        archive_cache.set(row.sprint_pk, row.hits_blob)
+        set_committed_value(missing[row.sprint_pk], 'hits_blob', row.hits_blob)
+
+
+def unarchive(sprint: Sprints) -> None:
+    """Make the hot copy authoritative again before hits are changed;
+    call after load_archived_hits."""
+    sprint.archived_at = None
+    flag_modified(sprint, 'hits_blob')
+    archive_cache.delete(sprint.id)
+
+
+async def find_archivable_slots(
+    db_session: AsyncSession, older_than: datetime
+) -> list[int]:
+    query = (
+        select(Slots.id)
+        .where(
+            Slots.is_done.is_(True),
+            Slots.time < older_than,
+            select(Sprints.id)
+            .where(
+                Sprints.slot_id == Slots.id,
+                Sprints.archived_at.is_(None),
+                (Sprints.hits_blob.isnot(None) | Sprints.data.has_key('hits')),
+            )
+            .exists(),
+        )
+        .order_by(Slots.time.asc())
+    )
+    return list((await db_session.scalars(query)).all())
+
+
+async def _encode_legacy_hits(db_session: AsyncSession, slot_id: int) -> None:
+    rows = await db_session.execute(
+        select(Sprints.id, Sprints.data['hits'].label('hits')).where(
+            Sprints.slot_id == slot_id,
+            Sprints.hits_blob.is_(None),
+            Sprints.data.has_key('hits'),
+        )
+    )
+    for row in rows.all():
+        hits = row.hits or []
+        try:
+            blob = encode_hits(
+                [int(h['timeMs']) for h in hits],
+                [float(h['maxAccel']) for h in hits],
+            )
+        except (KeyError, TypeError, ValueError):
+            # left hot, scripts/encode_hits.py reports these
+            continue
+        await db_session.execute(
+            update(Sprints)
+            .where(Sprints.id == row.id)
+            .values(
+                hits_blob=blob,
+                data=Sprints.data.op('-')(literal('hits', Text)),
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+
+async def archive_slot_hits(db_session: AsyncSession, slot_id: int) -> int:
+    """Move the raw hits of one slot's sprints to the cold table, in the
+    caller's transaction. Returns how many sprints were archived."""
+    # ingest locks the same rows, so no chunk lands between copy and clear
+    await db_session.execute(
+        select(Sprints.id)
+        .where(Sprints.slot_id == slot_id, Sprints.archived_at.is_(None))
+        .with_for_update()
+    )
+    await _encode_legacy_hits(db_session, slot_id)
+    now = datetime.now(timezone.utc)
+    hot = (
+        select(Sprints.id, Sprints.hits_blob, literal(now))
+        .where(
+            Sprints.slot_id == slot_id,
+            Sprints.archived_at.is_(None),
+            Sprints.hits_blob.isnot(None),
+        )
+    )
+    statement = insert(SprintHitsArchive).from_select(
+        ['sprint_pk', 'hits_blob', 'archived_at'], hot
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[SprintHitsArchive.sprint_pk],
+        set_={
+            'hits_blob': statement.excluded.hits_blob,
+            'archived_at': statement.excluded.archived_at,
+        },
+    )
+    await db_session.execute(statement)
+    result = await db_session.execute(
+        update(Sprints)
+        .where(
+            Sprints.slot_id == slot_id,
+            Sprints.archived_at.is_(None),
+            Sprints.hits_blob.isnot(None),
+        )
+        .values(hits_blob=None, archived_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+async def archive_old_hits(
+    db_session: AsyncSession, older_than_days: int, progress=None
+) -> dict:
+    cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    slot_ids = await find_archivable_slots(db_session, cutoff)
+    archived = 0
+    for i, slot_id in enumerate(slot_ids, start=1):
+        archived += await archive_slot_hits(db_session, slot_id)
+        await db_session.commit()
+        if progress is not None:
+            await progress(i / len(slot_ids))
+    return {'slots': len(slot_ids), 'sprints': archived}
@@ -1,4 +1,5 @@
 import logging
+import time
 from datetime import datetime, timezone
 
 from fastapi import APIRouter, Depends, HTTPException
@@ -10,15 +11,28 @@ from starlette import status
 from starlette.responses import StreamingResponse
 
 from constants import ALL_DEVICES_ID, CMD_START, DEFAULT_BLINK_INTERVAL
+from core.hits_codec import append_hits, encode_hits
 from database.models import Sprints
 from dependencies import get_db_session, get_mqtt, get_state
 from main_schemas import ResponseErrorBody
+from monitoring.metrics import (
+    INGEST_COMMIT,
+    INGEST_CONFLICTS,
+    INGEST_RETRIES,
+    INGEST_ROW_LOCK_WAIT,
+    SENSOR_CHUNK_SIZE,
+    SENSOR_HITS,
+    sensor_device_label,
+)
 from settings import MQTT_TOPIC_START, MQTT_TOPIC_STOP
 from state import SensorsState
 from web.sensors.schemas import HitsChunk, StartSprintInptut, RegisterInput
+from web.rollups.services import save_sprint_rollups
+from web.sensors.archive import load_archived_hits, unarchive
 from web.sensors.services import (
     build_sprint_hits_excel,
-    calculate_sprint_metrics,
+    calculate_column_metrics,
+    get_sprint_columns,
 )
 from web.users.users import current_superuser
 
@@ -28,6 +42,7 @@ router = APIRouter(
 )
 
 logger = logging.getLogger('control')
+ingest_logger = logging.getLogger('control.ingest')
 
 
 @router.post('/register')
@@ -126,7 +141,7 @@ async def receive_hits(
     db_session: AsyncSession = Depends(get_db_session),
     st: SensorsState = Depends(get_state),
 ) -> dict:
-    logger.info(
+    ingest_logger.debug(
         '(slot_id %s, sprint_id %s, sensor_id %s): accept: %d hits - is_last: %s',
         input_chunk.session_id,
         input_chunk.sprint_id,
@@ -134,8 +149,16 @@ async def receive_hits(
         len(input_chunk.hits),
         input_chunk.is_last,
     )
+    SENSOR_HITS.labels(
+        sensor_device_label(
+            input_chunk.device_id, st.is_registered(input_chunk.device_id)
+        )
+    ).inc(len(input_chunk.hits))
+    SENSOR_CHUNK_SIZE.observe(len(input_chunk.hits))
     await st.update_on_hit(input_chunk.device_id)
-    for _ in range(2):
+    for attempt in range(2):
+        if attempt:
+            INGEST_RETRIES.inc()
         try:
             query = (
                 select(Sprints)
@@ -148,47 +171,71 @@ async def receive_hits(
                 )
                 .with_for_update()
             )
+            started = time.perf_counter()
             sprint = await db_session.scalar(query)
+            INGEST_ROW_LOCK_WAIT.observe(time.perf_counter() - started)
             if sprint is None:
                 sprint = Sprints(
                     slot_id=int(input_chunk.session_id),
                     sprint_id=int(input_chunk.sprint_id),
                     sensor_id=input_chunk.device_id,
                     created_at=datetime.now(timezone.utc),
-                    data={'hits': []},
+                    data={},
                 )
+            elif sprint.archived_at is not None:
+                await load_archived_hits(db_session, [sprint])
+                unarchive(sprint)
             db_session.add(sprint)
 
-            hits_list = sprint.data.setdefault('hits', [])
-            new_hits = [h.model_dump() for h in input_chunk.hits]
-            hits_list.extend(new_hits)
-            sprint.data['total_hits'] = len(hits_list)
-            sprint.data['hits'] = hits_list
+            legacy_hits = sprint.data.pop('hits', None)
+            if legacy_hits:
+                sprint.hits_blob = append_hits(
+                    sprint.hits_blob,
+                    [h['timeMs'] for h in legacy_hits],
+                    [h['maxAccel'] for h in legacy_hits],
+                )
+            times = [h.timeMs for h in input_chunk.hits]
+            forces = [h.maxAccel for h in input_chunk.hits]
+            if times:
+                sprint.hits_blob = append_hits(sprint.hits_blob, times, forces)
+            sprint.data['total_hits'] = (
+                int(sprint.data.get('total_hits') or 0) + len(times)
+            )
             sprint.data['blink_interval'] = input_chunk.blink_interval
 
-            logger.debug(
+            ingest_logger.debug(
                 '(slot_id %s, sprint_id %s, sensor_id %s): added: %d, total %d',
                 input_chunk.session_id,
                 input_chunk.sprint_id,
                 input_chunk.device_id,
-                len(new_hits),
+                len(times),
                 sprint.data['total_hits'],
             )
 
             if input_chunk.is_last:
-                sprint.result = calculate_sprint_metrics(
-                    sprint.data.get('hits', []),
+                forces_all, times_all = get_sprint_columns(
+                    sprint.data, sprint.hits_blob
+                )
+                sprint.result = calculate_column_metrics(
+                    forces_all,
+                    times_all,
                     float(sprint.data.get('blink_interval') or DEFAULT_BLINK_INTERVAL),
                     int(sprint.data.get('total_hits', 0)),
                     force_threshold=input_chunk.force_threshold,
                     trim_percent=input_chunk.trim_percent,
                     percentile_level=input_chunk.percentile_level,
                 )
+                if sprint.hits_blob:
+                    # one frame compresses better than one per chunk
+                    sprint.hits_blob = encode_hits(times_all, forces_all)
+                await save_sprint_rollups(db_session, [sprint])
+            started = time.perf_counter()
             await db_session.commit()
+            INGEST_COMMIT.observe(time.perf_counter() - started)
 
             return {
                 'status': 'ok',
-                'added': len(new_hits),
+                'added': len(times),
                 'total': sprint.data['total_hits'],
                 'is_last': input_chunk.is_last,
                 'result': sprint.result or {},
@@ -197,6 +244,7 @@ async def receive_hits(
             await db_session.rollback()
             continue
 
+    INGEST_CONFLICTS.inc()
     raise HTTPException(409, 'Concurrent update, please retry')
 
 
@@ -222,6 +270,7 @@ async def export_sprint_hits(
             status_code=404,
             detail='No sprints found for the given slot and sprint IDs.',
         )
+    await load_archived_hits(db_session, sprints)
 
     xlsx_bytes = build_sprint_hits_excel(slot_id, sprint_id, sprints)
     filename = f'sprint_{slot_id}_{sprint_id}.xlsx'
@@ -1,5 +1,8 @@
 import io
 import math
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from itertools import accumulate
 
 from openpyxl import Workbook
 from openpyxl.utils import get_column_letter
@@ -12,7 +15,9 @@ from constants import (
     TEMPO_BORDER_PERCENT,
     DEGREE_POWER)
 
+from core.hits_codec import decode_hits, hits_to_dicts
 from database.models import Sprints
+from monitoring.metrics import SPRINT_METRICS_TIME
 
 
 def build_sprint_hits_excel(
@@ -25,12 +30,7 @@ def build_sprint_hits_excel(
     devices_hits = {}
     for sp in sprints:
         device = sp.sensor_id or 'UNKNOWN'
-        hits = []
-        if isinstance(sp.data, dict):
-            raw_hits = sp.data.get('hits', [])
-            if isinstance(raw_hits, list):
-                hits = raw_hits
-        devices_hits[device] = hits
+        devices_hits[device] = get_sprint_hits(sp.data, sp.hits_blob)
 
     summary_ws.append(['Slot ID', slot_id])
     summary_ws.append(['Sprint ID', sprint_id])
@@ -116,6 +116,26 @@ def get_forces_and_times(hits: list) -> tuple[list[float], list[int]]:
     return forces_all, times_all
 
 
+def get_sprint_hits(data: dict | None, hits_blob: bytes | None) -> list:
+    """Raw hits of a sprint as stored by ingest: decoded from
+    ``hits_blob``, or the legacy JSONB list in ``data``."""
+    if hits_blob:
+        return hits_to_dicts(*decode_hits(hits_blob))
+    raw_hits = data.get('hits', []) if isinstance(data, dict) else []
+    return raw_hits if isinstance(raw_hits, list) else []
+
+
+def get_sprint_columns(
+    data: dict | None, hits_blob: bytes | None
+) -> tuple[list[float], list[int | None]]:
+    """get_forces_and_times of a stored sprint, decoding ``hits_blob``
+    straight into columns."""
+    if hits_blob:
+        times, forces = decode_hits(hits_blob)
+        return forces, times
+    return get_forces_and_times(get_sprint_hits(data, None))
+
+
 def get_filtered_forces(
     forces_all: list[float], force_threshold: float
 ) -> list[float]:
@@ -159,14 +179,35 @@ def calculate_sprint_metrics(
     trim_percent: float | None = None,
     percentile_level: float | None = None,
 ) -> dict:
-    force_threshold = force_threshold or FORCE_THRESHOLD
-    trim_percent = trim_percent or TRIM_PERCENT
-    percentile_level = percentile_level or PERCENTILE_LEVEL
     if not hits or hit_count == 0:
         return {}
-
     forces_all, times_all = get_forces_and_times(hits)
-    if not forces_all:
+    return calculate_column_metrics(
+        forces_all,
+        times_all,
+        blink_interval,
+        hit_count,
+        force_threshold=force_threshold,
+        trim_percent=trim_percent,
+        percentile_level=percentile_level,
+    )
+
+
+@SPRINT_METRICS_TIME.time()
+def calculate_column_metrics(
+    forces_all: list[float],
+    times_all: list[int | None],
+    blink_interval: float,
+    hit_count: int,
+    force_threshold: float | None = None,
+    trim_percent: float | None = None,
+    percentile_level: float | None = None,
+) -> dict:
+    """calculate_sprint_metrics over hits already split into columns."""
+    force_threshold = force_threshold or FORCE_THRESHOLD
+    trim_percent = trim_percent or TRIM_PERCENT
+    percentile_level = percentile_level or PERCENTILE_LEVEL
+    if not forces_all or hit_count == 0:
         return {}
 
     forces = get_filtered_forces(forces_all, force_threshold)
@@ -204,3 +245,107 @@ def calculate_sprint_metrics(
         'power_old': round(power_old, 2),
         'energy_old': round(energy_old, 2),
     }
+
+
+@dataclass
+class SprintHitsProfile:
+    """Parameter-independent part of calculate_sprint_metrics, prepared
+    once per sprint so many parameter sets can be evaluated cheaply."""
+
+    sorted_forces: list[float]
+    sq_prefix: list[float]
+    tempo: float
+    power_old: float
+    energy_old: float
+
+
+def prepare_sprint_hits(
+    hits: list, blink_interval: float, hit_count: int
+) -> SprintHitsProfile | None:
+    if not hits or hit_count == 0:
+        return None
+    forces_all, times_all = get_forces_and_times(hits)
+    return prepare_sprint_columns(
+        forces_all, times_all, blink_interval, hit_count
+    )
+
+
+def prepare_sprint_columns(
+    forces_all: list[float],
+    times_all: list[int | None],
+    blink_interval: float,
+    hit_count: int,
+) -> SprintHitsProfile | None:
+    if not forces_all or hit_count == 0:
+        return None
+
+    max_punch = max(forces_all)
+    average_punch = sum(forces_all) / hit_count
+    power_old = (average_punch / max_punch) * KOEF_POWER if max_punch > 0 else 0
+
+    base = [t for t in times_all if t is not None]
+    if base:
+        synced = sum(1 for t in base if is_synced_hit(int(t), blink_interval))
+        tempo = (synced / len(base)) * 100.0
+    else:
+        tempo = 0.0
+
+    sorted_forces = sorted(forces_all)
+    return SprintHitsProfile(
+        sorted_forces=sorted_forces,
+        sq_prefix=[0.0, *accumulate(f * f for f in sorted_forces)],
+        tempo=tempo,
+        power_old=power_old,
+        energy_old=tempo * (power_old / KOEF_POWER) ** DEGREE_POWER,
+    )
+
+
+def calculate_sprint_metrics_grid(
+    profile: SprintHitsProfile | None,
+    params: list[tuple[float | None, float | None, float | None]],
+) -> list[dict]:
+    """calculate_sprint_metrics for every (force_threshold, trim_percent,
+    percentile_level) in ``params`` over one prepared sprint.
+
+    Threshold filtering and trimming are slices of the sorted forces and
+    the mean square comes from prefix sums, so each parameter set costs
+    O(log n) instead of a pass over the hits. Results can differ from
+    calculate_sprint_metrics only by float summation order.
+    """
+    if profile is None:
+        return [{} for _ in params]
+    s = profile.sorted_forces
+    results = []
+    for force_threshold, trim_percent, percentile_level in params:
+        force_threshold = force_threshold or FORCE_THRESHOLD
+        trim_percent = trim_percent or TRIM_PERCENT
+        percentile_level = percentile_level or PERCENTILE_LEVEL
+
+        start = bisect_left(s, force_threshold)
+        forces = s[start:]
+        if forces and trim_percent > 0:
+            lo, hi = _trim_bounds(forces, trim_percent)
+            trimmed = forces[
+                bisect_left(forces, lo):bisect_right(forces, hi)
+            ] or forces
+        else:
+            trimmed = forces
+        F_ref = _percentile(trimmed, percentile_level)
+
+        if F_ref > 0:
+            sum_sq = profile.sq_prefix[-1] - profile.sq_prefix[start]
+            power = 100.0 * sum_sq / (F_ref * F_ref) / len(forces)
+        else:
+            power = 0.0
+
+        energy = profile.tempo * (power / KOEF_POWER) ** DEGREE_POWER
+        results.append(
+            {
+                'tempo': round(profile.tempo, 2),
+                'power': round(power, 2),
+                'energy': round(energy, 2),
+                'power_old': round(profile.power_old, 2),
+                'energy_old': round(profile.energy_old, 2),
+            }
+        )
+    return results
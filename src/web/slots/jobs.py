@@ -0,0 +1,112 @@
+from sqlalchemy import select
+
+from constants import SLOT_RESULTS_CACHE_KEY, SPRINT_RESULTS_CACHE_KEY
+from core.jobs import JobContext, JobQueue
+from database.models import Slots, Sprints
+from web.sensors.archive import archive_old_hits
+from web.slots.services import (
+    SlotResultException,
+    process_bookings_results,
+    recalculate_all_sprints_results,
+    recalculate_bookings_results,
+    recalculate_sprint_results,
+)
+
+RECALCULATE_SLOT_RESULTS = 'recalculate_slot_results'
+RECALCULATE_SPRINT_RESULTS = 'recalculate_sprint_results'
+COMPLETE_TRAINING = 'complete_training'
+ARCHIVE_SPRINT_HITS = 'archive_sprint_hits'
+
+
+async def invalidate_results_cache(ctx: JobContext, slot_id: int) -> None:
+    if ctx.cache is None:
+        return
+    result = await ctx.db_session.scalars(
+        select(Sprints.sprint_id).where(Sprints.slot_id == slot_id).distinct()
+    )
+    await ctx.cache.delete(SLOT_RESULTS_CACHE_KEY.format(slot_id=slot_id))
+    for sprint_id in result.all():
+        await ctx.cache.delete(
+            SPRINT_RESULTS_CACHE_KEY.format(slot_id=slot_id, sprint_id=sprint_id)
+        )
+
+
+async def _get_slot(ctx: JobContext, slot_id: int) -> Slots:
+    slot = await ctx.db_session.scalar(select(Slots).where(Slots.id == slot_id))
+    if slot is None:
+        raise SlotResultException(f'Slot with id {slot_id} not found')
+    return slot
+
+
+def _phase(ctx: JobContext, start: float, end: float):
+    """Progress of one step, mapped onto [start, end] of the job."""
+
+    async def progress(fraction: float) -> None:
+        await ctx.progress(start + (end - start) * fraction)
+
+    return progress
+
+
+async def recalculate_slot_results_job(ctx: JobContext) -> dict:
+    slot_id = int(ctx.params['slot_id'])
+    slot = await _get_slot(ctx, slot_id)
+    await recalculate_all_sprints_results(
+        slot_id=slot_id,
+        db_session=ctx.db_session,
+        progress=_phase(ctx, 0.0, 0.5),
+    )
+    await recalculate_bookings_results(
+        bookings=slot.bookings,
+        db_session=ctx.db_session,
+        progress=_phase(ctx, 0.5, 1.0),
+    )
+    await ctx.db_session.commit()
+    await invalidate_results_cache(ctx, slot_id)
+    return {'slot_id': slot_id, 'bookings': len(slot.bookings)}
+
+
+async def recalculate_sprint_results_job(ctx: JobContext) -> dict:
+    slot_id = int(ctx.params['slot_id'])
+    sprint_id = int(ctx.params['sprint_id'])
+    await recalculate_sprint_results(
+        slot_id=slot_id,
+        sprint_id=sprint_id,
+        db_session=ctx.db_session,
+        progress=ctx.progress,
+    )
+    if ctx.cache is not None:
+        await ctx.cache.delete(
+            SPRINT_RESULTS_CACHE_KEY.format(slot_id=slot_id, sprint_id=sprint_id)
+        )
+    return {'slot_id': slot_id, 'sprint_id': sprint_id}
+
+
+async def complete_training_job(ctx: JobContext) -> dict:
+    slot_id = int(ctx.params['slot_id'])
+    slot = await _get_slot(ctx, slot_id)
+    if slot.is_done:
+        return {'slot_id': slot_id, 'already_completed': True}
+    slot.is_done = True
+    await process_bookings_results(
+        bookings=slot.bookings,
+        db_session=ctx.db_session,
+        progress=ctx.progress,
+    )
+    await ctx.db_session.commit()
+    await invalidate_results_cache(ctx, slot_id)
+    return {'slot_id': slot_id, 'bookings': len(slot.bookings)}
+
+
+async def archive_sprint_hits_job(ctx: JobContext) -> dict:
+    return await archive_old_hits(
+        ctx.db_session,
+        older_than_days=int(ctx.params['older_than_days']),
+        progress=ctx.progress,
+    )
+
+
+def register_slot_jobs(queue: JobQueue) -> None:
+    queue.register(RECALCULATE_SLOT_RESULTS, recalculate_slot_results_job)
+    queue.register(RECALCULATE_SPRINT_RESULTS, recalculate_sprint_results_job)
+    queue.register(COMPLETE_TRAINING, complete_training_job)
+    queue.register(ARCHIVE_SPRINT_HITS, archive_sprint_hits_job)
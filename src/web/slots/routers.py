@@ -1,12 +1,14 @@
 import logging
 
 import sqlalchemy
-from fastapi import APIRouter, Depends
+from datetime import date, datetime
+
+from fastapi import APIRouter, Depends, Request
 from fastapi_filter import FilterDepends
-from sqlalchemy import select
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
-from starlette.responses import Response
+from starlette.responses import JSONResponse, Response
 
 from constants import (
     SPRINT_RESULTS_CACHE_KEY,
@@ -14,23 +16,39 @@ from constants import (
     SLOT_RESULTS_CACHE_TTL,
     SPRINT_RESULTS_CACHE_TTL,
 )
+from core.etag import check_not_modified, conditional_get
+from core.jobs import JobQueue
 from core.simple_cache import Cache
-from database.models import Slots, User, Sprints
-from dependencies import get_db_session, get_cache
+from database.models import Bookings, Slots, Sprints
+from dependencies import get_db_session, get_cache, get_jobs
 from starlette.exceptions import HTTPException
 
 from main_schemas import ResponseErrorBody
+from web.jobs.schemas import JobAccepted
 from web.slots.filters import SlotsFilter
+from web.slots.jobs import (
+    COMPLETE_TRAINING,
+    RECALCULATE_SLOT_RESULTS,
+    RECALCULATE_SPRINT_RESULTS,
+)
 from web.slots.schemas import (
     Slot,
     SlotCreateInput,
     SlotUpdateInput,
     BulkSlotCreateInput,
     BindInput,
+    WhatIfInput,
+    WhatIfResult,
+    ScheduleWeek,
+)
+from web.slots.schedule import (
+    get_week_schedule,
+    refresh_schedule,
+    schedule_tz,
+    week_start,
 )
 from web.slots.services import (
     update_slot_in_db,
-    calculate_free_places,
     check_bookings,
     ExistingBookingsError,
     check_complete_bindings,
@@ -38,10 +56,12 @@ from web.slots.services import (
     get_sprint_energy_list,
     SprintResultException,
     SlotResultException,
-    get_slot_energy_list, recalculate_sprint_results, recalculate_all_sprints_results, recalculate_bookings_results,
-    process_bookings_results,
+    get_slot_energy_list,
+    get_what_if_rankings,
+    WhatIfException,
 )
-from web.users.users import current_superuser, current_user
+from web.users.users import AuthPrincipal, current_superuser, current_user
+from web.waitlist.services import notify_promoted, promote_from_waitlist
 
 router = APIRouter(
     prefix='/slots',
@@ -51,29 +71,114 @@ router = APIRouter(
 
 logger = logging.getLogger('control')
 
+SCHEDULE_CACHE_CONTROL = 'private, max-age=30'
+
+
+def _bookings_version(slot_ids):
+    return (
+        select(func.count(Bookings.id), func.max(Bookings.updated_at))
+        .where(Bookings.slot_id.in_(slot_ids))
+    )
+
+
+async def _slots_version(
+    slots_filter: SlotsFilter = FilterDepends(SlotsFilter),
+    db_session: AsyncSession = Depends(get_db_session),
+    user: AuthPrincipal = Depends(current_user),
+):
+    slots = slots_filter.filter(select(Slots.id, Slots.updated_at)).subquery()
+    slots_row = (
+        await db_session.execute(
+            select(func.count(), func.max(slots.c.updated_at))
+        )
+    ).one()
+    bookings_row = (
+        await db_session.execute(_bookings_version(select(slots.c.id)))
+    ).one()
+    return user.is_superuser, tuple(slots_row), tuple(bookings_row)
+
+
+async def _slot_version(
+    slot_id: int,
+    db_session: AsyncSession = Depends(get_db_session),
+    user: AuthPrincipal = Depends(current_user),
+):
+    updated_at = await db_session.scalar(
+        select(Slots.updated_at).where(Slots.id == slot_id)
+    )
+    bookings_row = (
+        await db_session.execute(_bookings_version([slot_id]))
+    ).one()
+    return user.is_superuser, updated_at, tuple(bookings_row)
+
+
+async def accept_job(jobs: JobQueue, kind: str, params: dict) -> JSONResponse:
+    job, created = await jobs.submit(kind, params)
+    accepted = JobAccepted(
+        job_id=job.id,
+        kind=job.kind,
+        status=job.status,
+        deduplicated=not created,
+    )
+    return JSONResponse(
+        accepted.model_dump(),
+        status_code=status.HTTP_202_ACCEPTED,
+    )
+
 
 @router.get(
     '/',
     response_model=list[Slot],
-    dependencies=[Depends(current_user)],
+    dependencies=[
+        Depends(current_user),
+        Depends(conditional_get(_slots_version)),
+    ],
 )
 async def get_all_slots(
     slots_filter: SlotsFilter = FilterDepends(SlotsFilter),
     db_session: AsyncSession = Depends(get_db_session),
-    user: User = Depends(current_user),
+    user: AuthPrincipal = Depends(current_user),
 ):
     query = select(Slots).order_by(Slots.id.desc())
     query = slots_filter.filter(query)
     result = await db_session.execute(query)
     slots = result.scalars().all()
     for slot in slots:
-        slot.free_places = await calculate_free_places(slot, db_session)
         if not user.is_superuser:
             slot.bookings = []
             slot.bindings = None
     return slots
 
 
+@router.get(
+    '/schedule',
+    response_model=ScheduleWeek,
+)
+async def get_schedule(
+    request: Request,
+    response: Response,
+    week: date | None = None,
+    db_session: AsyncSession = Depends(get_db_session),
+    user: AuthPrincipal = Depends(current_user),
+    cache: Cache = Depends(get_cache),
+):
+    """Slim calendar of the week containing ``week`` (default: this
+    week), served from the schedule read model."""
+    start = week_start(week or datetime.now(schedule_tz).date())
+    entries = await get_week_schedule(db_session, cache, start)
+    user_id = str(user.id)
+    check_not_modified(
+        request, response, (user_id, entries), SCHEDULE_CACHE_CONTROL
+    )
+    return {
+        'week_start': start,
+        'slots': [
+            {**entry, 'is_booked': user_id in entry['booked_user_ids']}
+            for entry in entries
+        ],
+    }
+
+
 @router.get(
     '/{slot_id:int}',
     response_model=Slot,
@@ -85,12 +190,15 @@ async def get_all_slots(
             'model': ResponseErrorBody,
         },
     },
-    dependencies=[Depends(current_user)],
+    dependencies=[
+        Depends(current_user),
+        Depends(conditional_get(_slot_version)),
+    ],
 )
 async def get_slot_by_id(
     slot_id: int,
     db_session: AsyncSession = Depends(get_db_session),
-    user: User = Depends(current_user),
+    user: AuthPrincipal = Depends(current_user),
 ):
     query = select(Slots).filter(Slots.id == slot_id)
     slot = await db_session.scalar(query)
@@ -99,7 +207,6 @@ async def get_slot_by_id(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f'Slot with id {slot_id} not found',
         )
-    slot.free_places = await calculate_free_places(slot, db_session)
     if not user.is_superuser:
         slot.bookings = []
         slot.bindings = None
@@ -110,6 +217,10 @@ async def get_slot_by_id(
     '/results/{slot_id:int}',
     response_model=list[dict[str, str | int | float | None]],
     responses={
+        status.HTTP_202_ACCEPTED: {
+            'model': JobAccepted,
+            'description': 'Recalculation queued, poll /jobs/{job_id}',
+        },
         status.HTTP_400_BAD_REQUEST: {
             'model': ResponseErrorBody,
         },
@@ -124,8 +235,9 @@ async def get_slot_results(
     no_cache: bool = False,
     recalculate: bool = False,
     db_session: AsyncSession = Depends(get_db_session),
-    user: User = Depends(current_user),
+    user: AuthPrincipal = Depends(current_user),
     cache: Cache = Depends(get_cache),
+    jobs: JobQueue = Depends(get_jobs),
 ):
     query = select(Slots).filter(Slots.id == slot_id)
     slot = await db_session.scalar(query)
@@ -136,16 +248,11 @@ async def get_slot_results(
         )
 
     if recalculate:
-        await recalculate_all_sprints_results(
-            slot_id=slot_id, db_session=db_session
+        return await accept_job(
+            jobs, RECALCULATE_SLOT_RESULTS, {'slot_id': slot_id}
         )
-        await recalculate_bookings_results(
-            bookings = slot.bookings, db_session=db_session
-        )
-        await db_session.commit()
-        await db_session.refresh(slot)
 
-    if not no_cache and not recalculate:
+    if not no_cache:
         cashed_results = await cache.get_json(
             SLOT_RESULTS_CACHE_KEY.format(slot_id=slot_id)
         )
@@ -191,6 +298,10 @@ async def get_slot_results(
     '/results/{slot_id:int}/sprint/{sprint_id:int}',
     response_model=list[dict[str, str | int | float | None]],
     responses={
+        status.HTTP_202_ACCEPTED: {
+            'model': JobAccepted,
+            'description': 'Recalculation queued, poll /jobs/{job_id}',
+        },
         status.HTTP_400_BAD_REQUEST: {
             'model': ResponseErrorBody,
         },
@@ -206,34 +317,34 @@ async def get_sprint_results(
     no_cache: bool = False,
     recalculate: bool = False,
     db_session: AsyncSession = Depends(get_db_session),
-    user: User = Depends(current_user),
+    user: AuthPrincipal = Depends(current_user),
     cache: Cache = Depends(get_cache),
+    jobs: JobQueue = Depends(get_jobs),
 ):
-    query = select(Slots).filter(Slots.id == slot_id)
-    slot = await db_session.scalar(query)
-    if slot is None:
+    query = select(Slots.id).filter(Slots.id == slot_id)
+    if await db_session.scalar(query) is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f'Slot with id {slot_id} not found',
         )
-    query = select(Sprints).where(
+    query = select(Sprints.id).where(
         Sprints.slot_id == slot_id,
         Sprints.sprint_id == sprint_id
-    )
-    result = await db_session.scalars(query)
-    sprints = result.all()
-    if not sprints:
+    ).limit(1)
+    if await db_session.scalar(query) is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f'Sprint with id {sprint_id} not found in slot {slot_id}',
         )
 
     if recalculate:
-        await recalculate_sprint_results(
-            slot_id=slot_id, sprint_id=sprint_id, db_session=db_session
+        return await accept_job(
+            jobs,
+            RECALCULATE_SPRINT_RESULTS,
+            {'slot_id': slot_id, 'sprint_id': sprint_id},
         )
 
-    if not no_cache and not recalculate:
+    if not no_cache:
         cashed_results = await cache.get_json(
             SPRINT_RESULTS_CACHE_KEY.format(slot_id=slot_id, sprint_id=sprint_id)
         )
@@ -275,6 +386,29 @@ async def get_sprint_results(
     return energy_list
 
 
+@router.post(
+    '/results/what-if',
+    response_model=list[WhatIfResult],
+    responses={
+        status.HTTP_400_BAD_REQUEST: {
+            'model': ResponseErrorBody,
+        },
+    },
+    dependencies=[Depends(current_superuser)],
+)
+async def get_what_if_results(
+    what_if_input: WhatIfInput,
+    db_session: AsyncSession = Depends(get_db_session),
+):
+    try:
+        return await get_what_if_rankings(what_if_input, db_session)
+    except WhatIfException as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+
 @router.post(
     '/',
     response_model=Slot,
@@ -292,13 +426,14 @@ async def get_sprint_results(
 async def create_slot(
     slot_input: SlotCreateInput,
     db_session: AsyncSession = Depends(get_db_session),
+    cache: Cache = Depends(get_cache),
 ):
     try:
         db_slot = Slots(**slot_input.model_dump())
         db_session.add(db_slot)
         await db_session.commit()
         await db_session.refresh(db_slot)
-        db_slot.free_places = await calculate_free_places(db_slot, db_session)
+        await refresh_schedule(db_session, cache, [db_slot.id])
         return db_slot
     except sqlalchemy.exc.IntegrityError as e:
         raise HTTPException(
@@ -325,18 +460,14 @@ async def save_bindings(
     bind_input: BindInput,
     db_session: AsyncSession = Depends(get_db_session),
 ):
-    query = select(Slots).where(Slots.id == bind_input.slot_id)
-    slot = await db_session.scalar(query)
-    if slot is None:
+    query = select(Slots.id).where(Slots.id == bind_input.slot_id)
+    if await db_session.scalar(query) is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f'Slot with id {bind_input.slot_id} not found',
         )
     try:
         result = await check_complete_bindings(bind_input, db_session)
-        slot.bindings = {
-            str(b.user_id): b.sensor_id for b in bind_input.bindings
-        }
         await db_session.commit()
         return result
     except (sqlalchemy.exc.IntegrityError, BindingsError) as e:
@@ -348,7 +479,8 @@ async def save_bindings(
 
 @router.post(
     '/complete_training/{slot_id:int}',
-    status_code=status.HTTP_200_OK,
+    response_model=JobAccepted,
+    status_code=status.HTTP_202_ACCEPTED,
     responses={
         status.HTTP_400_BAD_REQUEST: {
             'model': ResponseErrorBody,
@@ -362,6 +494,7 @@ async def save_bindings(
 async def complete_training(
     slot_id: int,
     db_session: AsyncSession = Depends(get_db_session),
+    jobs: JobQueue = Depends(get_jobs),
 ):
     query = select(Slots).where(Slots.id == slot_id)
     slot = await db_session.scalar(query)
@@ -375,13 +508,7 @@ async def complete_training(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f'Slot with id {slot_id} is already completed',
         )
-    slot.is_done = True
-    await process_bookings_results(
-        bookings=slot.bookings, db_session=db_session
-    )
-    await db_session.commit()
-    await db_session.refresh(slot)
-    return Response('Slot training completed successfully', status_code=status.HTTP_200_OK)
+    return await accept_job(jobs, COMPLETE_TRAINING, {'slot_id': slot_id})
 
 
 @router.post(
@@ -401,6 +528,7 @@ async def complete_training(
 async def bulk_create_slot(
     bulk_slot_input: BulkSlotCreateInput,
     db_session: AsyncSession = Depends(get_db_session),
+    cache: Cache = Depends(get_cache),
 ):
     try:
         slots: list[Slots] = []
@@ -411,9 +539,7 @@ async def bulk_create_slot(
         await db_session.commit()
         for db_slot in slots:
             await db_session.refresh(db_slot)
-            db_slot.free_places = await calculate_free_places(
-                db_slot, db_session
-            )
+        await refresh_schedule(db_session, cache, [s.id for s in slots])
         return slots
     except sqlalchemy.exc.IntegrityError as e:
         raise HTTPException(
@@ -439,6 +565,7 @@ async def update_slot(
     slot_id: int,
     update_input: SlotUpdateInput,
     db_session: AsyncSession = Depends(get_db_session),
+    cache: Cache = Depends(get_cache),
 ):
     query = select(Slots).where(Slots.id == slot_id)
     slot = await db_session.scalar(query)
@@ -447,11 +574,20 @@ async def update_slot(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f'Slot with id {slot_id} not found',
         )
+    old_time = slot.time
     try:
         slot_db = await update_slot_in_db(
             db_session, slot, **update_input.model_dump(exclude_none=True)
         )
-        slot_db.free_places = await calculate_free_places(slot_db, db_session)
+        if update_input.number_of_places is not None:
+            promoted = await promote_from_waitlist(db_session, slot_id)
+            if promoted:
+                await db_session.commit()
+                await db_session.refresh(slot_db)
+                await notify_promoted(cache, promoted)
+        await refresh_schedule(
+            db_session, cache, [slot_id], moved_from=[(slot_id, old_time)]
+        )
         return slot_db
     except sqlalchemy.exc.IntegrityError as e:
         raise HTTPException(
@@ -473,6 +609,7 @@ async def update_slot(
 async def delete_slot(
     slot_id: int,
     db_session: AsyncSession = Depends(get_db_session),
+    cache: Cache = Depends(get_cache),
 ):
     query = select(Slots).filter(Slots.id == slot_id)
     slot = await db_session.scalar(query)
@@ -488,6 +625,10 @@ async def delete_slot(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f'{e}',
         )
+    slot_time = slot.time
     await db_session.delete(slot)
     await db_session.commit()
+    await refresh_schedule(
+        db_session, cache, [], moved_from=[(slot_id, slot_time)]
+    )
     return Response(status_code=status.HTTP_204_NO_CONTENT)
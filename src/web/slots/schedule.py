@@ -0,0 +1,124 @@
+import logging
+from datetime import date, datetime, time, timedelta
+from typing import Iterable
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import Select, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import settings
+from constants import SCHEDULE_CACHE_KEY, SCHEDULE_CACHE_TTL
+from core.simple_cache import Cache
+from database.models import Bookings, Slots
+
+logger = logging.getLogger('control')
+
+# set once the whole week is in the hash; a hash without it is rebuilt
+BUILT_FIELD = '_built'
+
+schedule_tz = ZoneInfo(settings.SCHEDULE_TIMEZONE)
+
+
+def week_start(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+
+def week_of(moment: datetime) -> date:
+    return week_start(moment.astimezone(schedule_tz).date())
+
+
+def _week_key(week: date) -> str:
+    return SCHEDULE_CACHE_KEY.format(week=week.isoformat())
+
+
+def _schedule_query() -> Select:
+    return (
+        select(
+            Slots.id,
+            Slots.type,
+            Slots.time,
+            Slots.number_of_places,
+            Slots.booked_count,
+            func.array_agg(Bookings.user_id)
+            .filter(Bookings.user_id.isnot(None))
+            .label('user_ids'),
+        )
+        .outerjoin(Bookings, Bookings.slot_id == Slots.id)
+        .group_by(Slots.id)
+    )
+
+
+def _entry(row) -> dict:
+    return {
+        'id': row.id,
+        'type': row.type,
+        'time': row.time.isoformat(),
+        'capacity': row.number_of_places,
+        'free_places': max(0, row.number_of_places - row.booked_count),
+        'booked_user_ids': [str(u) for u in row.user_ids or ()],
+    }
+
+
+async def _build_week(db_session: AsyncSession, week: date) -> list[dict]:
+    start = datetime.combine(week, time.min, tzinfo=schedule_tz)
+    query = _schedule_query().where(
+        Slots.time >= start, Slots.time < start + timedelta(weeks=1)
+    )
+    return [_entry(row) for row in (await db_session.execute(query)).all()]
+
+
+async def get_week_schedule(
+    db_session: AsyncSession, cache: Cache, week: date
+) -> list[dict]:
+    """Slots of the week as stored in the schedule read model, built from
+    the database on a miss. Falls back to the database if Redis is
+    unavailable."""
+    key = _week_key(week)
+    try:
+        cached = await cache.hgetall_json(key)
+    except Exception as e:
+        logger.warning('Schedule cache unavailable: %s', e)
+        cached = None
+    if cached and BUILT_FIELD in cached:
+        entries = [v for k, v in cached.items() if k != BUILT_FIELD]
+    else:
+        entries = await _build_week(db_session, week)
+        if cached is not None:
+            mapping = {str(e['id']): e for e in entries}
+            mapping[BUILT_FIELD] = datetime.now(schedule_tz).isoformat()
+            try:
+                await cache.replace_hash_json(key, mapping, SCHEDULE_CACHE_TTL)
+            except Exception as e:
+                logger.warning('Could not store schedule %s: %s', key, e)
+    return sorted(entries, key=lambda e: (e['time'], e['id']))
+
+
+async def refresh_schedule(
+    db_session: AsyncSession,
+    cache: Cache,
+    slot_ids: Iterable[int],
+    moved_from: Iterable[tuple[int, datetime]] = (),
+) -> None:
+    """Rewrite the entries of changed slots after commit. Slots that no
+    longer exist, or whose time moved out of a week, are removed from the
+    weeks given in ``moved_from`` as (slot_id, old time)."""
+    slot_ids = set(slot_ids)
+    try:
+        rows = []
+        if slot_ids:
+            query = _schedule_query().where(Slots.id.in_(slot_ids))
+            rows = (await db_session.execute(query)).all()
+        current = {row.id: week_of(row.time) for row in rows}
+        for slot_id, old_time in moved_from:
+            old_week = week_of(old_time)
+            if current.get(slot_id) != old_week:
+                await cache.hdel(_week_key(old_week), str(slot_id))
+        for row in rows:
+            await cache.hset_json(
+                _week_key(current[row.id]),
+                str(row.id),
+                _entry(row),
+                SCHEDULE_CACHE_TTL,
+            )
+    except Exception as e:
+        logger.warning('Could not refresh schedule of %s: %s', slot_ids, e)
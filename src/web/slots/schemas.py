@@ -1,5 +1,5 @@
 import uuid
-from datetime import datetime
+from datetime import date, datetime
 
 from pydantic import BaseModel
 
@@ -52,3 +52,44 @@ class Binding(BaseModel):
 class BindInput(BaseModel):
     slot_id: int
     bindings: list[Binding]
+
+
+class WhatIfInput(BaseModel):
+    slot_id: int | None = None
+    time__gt: datetime | None = None
+    time__lt: datetime | None = None
+    force_threshold: list[float | None] = [None]
+    trim_percent: list[float | None] = [None]
+    percentile_level: list[float | None] = [None]
+
+
+class WhatIfRankItem(BaseModel):
+    id: str
+    name: str
+    last_name: str
+    photo_url: str | None = None
+    sprints: int
+    power: float
+    tempo: float
+    energy: float
+
+
+class WhatIfResult(BaseModel):
+    force_threshold: float | None
+    trim_percent: float | None
+    percentile_level: float | None
+    ranking: list[WhatIfRankItem]
+
+
+class ScheduleSlot(BaseModel):
+    id: int
+    type: str | None
+    time: datetime
+    capacity: int
+    free_places: int
+    is_booked: bool
+
+
+class ScheduleWeek(BaseModel):
+    week_start: date
+    slots: list[ScheduleSlot]
@@ -1,13 +1,39 @@
+import uuid
+from itertools import product
 from typing import Sequence
 
-from sqlalchemy import select, and_
+from sqlalchemy import (
+    select,
+    and_,
+    update,
+    case,
+    or_,
+    func,
+    cast,
+    column,
+    values,
+    Float,
+    String,
+)
+from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from constants import DEFAULT_BLINK_INTERVAL
-from database.models import Slots, Bookings, User, Sprints
-from web.bookings.services import calculate_sprints_data, calculate_booking_metrics
-from web.sensors.services import calculate_sprint_metrics
-from web.slots.schemas import BindInput
+from constants import DEFAULT_BLINK_INTERVAL, MAX_WHAT_IF_PARAM_SETS
+from database.models import Slots, Bookings, User, Sprints, SprintHitsArchive
+from web.bookings.services import (
+    calculate_booking_metrics,
+    calculate_slots_sprints_data,
+)
+from web.sensors.services import (
+    calculate_column_metrics,
+    calculate_sprint_metrics_grid,
+    get_sprint_columns,
+    prepare_sprint_columns,
+)
+from web.rollups.services import save_sprint_rollups
+from web.sensors.archive import load_archived_hits
+from web.slots.schemas import BindInput, WhatIfInput
+from web.users.photos import rendition_name
 
 
 class ExistingBookingsError(Exception):
@@ -26,6 +52,10 @@ class SlotResultException(Exception):
     pass
 
 
+class WhatIfException(Exception):
+    pass
+
+
 async def update_slot_in_db(
     db_session: AsyncSession, slot: Slots, **update_data: dict
 ) -> Slots:
@@ -36,13 +66,6 @@ async def update_slot_in_db(
     return slot
 
 
-async def calculate_free_places(slot: Slots, db_session: AsyncSession) -> int:
-    query = select(Bookings).filter(Bookings.slot_id == slot.id)
-    result = await db_session.execute(query)
-    exists_slot_bookings = result.scalars().all()
-    return max(0, slot.number_of_places - len(exists_slot_bookings))
-
-
 async def check_bookings(slot: Slots) -> None:
     if slot.is_done:
         raise ExistingBookingsError('This slot is already done.')
@@ -54,34 +77,44 @@ async def check_bookings(slot: Slots) -> None:
 async def check_complete_bindings(
     bind_input: BindInput, db_session: AsyncSession
 ):
-    if not bind_input.bindings:
-        return
     for binding in bind_input.bindings:
         if not binding.sensor_id or not binding.user_id:
             raise BindingsError(
                 'Each binding must have both sensor_id and user_id set.'
             )
-    query = select(Slots).filter(Slots.id == bind_input.slot_id)
-    result = await db_session.execute(query)
-    slot = result.scalar_one_or_none()
-    if not slot:
+    bindings = {str(b.user_id): b.sensor_id for b in bind_input.bindings}
+    slot_id = await db_session.scalar(
+        update(Slots)
+        .where(Slots.id == bind_input.slot_id)
+        .values(bindings=bindings)
+        .returning(Slots.id)
+        .execution_options(synchronize_session=False)
+    )
+    if slot_id is None:
         raise BindingsError(
             f'Slot with id {bind_input.slot_id} does not exist.'
         )
 
-    bindings = {str(b.user_id): b.sensor_id for b in bind_input.bindings}
-    slot.bindings = bindings
-    accepted_bindings_count = len(slot.bindings)
-    possible_bindings_count = 0
-    query = select(Bookings).filter(Bookings.slot_id == bind_input.slot_id)
-    bookings = await db_session.execute(query)
-    for booking in bookings.scalars().all():
-        if str(booking.user_id) in bindings:
-            booking.sensor_id = bindings[str(booking.user_id)]
-            possible_bindings_count += 1
+    if not bindings:
+        return {'accepted_bindings': 0, 'possible_bindings': 0}
+
+    new_bindings = values(
+        column('user_id', UUID(as_uuid=True)),
+        column('sensor_id', String),
+        name='new_bindings',
+    ).data([(uuid.UUID(k), v) for k, v in bindings.items()])
+    result = await db_session.execute(
+        update(Bookings)
+        .where(
+            Bookings.slot_id == bind_input.slot_id,
+            Bookings.user_id == new_bindings.c.user_id,
+        )
+        .values(sensor_id=new_bindings.c.sensor_id)
+        .execution_options(synchronize_session=False)
+    )
     return {
-        'accepted_bindings': accepted_bindings_count,
-        'possible_bindings': possible_bindings_count,
+        'accepted_bindings': len(bindings),
+        'possible_bindings': result.rowcount,
     }
 
 
@@ -99,7 +132,7 @@ async def get_slot_energy_list(
                 'id': str(booking.user.id),
                 'name': booking.user.name,
                 'last_name': booking.user.last_name,
-                'photo_url': booking.user.photo_url,
+                'photo_url': rendition_name(booking.user.photo_url, 'thumb'),
                 'power': booking.power,
                 'tempo': booking.tempo,
                 'energy': booking.energy,
@@ -111,40 +144,46 @@ async def get_slot_energy_list(
 async def get_sprint_energy_list(
     slot_id: int, sprint_id: int, user: User, db_session: AsyncSession
 ) -> tuple[list[dict[str, int | str | float | None]], bool]:
-    query = select(Slots).filter(Slots.id == slot_id)
-    slot = await db_session.scalar(query)
-    if slot is None:
-        raise SprintResultException(f'Slot with id {slot_id} not found')
-    query = select(Sprints).where(
-        Sprints.slot_id == slot_id, Sprints.sprint_id == sprint_id
+    """Sprint leaderboard ordered by energy: sprints are matched to users
+    through the slot's sensor bindings in a single query."""
+    binding = (
+        func.jsonb_each_text(Slots.bindings)
+        .table_valued('key', 'value')
+        .lateral('binding')
     )
-    result = await db_session.scalars(query)
-    sprints = result.all()
+    energy = Sprints.result['energy'].astext.cast(Float)
+    query = (
+        select(
+            Sprints.sensor_id,
+            Sprints.result,
+            User.id,
+            User.name,
+            User.last_name,
+            User.photo_url,
+        )
+        .join(Slots, Slots.id == Sprints.slot_id)
+        .outerjoin(binding, binding.c.value == Sprints.sensor_id)
+        .outerjoin(User, User.id == cast(binding.c.key, UUID))
+        .where(Sprints.slot_id == slot_id, Sprints.sprint_id == sprint_id)
+        .order_by(energy.desc().nulls_last(), Sprints.sensor_id.asc())
+    )
+    result = await db_session.execute(query)
     user_can_see_results = False
     energy_list = []
-    query = select(User).where(User.id.in_(slot.bindings.keys()))
-    result = await db_session.scalars(query)
-    users = result.all()
-    sensor_dict = {}
-    for key, value in slot.bindings.items():
-        for user in users:
-            if str(user.id) == key:
-                sensor_dict[value] = user
-    for sprint in sprints:
-        current_user = sensor_dict.get(sprint.sensor_id)
-        if current_user is None:
+    for row in result:
+        if row.id is None:
             raise SprintResultException(
-                f'User with sensor_id {sprint.sensor_id} not found in slot {slot_id}',
+                f'User with sensor_id {row.sensor_id} not found in slot {slot_id}',
             )
-        if str(current_user.id) == str(user.id):
+        if str(row.id) == str(user.id):
             user_can_see_results = True
-        sprint_result = sprint.result or {}
+        sprint_result = row.result or {}
         energy_list.append(
             {
-                'id': str(current_user.id),
-                'name': current_user.name,
-                'last_name': current_user.last_name,
-                'photo_url': current_user.photo_url,
+                'id': str(row.id),
+                'name': row.name,
+                'last_name': row.last_name,
+                'photo_url': rendition_name(row.photo_url, 'thumb'),
                 'power': sprint_result.get('power', 0),
                 'tempo': sprint_result.get('tempo', 0),
                 'energy': sprint_result.get('energy', 0),
@@ -153,18 +192,26 @@ async def get_sprint_energy_list(
     return energy_list, user_can_see_results
 
 
-async def update_sprint_in_db(sprints: Sequence[Sprints]) -> Sequence[Sprints]:
-    for sprint in sprints:
-        sprint.result = calculate_sprint_metrics(
-            sprint.data.get('hits', []),
+async def update_sprint_in_db(
+    sprints: Sequence[Sprints], progress=None
+) -> Sequence[Sprints]:
+    for i, sprint in enumerate(sprints, start=1):
+        forces_all, times_all = get_sprint_columns(
+            sprint.data, sprint.hits_blob
+        )
+        sprint.result = calculate_column_metrics(
+            forces_all,
+            times_all,
             float(sprint.data.get('blink_interval') or DEFAULT_BLINK_INTERVAL),
             int(sprint.data.get('total_hits', 0)),
         )
+        if progress is not None:
+            await progress(i / len(sprints))
     return sprints
 
 
 async def recalculate_sprint_results(
-    slot_id: int, sprint_id: int, db_session: AsyncSession
+    slot_id: int, sprint_id: int, db_session: AsyncSession, progress=None
 ) -> None:
     query = (
         select(Sprints)
@@ -178,42 +225,174 @@ async def recalculate_sprint_results(
     )
     result = await db_session.scalars(query)
     sprints = result.all()
-    await update_sprint_in_db(sprints)
+    await load_archived_hits(db_session, sprints)
+    await update_sprint_in_db(sprints, progress)
+    await save_sprint_rollups(db_session, sprints)
     await db_session.commit()
 
 
 async def recalculate_all_sprints_results(
-    slot_id: int, db_session: AsyncSession
+    slot_id: int, db_session: AsyncSession, progress=None
 ) -> None:
     query = select(Sprints).where(Sprints.slot_id == slot_id).with_for_update()
     result = await db_session.scalars(query)
     sprints = result.all()
-    await update_sprint_in_db(sprints)
-    await db_session.commit(
-)
+    await load_archived_hits(db_session, sprints)
+    await update_sprint_in_db(sprints, progress)
+    await save_sprint_rollups(db_session, sprints)
+    await db_session.commit()
+
 
 async def recalculate_bookings_results(
     bookings: Sequence[Bookings],
     db_session: AsyncSession,
+    progress=None,
 ) -> Sequence[Bookings]:
-    for booking in bookings:
-        sprints_data = await calculate_sprints_data(booking, db_session)
+    if not bookings:
+        return bookings
+    slots_sprints_data = await calculate_slots_sprints_data(
+        {booking.slot_id for booking in bookings}, db_session
+    )
+    for i, booking in enumerate(bookings, start=1):
+        sprints_data = dict(
+            slots_sprints_data.get((booking.slot_id, booking.sensor_id), {})
+        )
         booking.sprints_data = sprints_data
         calculate_booking_metrics(booking, sprints_data)
+        if progress is not None:
+            await progress(i / len(bookings))
     return bookings
 
 
-async def process_bookings_results(bookings: Sequence[Bookings], db_session: AsyncSession) -> Sequence[Bookings]:
-    for booking in bookings:
-        user = booking.user
-        sprints_data = await calculate_sprints_data(
-            booking, db_session
+async def process_bookings_results(
+    bookings: Sequence[Bookings], db_session: AsyncSession, progress=None
+) -> Sequence[Bookings]:
+    """Booking metrics for a finished class plus one training taken off
+    each member's score, in a constant number of statements."""
+    await recalculate_bookings_results(bookings, db_session, progress)
+    user_ids = {booking.user_id for booking in bookings}
+    if user_ids:
+        await db_session.execute(
+            update(User)
+            .where(User.id.in_(user_ids))
+            .values(
+                score=case(
+                    (or_(User.score.is_(None), User.score < 1), 0),
+                    else_=User.score - 1,
+                )
+            )
+            .execution_options(synchronize_session='fetch')
         )
-        booking.sprints_data = sprints_data
-        calculate_booking_metrics(booking, sprints_data)
-        if user.score is None:
-            user.score = 0
-        elif user.score < 1:
-            user.score = 0
-        else:
-            user.score -= 1
+    return bookings
+
+
+async def get_what_if_rankings(
+    what_if_input: WhatIfInput, db_session: AsyncSession
+) -> list[dict]:
+    """Rank users under each parameter set of the grid without touching
+    stored results. Every sprint's hits are read and prepared once; a
+    user's metrics are the average over their sprints in the scope, as
+    calculate_booking_metrics does for a single booking."""
+    if what_if_input.slot_id is None and (
+        what_if_input.time__gt is None or what_if_input.time__lt is None
+    ):
+        raise WhatIfException(
+            'Either slot_id or both time__gt and time__lt must be set.'
+        )
+    params = list(
+        product(
+            what_if_input.force_threshold or [None],
+            what_if_input.trim_percent or [None],
+            what_if_input.percentile_level or [None],
+        )
+    )
+    if len(params) > MAX_WHAT_IF_PARAM_SETS:
+        raise WhatIfException(
+            f'Too many parameter sets: {len(params)} > {MAX_WHAT_IF_PARAM_SETS}.'
+        )
+
+    query = (
+        select(
+            Sprints.data,
+            func.coalesce(
+                Sprints.hits_blob, SprintHitsArchive.hits_blob
+            ).label('hits_blob'),
+            Bookings.user_id,
+            User.name,
+            User.last_name,
+            User.photo_url,
+        )
+        .join(Slots, Slots.id == Sprints.slot_id)
+        .outerjoin(
+            SprintHitsArchive, SprintHitsArchive.sprint_pk == Sprints.id
+        )
+        .join(
+            Bookings,
+            and_(
+                Bookings.slot_id == Sprints.slot_id,
+                Bookings.sensor_id == Sprints.sensor_id,
+            ),
+        )
+        .join(User, User.id == Bookings.user_id)
+    )
+    if what_if_input.slot_id is not None:
+        query = query.where(Sprints.slot_id == what_if_input.slot_id)
+    if what_if_input.time__gt is not None:
+        query = query.where(Slots.time > what_if_input.time__gt)
+    if what_if_input.time__lt is not None:
+        query = query.where(Slots.time < what_if_input.time__lt)
+
+    users: dict[str, dict] = {}
+    sums: dict[str, list[list[float]]] = {}
+    result = await db_session.stream(query)
+    async for row in result:
+        data = row.data or {}
+        forces_all, times_all = get_sprint_columns(data, row.hits_blob)
+        profile = prepare_sprint_columns(
+            forces_all,
+            times_all,
+            float(data.get('blink_interval') or DEFAULT_BLINK_INTERVAL),
+            int(data.get('total_hits', 0)),
+        )
+        user_id = str(row.user_id)
+        if user_id not in users:
+            users[user_id] = {
+                'id': user_id,
+                'name': row.name,
+                'last_name': row.last_name,
+                'photo_url': rendition_name(row.photo_url, 'thumb'),
+                'sprints': 0,
+            }
+            sums[user_id] = [[0.0, 0.0, 0.0] for _ in params]
+        users[user_id]['sprints'] += 1
+        for acc, metrics in zip(
+            sums[user_id], calculate_sprint_metrics_grid(profile, params)
+        ):
+            acc[0] += metrics.get('power', 0)
+            acc[1] += metrics.get('tempo', 0)
+            acc[2] += metrics.get('energy', 0)
+
+    what_if = []
+    for i, (force_threshold, trim_percent, percentile_level) in enumerate(params):
+        ranking = []
+        for user_id, info in users.items():
+            power, tempo, energy = sums[user_id][i]
+            n = info['sprints']
+            ranking.append(
+                {
+                    **info,
+                    'power': round(power / n, 2),
+                    'tempo': round(tempo / n, 2),
+                    'energy': round(energy / n, 2),
+                }
+            )
+        ranking.sort(key=lambda item: item['energy'], reverse=True)
+        what_if.append(
+            {
+                'force_threshold': force_threshold,
+                'trim_percent': trim_percent,
+                'percentile_level': percentile_level,
+                'ranking': ranking,
+            }
+        )
+    return what_if
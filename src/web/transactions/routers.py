@@ -1,7 +1,7 @@
 import sqlalchemy
 from fastapi import APIRouter, Depends
 from fastapi_filter import FilterDepends
-from sqlalchemy import select
+from sqlalchemy import func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 from starlette.responses import Response
@@ -15,7 +15,7 @@ from main_schemas import ResponseErrorBody
 from web.transactions.filters import TransactionsFilter
 from web.transactions.schemas import Transaction, TransactionCreateInput, TransactionCreateByAdminInput
 from web.transactions.services import check_before_create, TransactionCreateError
-from web.users.users import current_superuser, current_user
+from web.users.users import AuthPrincipal, current_superuser, current_user
 
 router = APIRouter(
     prefix='/transactions',
@@ -54,7 +54,7 @@ async def get_all_transactions(
 async def create_user_transaction(
     transaction_input: TransactionCreateInput,
     db_session: AsyncSession = Depends(get_db_session),
-    user: User = Depends(current_user)
+    user: AuthPrincipal = Depends(current_user)
 ):
     if user.is_superuser:
         raise HTTPException(
@@ -72,10 +72,13 @@ async def create_user_transaction(
         db_transaction = Transactions(**transaction_input.model_dump())
         db_transaction.user_id = user.id
         db_session.add(db_transaction)
-        if user.score is not None:
-            user.score += transaction_input.count
-        else:
-            user.score = transaction_input.count
+        await db_session.execute(
+            update(User)
+            .where(User.id == user.id)
+            .values(
+                score=func.coalesce(User.score, 0) + transaction_input.count
+            )
+        )
         await db_session.commit()
         await db_session.refresh(db_transaction)
         return db_transaction
@@ -150,7 +153,7 @@ async def create_admin_transaction(
 async def delete_transaction(
     transaction_id: int,
     db_session: AsyncSession = Depends(get_db_session),
-    user: User = Depends(current_user)
+    user: AuthPrincipal = Depends(current_user)
 ):
     query = select(Transactions).filter(Transactions.id == transaction_id)
     transaction = await db_session.scalar(query)
@@ -0,0 +1,201 @@
+"""User photo pipeline.
+
+Uploads are streamed to a temporary file while being hashed, then decoded
+and encoded to WEBP in a worker process. Every photo is stored as a set of
+renditions named ``<hash>-<rendition>.webp``; ``User.photo_url`` keeps the
+name of the ``full`` one and the others are derived from it. Older photos
+named ``<user_id>--<timestamp>.webp`` have a single file and are served
+as-is for every rendition.
+"""
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import uuid
+
+import aiofiles as aiof
+from fastapi import UploadFile
+from PIL import Image, UnidentifiedImageError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import settings
+from constants import (
+    PHOTO_MAX_UPLOAD_BYTES,
+    PHOTO_RENDITIONS,
+    PHOTO_WEBP_QUALITY,
+)
+from core.executor import BoundedExecutor
+from database.models import User
+from settings import PHOTO_DIR
+
+logger = logging.getLogger('control')
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+HASH_LENGTH = 24
+FULL_RENDITION = 'full'
+RENDITION_NAME_RE = re.compile(
+    rf'^(?P<stem>[0-9a-f]{{{HASH_LENGTH}}})-(?P<rendition>[a-z]+)\.webp$'
+)
+
+photo_processing = BoundedExecutor(
+    'photo',
+    max_workers=settings.PHOTO_WORKERS,
+    max_pending=settings.PHOTO_MAX_PENDING,
+    processes=True,
+)
+
+
+class PhotoError(Exception):
+    pass
+
+
+def rendition_filename(stem: str, rendition: str) -> str:
+    return f'{stem}-{rendition}.webp'
+
+
+def rendition_name(filename: str | None, rendition: str) -> str | None:
+    """Name of another rendition of the photo stored as ``filename``."""
+    if not filename:
+        return filename
+    match = RENDITION_NAME_RE.match(filename)
+    if match is None:
+        return filename
+    return rendition_filename(match['stem'], rendition)
+
+
+def photo_filenames(filename: str) -> list[str]:
+    match = RENDITION_NAME_RE.match(filename)
+    if match is None:
+        return [filename]
+    return [
+        rendition_filename(match['stem'], rendition)
+        for rendition in PHOTO_RENDITIONS
+    ]
+
+
+def _write_atomic(img: Image.Image, path: str, method: int) -> None:
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(path), prefix='.tmp-', suffix='.webp'
+    )
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            img.save(
+                f,
+                format='WEBP',
+                quality=PHOTO_WEBP_QUALITY,
+                method=method,
+            )
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def render_photo(src_path: str, dest_dir: str, stem: str) -> list[str]:
+    """Decode ``src_path`` and write every rendition. Runs in a worker
+    process; renditions are downscaled from the next larger one."""
+    largest = max(PHOTO_RENDITIONS.values())
+    try:
+        with Image.open(src_path) as src:
+            if src.format == 'JPEG':
+                # let libjpeg decode at 1/2, 1/4 or 1/8 scale
+                src.draft('RGB', (largest, largest))
+            img = src.convert('RGB') if src.mode != 'RGB' else src.copy()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        raise PhotoError(f'Cannot read image: {e}') from None
+
+    written = []
+    for rendition, size in sorted(
+        PHOTO_RENDITIONS.items(), key=lambda item: item[1], reverse=True
+    ):
+        img.thumbnail((size, size), Image.Resampling.LANCZOS)
+        filename = rendition_filename(stem, rendition)
+        method = 5 if rendition == FULL_RENDITION else 4
+        _write_atomic(img, os.path.join(dest_dir, filename), method)
+        written.append(filename)
+    return written
+
+
+async def _spool_upload(upload: UploadFile, user_id: uuid.UUID) -> tuple[str, str]:
+    """Copy the upload to a temporary file in chunks and return its path
+    with a hash of the user id and the content."""
+    digest = hashlib.sha256(user_id.bytes)
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=PHOTO_DIR, prefix='.upload-')
+    os.close(fd)
+    try:
+        async with aiof.open(tmp_path, 'wb') as out:
+            while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > PHOTO_MAX_UPLOAD_BYTES:
+                    raise PhotoError(
+                        f'File is larger than {PHOTO_MAX_UPLOAD_BYTES} bytes'
+                    )
+                digest.update(chunk)
+                await out.write(chunk)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    if size == 0:
+        os.remove(tmp_path)
+        raise PhotoError('File is empty')
+    return tmp_path, digest.hexdigest()[:HASH_LENGTH]
+
+
+async def store_photo(upload: UploadFile, user_id: uuid.UUID) -> str:
+    """Store all renditions of an uploaded photo and return the name of
+    the full one."""
+    tmp_path, stem = await _spool_upload(upload, user_id)
+    try:
+        full_name = rendition_filename(stem, FULL_RENDITION)
+        if all(
+            os.path.exists(os.path.join(PHOTO_DIR, name))
+            for name in photo_filenames(full_name)
+        ):
+            return full_name
+        await photo_processing.run(render_photo, tmp_path, PHOTO_DIR, stem)
+        return full_name
+    finally:
+        os.remove(tmp_path)
+
+
+def delete_photo(filename: str) -> None:
+    for name in photo_filenames(filename):
+        logger.debug(f'Delete file {name}')
+        try:
+            os.remove(os.path.join(PHOTO_DIR, name))
+        except FileNotFoundError:
+            pass
+
+
+async def get_referenced_photos(db_session: AsyncSession) -> set[str]:
+    """Every file some User.photo_url points at, all renditions included."""
+    result = await db_session.stream_scalars(
+        select(User.photo_url).where(User.photo_url.is_not(None))
+    )
+    referenced = set()
+    async for filename in result:
+        referenced.update(photo_filenames(filename))
+    return referenced
+
+
+def find_orphaned_photos(
+    referenced: set[str], photo_dir: str, older_than: float
+) -> list[str]:
+    """Files in ``photo_dir`` nobody references, modified before the
+    ``older_than`` timestamp. The age check keeps uploads that are still
+    being written or not committed yet."""
+    orphans = []
+    with os.scandir(photo_dir) as entries:
+        for entry in entries:
+            if not entry.is_file() or entry.name in referenced:
+                continue
+            if entry.stat().st_mtime >= older_than:
+                continue
+            orphans.append(entry.name)
+    return sorted(orphans)
@@ -1,3 +1,4 @@
+import uuid
 from datetime import date
 
 import sqlalchemy
@@ -5,6 +6,7 @@ from fastapi import (
     APIRouter,
     Depends,
     HTTPException,
+    Query,
     Request,
     Response,
     status, File, UploadFile,
@@ -12,24 +14,43 @@ from fastapi import (
 from fastapi_filter import FilterDepends
 from fastapi_pagination import Page
 from fastapi_pagination.ext.sqlalchemy import paginate
-from fastapi_users import exceptions, models, schemas
+from fastapi_users import exceptions, models
 from fastapi_users.manager import BaseUserManager
 from fastapi_users.router.common import ErrorCode, ErrorModel
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
+from core.etag import conditional_get
 from database.models import User
 from dependencies import get_db_session
 from main_schemas import ResponseErrorBody
 from web.users.filters import UsersFilter
 from web.users.schemas import (
+    Booking,
+    Record,
+    Transaction,
     UserRead,
     UserUpdate,
     UserListRead
 )
-from web.users.services import calc_age, calc_score, calc_count_booking_info, get_full_link, save_file, delete_file
+from web.users.photos import PhotoError
+from web.users.services import (
+    calc_age,
+    calc_score,
+    calc_count_booking_info,
+    save_file,
+    delete_file,
+    set_photo_links,
+    get_user_version,
+    get_user_profile,
+    parse_expand,
+    user_bookings_query,
+    user_records_query,
+    user_transactions_query,
+)
 from web.users.users import (
+    AuthPrincipal,
     current_active_user,
     current_superuser,
     get_user_manager, current_user, UserManager,
@@ -37,6 +58,66 @@ from web.users.users import (
 
 router = APIRouter(prefix='/users', tags=['users'])
 
+SECTION_SCHEMAS = {
+    'bookings': Booking,
+    'records': Record,
+    'transactions': Transaction,
+}
+EXPAND_DESCRIPTION = (
+    'Comma separated sections to include: bookings, records,'
+    ' transactions. Only the latest items are included, the full'
+    ' history is under /users/me/<section>.'
+)
+
+
+async def read_user_profile(
+    request: Request,
+    db_session: AsyncSession,
+    user_id: uuid.UUID,
+    expand: str | None,
+) -> UserRead:
+    try:
+        sections = parse_expand(expand)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)
+        )
+    profile = await get_user_profile(db_session, user_id, sections)
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    user, items = profile
+    set_photo_links(request, user)
+    # the user's relationships are never read, they may be loaded already
+    fields = {
+        name: getattr(user, name)
+        for name in UserRead.model_fields
+        if name not in SECTION_SCHEMAS
+    }
+    for name, schema in SECTION_SCHEMAS.items():
+        fields[name] = (
+            [schema.model_validate(item) for item in items[name]]
+            if name in items else None
+        )
+    return UserRead.model_validate(fields)
+
+
+async def _me_version(
+    principal: AuthPrincipal = Depends(current_active_user),
+    db_session: AsyncSession = Depends(get_db_session),
+):
+    return await get_user_version(db_session, principal.id)
+
+
+async def _user_version(
+    id: str,
+    db_session: AsyncSession = Depends(get_db_session),
+):
+    try:
+        user_id = uuid.UUID(id)
+    except ValueError:
+        return None
+    return await get_user_version(db_session, user_id)
+
 
 @router.get(
     '/',
@@ -103,8 +184,10 @@ async def get_user_or_404(
 @router.get(
     '/me',
     response_model=UserRead,
+    dependencies=[Depends(conditional_get(_me_version))],
     name='users:current_user',
     responses={
+        status.HTTP_400_BAD_REQUEST: {'model': ResponseErrorBody},
         status.HTTP_401_UNAUTHORIZED: {
             'description': 'Missing token or inactive user.',
         },
@@ -112,21 +195,59 @@ async def get_user_or_404(
 )
 async def me(
     request: Request,
-    user: models.UP = Depends(current_active_user),
+    expand: str | None = Query(None, description=EXPAND_DESCRIPTION),
+    principal: AuthPrincipal = Depends(current_active_user),
+    db_session: AsyncSession = Depends(get_db_session),
+):
+    return await read_user_profile(request, db_session, principal.id, expand)
+
+
+@router.get(
+    '/me/bookings',
+    response_model=Page[Booking],
+    dependencies=[Depends(conditional_get(_me_version))],
+)
+async def get_my_bookings(
+    principal: AuthPrincipal = Depends(current_active_user),
+    db_session: AsyncSession = Depends(get_db_session),
+):
+    return await paginate(db_session, user_bookings_query(principal.id))
+
+
+@router.get(
+    '/me/records',
+    response_model=Page[Record],
+    dependencies=[Depends(conditional_get(_me_version))],
+)
+async def get_my_records(
+    principal: AuthPrincipal = Depends(current_active_user),
+    db_session: AsyncSession = Depends(get_db_session),
+):
+    return await paginate(db_session, user_records_query(principal.id))
+
+
+@router.get(
+    '/me/transactions',
+    response_model=Page[Transaction],
+    dependencies=[Depends(conditional_get(_me_version))],
+)
+async def get_my_transactions(
+    principal: AuthPrincipal = Depends(current_active_user),
+    db_session: AsyncSession = Depends(get_db_session),
 ):
-    user.age = calc_age(user.date_of_birth, date.today())
-    user.count_trainings, user.energy, user.status = calc_count_booking_info(user)
-    user.score = calc_score(user)
-    user.photo_url = get_full_link(request, user.photo_url) if user.photo_url else None
-    return schemas.model_validate(UserRead, user)
+    return await paginate(db_session, user_transactions_query(principal.id))
 
 
 @router.get(
     '/{id}',
     response_model=UserRead,
-    dependencies=[Depends(current_superuser)],
+    dependencies=[
+        Depends(current_superuser),
+        Depends(conditional_get(_user_version)),
+    ],
     name='users:user',
     responses={
+        status.HTTP_400_BAD_REQUEST: {'model': ResponseErrorBody},
         status.HTTP_401_UNAUTHORIZED: {
             'description': 'Missing token or inactive user.',
         },
@@ -138,12 +259,17 @@ async def me(
         },
     },
 )
-async def get_user(request: Request, user=Depends(get_user_or_404)):
-    user.age = calc_age(user.date_of_birth, date.today())
-    user.count_trainings, user.energy, user.status = calc_count_booking_info(user)
-    user.score = calc_score(user)
-    user.photo_url = get_full_link(request, user.photo_url) if user.photo_url else None
-    return schemas.model_validate(UserRead, user)
+async def get_user(
+    request: Request,
+    id: str,
+    expand: str | None = Query(None, description=EXPAND_DESCRIPTION),
+    db_session: AsyncSession = Depends(get_db_session),
+):
+    try:
+        user_id = uuid.UUID(id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    return await read_user_profile(request, db_session, user_id, expand)
 
 
 @router.patch(
@@ -201,11 +327,6 @@ async def update_user(
         user = await user_manager.update(
             user_update, user, safe=False, request=request
         )
-        await db_session.refresh(user)
-        user.age = calc_age(user.date_of_birth, date.today())
-        user.count_trainings, user.energy, user.status = calc_count_booking_info(user)
-        user.score = calc_score(user)
-        return schemas.model_validate(UserRead, user)
     except exceptions.InvalidPasswordException as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -219,6 +340,7 @@ async def update_user(
             status.HTTP_400_BAD_REQUEST,
             detail=ErrorCode.UPDATE_USER_EMAIL_ALREADY_EXISTS,
         )
+    return await read_user_profile(request, db_session, user.id, None)
 
 
 @router.post(
@@ -236,28 +358,34 @@ async def add_photo(
     request: Request,
     file: UploadFile = File(...),
     user_id: str | None = None,
-    user = Depends(current_user),
+    principal: AuthPrincipal = Depends(current_user),
     user_manager: UserManager = Depends(get_user_manager),
     db_session: AsyncSession = Depends(get_db_session),
 ):
-    if user.is_superuser:
+    if principal.is_superuser:
         if user_id is None:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail='User ID must be provided',
             )
-        user = await get_user_or_404(request, user_id, user_manager=user_manager)
+    else:
+        user_id = str(principal.id)
+    user = await get_user_or_404(request, user_id, user_manager=user_manager)
     if file is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail='File must be provided',
         )
-    file_name = await save_file(file, user)
+    try:
+        file_name = await save_file(file, user)
+    except PhotoError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
     user.photo_url = file_name
     await db_session.commit()
-    await db_session.refresh(user)
-    user.photo_url = get_full_link(request, user.photo_url) if user.photo_url else None
-    return user
+    return await read_user_profile(request, db_session, user.id, None)
 
 
 @router.delete(
@@ -274,17 +402,19 @@ async def add_photo(
 async def delete_photo(
     request: Request,
     user_id: str | None = None,
-    user = Depends(current_user),
+    principal: AuthPrincipal = Depends(current_user),
     user_manager: UserManager = Depends(get_user_manager),
     db_session: AsyncSession = Depends(get_db_session),
 ):
-    if user.is_superuser:
+    if principal.is_superuser:
         if user_id is None:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail='User ID must be provided',
             )
-        user = await get_user_or_404(request, user_id, user_manager=user_manager)
+    else:
+        user_id = str(principal.id)
+    user = await get_user_or_404(request, user_id, user_manager=user_manager)
     if user.photo_url:
         delete_file(user.photo_url)
     user.photo_url = None
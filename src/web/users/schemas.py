@@ -53,6 +53,8 @@ class UserRead(schemas.BaseUser[uuid.UUID]):
     phone: str | None
     telegram_id: str | None
     photo_url: str | None
+    photo_thumb_url: str | None = None
+    photo_avatar_url: str | None = None
     gender: str | None
     date_of_birth: date | None
     created_at: datetime
@@ -62,9 +64,10 @@ class UserRead(schemas.BaseUser[uuid.UUID]):
     status: str | None = None
     score: int | None = 0
     count_trainings: int | None = 0
-    bookings: list[Booking] | None = []
-    records: list[Record] | None = []
-    transactions: list[Transaction] | None = []
+    # null unless asked for with ?expand=, then the latest few only
+    bookings: list[Booking] | None = None
+    records: list[Record] | None = None
+    transactions: list[Transaction] | None = None
 
     is_active: bool = Field(True, exclude=True)
     is_verified: bool = Field(False, exclude=True)
@@ -1,17 +1,18 @@
-import io
 import logging
-import os
-from datetime import date, datetime
+import uuid
+from datetime import date
+from functools import lru_cache
 
-from PIL import Image
 from fastapi import UploadFile
+from sqlalchemy import Select, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import noload, selectinload
 from starlette.requests import Request
 
-import aiofiles as aiof
-
 import constants
-from database.models import User
-from settings import BASE_URL, STATIC_FOLDER, PHOTO_FOLDER, PHOTO_DIR
+from database.models import Bookings, Records, Slots, Transactions, User
+from settings import BASE_URL, STATIC_FOLDER, PHOTO_FOLDER
+from web.users.photos import delete_photo, rendition_name, store_photo
 
 
 logger = logging.getLogger('control')
@@ -30,6 +31,16 @@ def calc_age(born: date, today: date | None = None) -> int | None:
     return years
 
 
+def calc_status(energy: float) -> str:
+    status = ''
+    for installed_status, level in constants.status_levels.items():
+        if energy >= level:
+            status = installed_status
+        else:
+            break
+    return status
+
+
 def calc_count_booking_info(user: User) -> (int, float, str):
     trainings_count, energy = 0, 0
     for booking in user.bookings:
@@ -37,13 +48,134 @@ def calc_count_booking_info(user: User) -> (int, float, str):
             trainings_count += 1
             if booking.energy:
                 energy += booking.energy or 0
-    status = ''
-    for installed_status, level in constants.status_levels.items():
-        if energy >= level:
-            status = installed_status
-        else:
-            break
-    return trainings_count, energy, status
+    return trainings_count, energy, calc_status(energy)
+
+
+async def get_booking_info(
+    db_session: AsyncSession, user_id: uuid.UUID
+) -> (int, float, str):
+    """calc_count_booking_info computed in the database."""
+    query = (
+        select(
+            func.count(Bookings.id),
+            func.coalesce(func.sum(Bookings.energy), 0.0),
+        )
+        .join(Slots, Slots.id == Bookings.slot_id)
+        .where(Bookings.user_id == user_id, Slots.is_done.is_(True))
+    )
+    trainings_count, energy = (await db_session.execute(query)).one()
+    return trainings_count, energy, calc_status(energy)
+
+
+def parse_expand(expand: str | None) -> set[str]:
+    """``?expand=bookings,records``; raises ValueError on unknown names."""
+    sections = {s.strip() for s in (expand or '').split(',') if s.strip()}
+    unknown = sections - set(USER_SECTIONS)
+    if unknown:
+        raise ValueError(
+            f'Unknown expand {", ".join(sorted(unknown))};'
+            f' expected any of {", ".join(USER_SECTIONS)}'
+        )
+    return sections
+
+
+def user_bookings_query(user_id: uuid.UUID) -> Select:
+    return (
+        select(Bookings)
+        .where(Bookings.user_id == user_id)
+        .options(
+            noload(Bookings.user),
+            selectinload(Bookings.slot).options(
+                noload(Slots.bookings), noload(Slots.sprints)
+            ),
+        )
+        .order_by(Bookings.created_at.desc(), Bookings.id.desc())
+    )
+
+
+def user_records_query(user_id: uuid.UUID) -> Select:
+    return (
+        select(Records)
+        .where(Records.user_id == user_id)
+        .options(noload(Records.user))
+        .order_by(Records.date.desc(), Records.id.desc())
+    )
+
+
+def user_transactions_query(user_id: uuid.UUID) -> Select:
+    return (
+        select(Transactions)
+        .where(Transactions.user_id == user_id)
+        .options(noload(Transactions.user))
+        .order_by(Transactions.created_at.desc(), Transactions.id.desc())
+    )
+
+
+USER_SECTIONS = {
+    'bookings': user_bookings_query,
+    'records': user_records_query,
+    'transactions': user_transactions_query,
+}
+
+
+async def get_user_profile(
+    db_session: AsyncSession, user_id: uuid.UUID, expand: set[str]
+) -> tuple[User, dict[str, list]] | None:
+    """The user without their history, the booking totals computed in
+    SQL, and the latest USER_EXPAND_LIMIT items of each ``expand``
+    section. Sections not asked for are not loaded at all."""
+    query = (
+        select(User)
+        .where(User.id == user_id)
+        .options(
+            noload(User.bookings),
+            noload(User.records),
+            noload(User.transactions),
+        )
+    )
+    user = await db_session.scalar(query)
+    if user is None:
+        return None
+    user.age = calc_age(user.date_of_birth, date.today())
+    user.count_trainings, user.energy, user.status = await get_booking_info(
+        db_session, user_id
+    )
+    user.score = calc_score(user)
+    sections = {}
+    for name in sorted(expand):
+        query = USER_SECTIONS[name](user_id).limit(constants.USER_EXPAND_LIMIT)
+        sections[name] = list((await db_session.scalars(query)).all())
+    return user, sections
+
+
+async def get_user_version(
+    db_session: AsyncSession, user_id: uuid.UUID
+) -> tuple:
+    """Everything UserRead is built from, in one row: the user, their
+    bookings and booked slots, and the insert-only records and
+    transactions. The date is there for the age."""
+    def aggregate(column, model):
+        return (
+            select(column)
+            .where(model.user_id == user_id)
+            .scalar_subquery()
+        )
+
+    booked_slots = select(Bookings.slot_id).where(Bookings.user_id == user_id)
+    query = select(
+        select(User.updated_at).where(User.id == user_id).scalar_subquery(),
+        aggregate(func.count(Bookings.id), Bookings),
+        aggregate(func.max(Bookings.updated_at), Bookings),
+        select(func.max(Slots.updated_at))
+        .where(Slots.id.in_(booked_slots))
+        .scalar_subquery(),
+        aggregate(func.count(Records.id), Records),
+        aggregate(func.max(Records.id), Records),
+        aggregate(func.count(Transactions.id), Transactions),
+        aggregate(func.max(Transactions.id), Transactions),
+    )
+    row = (await db_session.execute(query)).one()
+    return (*row, date.today())
 
 
 def calc_score(user: User) -> int:
@@ -52,39 +184,36 @@ def calc_score(user: User) -> int:
     return user.score
 
 
+@lru_cache(maxsize=8)
+def _photo_link_prefix(base_url: str) -> str:
+    return f'{base_url}api/{STATIC_FOLDER}/{PHOTO_FOLDER}/'
+
+
 def get_full_link(request: Request, filename: str) -> str:
-    base_url = BASE_URL or str(request.base_url)
-    return f'{base_url}api/{STATIC_FOLDER}/{PHOTO_FOLDER}/{filename}'
+    return _photo_link_prefix(BASE_URL or str(request.base_url)) + filename
 
 
 async def save_file(new_file: UploadFile, user: User) -> str:
-    if user.photo_url is not None:
+    new_name = await store_photo(new_file, user.id)
+    if user.photo_url is not None and user.photo_url != new_name:
         delete_file(user.photo_url)
-    content = await new_file.read()
-    img = Image.open(io.BytesIO(content))
-    img.thumbnail((600, 600), Image.Resampling.LANCZOS)
-
-    if img.mode in ("RGBA", "P"):
-        img = img.convert("RGB")
-
-    new_name = (
-        f'{user.id}--'
-        f"{datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S')}.webp"
-    )
-    path_to_file = os.path.join(PHOTO_DIR, new_name)
-    img.save(
-        path_to_file,
-        format="WEBP",
-        quality=65,
-        method=5,
-        optimize=True
-    )
     return new_name
 
 
 def delete_file(filename: str) -> None:
-    logger.debug(f'Delete file {filename}')
-    try:
-        os.remove(os.path.join(PHOTO_DIR, filename))
-    except FileNotFoundError:
-        pass
+    delete_photo(filename)
+
+
+def set_photo_links(request: Request, user: User) -> None:
+    """Replace the stored photo name with links to its renditions."""
+    filename = user.photo_url
+    if not filename:
+        user.photo_url = user.photo_thumb_url = user.photo_avatar_url = None
+        return
+    user.photo_url = get_full_link(request, filename)
+    user.photo_thumb_url = get_full_link(
+        request, rendition_name(filename, 'thumb')
+    )
+    user.photo_avatar_url = get_full_link(
+        request, rendition_name(filename, 'avatar')
+    )
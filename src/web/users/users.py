@@ -1,5 +1,8 @@
+import hashlib
+import hmac
 import logging
 import uuid
+from dataclasses import dataclass
 from typing import Any, Dict, List, Optional, Union
 
 import settings
@@ -23,8 +26,14 @@ from fastapi_users.authentication import (
 )
 from fastapi_users.db import SQLAlchemyUserDatabase
 from fastapi_users.jwt import decode_jwt, generate_jwt
+from jwt import PyJWTError
 from sqlalchemy import select
+from core.executor import BoundedExecutor
+from core.ttl_cache import TTLCache
+from web.bookings.services import release_user_places
 from web.common.common import get_cookie_domain
+from web.slots.schedule import refresh_schedule
+from web.waitlist.services import notify_promoted, promote_from_waitlist
 from web.users.schemas import UserCreate
 from web.users.services import calc_age, calc_count_booking_info, calc_score
 
@@ -43,6 +52,45 @@ class JWTDecodeError(Exception):
     pass
 
 
+@dataclass(frozen=True)
+class AuthPrincipal:
+    """What an authenticated request knows about its user. Endpoints that
+    need the profile or relationships load the full User explicitly."""
+    id: uuid.UUID
+    email: str
+    is_active: bool
+    is_superuser: bool
+    is_verified: bool
+    token_version: str = ''
+
+
+def calc_token_version(hashed_password: str) -> str:
+    """Changes whenever the password does, so access tokens issued before
+    a password change stop matching."""
+    return hmac.new(
+        (SECRET or '').encode(), hashed_password.encode(), hashlib.sha256
+    ).hexdigest()[:16]
+
+
+def get_token_version(user: Union[User, AuthPrincipal]) -> str:
+    if isinstance(user, AuthPrincipal):
+        return user.token_version
+    return calc_token_version(user.hashed_password)
+
+
+principal_cache = TTLCache(ttl=settings.AUTH_CACHE_TTL)
+
+password_hashing = BoundedExecutor(
+    'password-hash',
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
+
+
+def invalidate_principal(user_id: uuid.UUID) -> None:
+    principal_cache.delete(str(user_id))
+
+
 def build_refresh_token(user: models.UP) -> str:
     payload = {
         'sub': str(user.id),
@@ -52,7 +100,9 @@ def build_refresh_token(user: models.UP) -> str:
     return generate_jwt(payload, SECRET, REFRESH_TTL, algorithm=ALGORITHM)
 
 
-async def verify_refresh(token: str, user_manager: 'UserManager') -> User:
+async def verify_refresh(
+    token: str, user_manager: 'UserManager'
+) -> 'AuthPrincipal':
     try:
         data = decode_jwt(
             token,
@@ -69,7 +119,7 @@ async def verify_refresh(token: str, user_manager: 'UserManager') -> User:
 
     try:
         parsed_id = user_manager.parse_id(user_id)
-        user = await user_manager.get(parsed_id)
+        user = await user_manager.get_principal(parsed_id)
         logger.info('Verified user: %s', user.id)
     except exceptions.UserNotExists:
         raise HTTPException(status_code=401, detail='User not found')
@@ -84,13 +134,46 @@ class UserManager(UUIDIDMixin, BaseUserManager[User, uuid.UUID]):
     reset_password_token_secret = SECRET
     verification_token_secret = SECRET
 
+    def __init__(self, user_db, password_helper=None):
+        super().__init__(user_db, password_helper)
+        # slots given places back by on_before_delete and the waitlist
+        # promotions into them, refreshed and announced after commit
+        self._released_slot_ids: list[int] = []
+        self._promoted: list[dict] = []
+
+    async def hash_password(self, password: str) -> str:
+        return await password_hashing.run(self.password_helper.hash, password)
+
+    async def verify_password(
+        self, password: str, hashed_password: str
+    ) -> tuple[bool, Optional[str]]:
+        return await password_hashing.run(
+            self.password_helper.verify_and_update, password, hashed_password
+        )
+
     async def create(
         self,
         user_create: schemas.UC,
         safe: bool = False,
         request: Optional[Request] = None,
     ) -> models.UP:
-        user = await super().create(user_create, safe=safe, request=request)
+        await self.validate_password(user_create.password, user_create)
+
+        existing_user = await self.user_db.get_by_email(user_create.email)
+        if existing_user is not None:
+            raise exceptions.UserAlreadyExists()
+
+        user_dict = (
+            user_create.create_update_dict()
+            if safe
+            else user_create.create_update_dict_superuser()
+        )
+        password = user_dict.pop('password')
+        user_dict['hashed_password'] = await self.hash_password(password)
+
+        user = await self.user_db.create(user_dict)
+        await self.on_after_register(user, request)
+
         user.age = calc_age(user.date_of_birth, None)
         (
             user.count_trainings,
@@ -100,6 +183,66 @@ class UserManager(UUIDIDMixin, BaseUserManager[User, uuid.UUID]):
         user.score = calc_score(user)
         return user
 
+    async def _update(
+        self, user: models.UP, update_dict: Dict[str, Any]
+    ) -> models.UP:
+        update_dict = dict(update_dict)
+        password = update_dict.pop('password', None)
+        if password is not None:
+            await self.validate_password(password, user)
+            update_dict['hashed_password'] = await self.hash_password(password)
+        return await super()._update(user, update_dict)
+
+    async def forgot_password(
+        self, user: models.UP, request: Optional[Request] = None
+    ) -> None:
+        if not user.is_active:
+            raise exceptions.UserInactive()
+
+        token_data = {
+            'sub': str(user.id),
+            'password_fgpt': await self.hash_password(user.hashed_password),
+            'aud': self.reset_password_token_audience,
+        }
+        token = generate_jwt(
+            token_data,
+            self.reset_password_token_secret,
+            self.reset_password_token_lifetime_seconds,
+        )
+        await self.on_after_forgot_password(user, token, request)
+
+    async def reset_password(
+        self, token: str, password: str, request: Optional[Request] = None
+    ) -> models.UP:
+        try:
+            data = decode_jwt(
+                token,
+                self.reset_password_token_secret,
+                [self.reset_password_token_audience],
+            )
+            user_id = data['sub']
+            password_fingerprint = data['password_fgpt']
+            parsed_id = self.parse_id(user_id)
+        except (PyJWTError, KeyError, exceptions.InvalidID):
+            raise exceptions.InvalidResetPasswordToken()
+
+        user = await self.get(parsed_id)
+
+        valid_password_fingerprint, _ = await self.verify_password(
+            user.hashed_password, password_fingerprint
+        )
+        if not valid_password_fingerprint:
+            raise exceptions.InvalidResetPasswordToken()
+
+        if not user.is_active:
+            raise exceptions.UserInactive()
+
+        updated_user = await self._update(user, {'password': password})
+
+        await self.on_after_reset_password(user, request)
+
+        return updated_user
+
     async def validate_password(
         self,
         password: str,
@@ -118,13 +261,46 @@ class UserManager(UUIDIDMixin, BaseUserManager[User, uuid.UUID]):
         update_dict: Dict[str, Any],
         request: Optional[Request] = None,
     ):
+        invalidate_principal(user.id)
         logger.debug(f'User {user.id} has been updated.')
 
+    async def on_after_reset_password(
+        self, user: User, request: Optional[Request] = None
+    ) -> None:
+        invalidate_principal(user.id)
+        logger.debug(f'User {user.id} has reset their password.')
+
+    async def on_after_verify(
+        self, user: User, request: Optional[Request] = None
+    ) -> None:
+        invalidate_principal(user.id)
+
     async def on_before_delete(
         self, user: User, request: Optional[Request] = None
     ):
+        invalidate_principal(user.id)
+        # committed together with the delete, which cascades to bookings
+        self._released_slot_ids = await release_user_places(
+            self.user_db.session, user.id
+        )
+        for slot_id in self._released_slot_ids:
+            self._promoted += await promote_from_waitlist(
+                self.user_db.session, slot_id
+            )
         logger.debug(f'User {user.id} is going to be deleted')
 
+    async def on_after_delete(
+        self, user: User, request: Optional[Request] = None
+    ):
+        if request is not None:
+            cache = request.app.state.cache
+            await notify_promoted(cache, self._promoted)
+            if self._released_slot_ids:
+                await refresh_schedule(
+                    self.user_db.session, cache, self._released_slot_ids
+                )
+        logger.debug(f'User {user.id} has been deleted')
+
     async def on_after_login(
         self,
         user: models.UP,
@@ -138,7 +314,6 @@ class UserManager(UUIDIDMixin, BaseUserManager[User, uuid.UUID]):
 
         domain = get_cookie_domain(request.url.hostname)
         refresh_token = build_refresh_token(user)
-        logger.info('refresh_token: %s', refresh_token)
         response.set_cookie(
             key='refresh_token',
             value=refresh_token,
@@ -149,6 +324,36 @@ class UserManager(UUIDIDMixin, BaseUserManager[User, uuid.UUID]):
             secure=True,
         )
 
+    async def get_principal(self, user_id: uuid.UUID) -> AuthPrincipal:
+        """Served from the in-process principal cache for up to
+        AUTH_CACHE_TTL seconds; the UserManager hooks drop the entry
+        whenever the user changes."""
+        principal = principal_cache.get(str(user_id))
+        if principal is not None:
+            return principal
+        query = select(
+            User.id,
+            User.email,
+            User.is_active,
+            User.is_superuser,
+            User.is_verified,
+            User.hashed_password,
+        ).where(User.id == user_id)
+        result = await self.user_db.session.execute(query)
+        row = result.one_or_none()
+        if row is None:
+            raise exceptions.UserNotExists()
+        principal = AuthPrincipal(
+            id=row.id,
+            email=row.email,
+            is_active=row.is_active,
+            is_superuser=row.is_superuser,
+            is_verified=row.is_verified,
+            token_version=calc_token_version(row.hashed_password),
+        )
+        principal_cache.set(str(user_id), principal)
+        return principal
+
     async def get_by_phone(self, phone: str) -> User:
         query = select(User).where(User.phone == phone.lower())
         async with Session() as db_session:
@@ -180,13 +385,13 @@ class UserManager(UUIDIDMixin, BaseUserManager[User, uuid.UUID]):
         except exceptions.UserNotExists:
             # Run the hasher to mitigate timing attack
             # Inspired from Django: https://code.djangoproject.com/ticket/20760
-            self.password_helper.hash(credentials.password)
+            await self.hash_password(credentials.password)
             return None
 
         (
             verified,
             updated_password_hash,
-        ) = self.password_helper.verify_and_update(
+        ) = await self.verify_password(
             credentials.password, user.hashed_password
         )
         if not verified:
@@ -196,13 +401,14 @@ class UserManager(UUIDIDMixin, BaseUserManager[User, uuid.UUID]):
             await self.user_db.update(
                 user, {'hashed_password': updated_password_hash}
             )
+            invalidate_principal(user.id)
 
         return user
 
     async def on_after_forgot_password(
         self, user: models.UP, token: str, request: Optional[Request] = None
     ) -> None:
-        logger.debug(f'***token***: {token}')
+        logger.debug(f'User {user.id} has forgot their password.')
 
 
 async def get_user_manager(
@@ -215,12 +421,41 @@ bearer_transport = BearerTransport(tokenUrl='auth/jwt/login')
 
 
 class CustomJWTStrategy(JWTStrategy):
+    async def read_token(
+        self, token: Optional[str], user_manager: 'UserManager'
+    ) -> Optional[AuthPrincipal]:
+        if token is None:
+            return None
+        try:
+            data = decode_jwt(
+                token,
+                self.decode_key,
+                self.token_audience,
+                algorithms=[self.algorithm],
+            )
+            user_id = data.get('sub')
+            if user_id is None:
+                return None
+        except PyJWTError:
+            return None
+
+        try:
+            parsed_id = user_manager.parse_id(user_id)
+            principal = await user_manager.get_principal(parsed_id)
+        except (exceptions.UserNotExists, exceptions.InvalidID):
+            return None
+        version = data.get('ver')
+        if version is not None and version != principal.token_version:
+            return None
+        return principal
+
     async def write_token(self, user: models.UP) -> str:
         data = {
             'sub': str(user.id),
             'aud': self.token_audience,
             'is_superuser': user.is_superuser,
             'email': user.email,
+            'ver': get_token_version(user),
         }
         return generate_jwt(
             data,
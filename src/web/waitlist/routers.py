@@ -0,0 +1,132 @@
+import json
+from contextlib import aclosing
+
+from fastapi import APIRouter, Depends, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+from starlette.exceptions import HTTPException
+from starlette.responses import Response, StreamingResponse
+
+from constants import WAITLIST_CHANNEL, WAITLIST_KEEPALIVE
+from core.simple_cache import Cache
+from database.models import WaitlistEntries
+from dependencies import get_cache, get_db_session
+from main_schemas import ResponseErrorBody
+from web.bookings.services import DuplicateBookingError, NotFoundSlotError
+from web.users.users import AuthPrincipal, current_user
+from web.waitlist.schemas import WaitlistEntry, WaitlistJoinInput
+from web.waitlist.services import WaitlistError, join_waitlist, waitlist_query
+
+router = APIRouter(
+    prefix='/waitlist',
+    tags=['waitlist'],
+)
+
+
+@router.get(
+    '/',
+    response_model=list[WaitlistEntry],
+)
+async def get_waitlist(
+    slot_id: int | None = None,
+    db_session: AsyncSession = Depends(get_db_session),
+    user: AuthPrincipal = Depends(current_user),
+):
+    query = waitlist_query(
+        slot_id=slot_id, user_id=None if user.is_superuser else user.id
+    )
+    result = await db_session.execute(query)
+    return result.mappings().all()
+
+
+@router.post(
+    '/',
+    response_model=WaitlistEntry,
+    status_code=status.HTTP_201_CREATED,
+    responses={
+        status.HTTP_400_BAD_REQUEST: {
+            'model': ResponseErrorBody,
+        },
+    },
+)
+async def join_slot_waitlist(
+    join_input: WaitlistJoinInput,
+    db_session: AsyncSession = Depends(get_db_session),
+    user: AuthPrincipal = Depends(current_user),
+):
+    if user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail='Superuser cannot join waitlists',
+        )
+    try:
+        entry_id = await join_waitlist(db_session, join_input.slot_id, user.id)
+    except (NotFoundSlotError, DuplicateBookingError, WaitlistError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f'Can not join the waitlist: {e}',
+        )
+    await db_session.commit()
+    query = waitlist_query(slot_id=join_input.slot_id, user_id=user.id)
+    return (await db_session.execute(query)).mappings().one()
+
+
+@router.delete(
+    '/{entry_id:int}',
+    status_code=status.HTTP_204_NO_CONTENT,
+    responses={
+        status.HTTP_404_NOT_FOUND: {
+            'model': ResponseErrorBody,
+        },
+    },
+)
+async def leave_waitlist(
+    entry_id: int,
+    db_session: AsyncSession = Depends(get_db_session),
+    user: AuthPrincipal = Depends(current_user),
+):
+    query = select(WaitlistEntries).where(WaitlistEntries.id == entry_id)
+    entry = await db_session.scalar(query)
+    if entry is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f'Waitlist entry with id {entry_id} not found',
+        )
+    if not user.is_superuser and entry.user_id != user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail='You do not have permission to delete this entry',
+        )
+    await db_session.delete(entry)
+    await db_session.commit()
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+@router.get('/events')
+async def waitlist_events(
+    request: Request,
+    user: AuthPrincipal = Depends(current_user),
+    cache: Cache = Depends(get_cache),
+):
+    """Server-sent events: ``promoted`` when a waitlist entry of the
+    member becomes a booking, with keep-alive comments in between."""
+    channel = WAITLIST_CHANNEL.format(user_id=user.id)
+
+    async def stream():
+        async with aclosing(cache.listen(channel, WAITLIST_KEEPALIVE)) as messages:
+            yield ': connected\n\n'
+            async for message in messages:
+                if await request.is_disconnected():
+                    break
+                if message is None:
+                    yield ': keep-alive\n\n'
+                    continue
+                event = message.pop('event', 'message')
+                yield f'event: {event}\ndata: {json.dumps(message)}\n\n'
+
+    return StreamingResponse(
+        stream(),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
@@ -0,0 +1,18 @@
+import uuid
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class WaitlistEntry(BaseModel):
+    id: int
+    slot_id: int
+    user_id: uuid.UUID
+    created_at: datetime
+    position: int
+
+    model_config = {"from_attributes": True}
+
+
+class WaitlistJoinInput(BaseModel):
+    slot_id: int
@@ -0,0 +1,160 @@
+import logging
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from constants import WAITLIST_CHANNEL
+from core.simple_cache import Cache
+from database.models import Bookings, Slots, WaitlistEntries
+from web.bookings.services import (
+    DuplicateBookingError,
+    ExcessiveBookingError,
+    NotFoundSlotError,
+    release_places,
+    reserve_places,
+)
+
+logger = logging.getLogger('control')
+
+WAITLIST_SOURCE = 'waitlist'
+
+
+class WaitlistError(Exception):
+    pass
+
+
+def waitlist_query(slot_id: int | None = None, user_id: uuid.UUID | None = None):
+    """Entries with their 1-based place in the slot's queue."""
+    ranked = select(
+        WaitlistEntries,
+        func.row_number()
+        .over(
+            partition_by=WaitlistEntries.slot_id,
+            order_by=WaitlistEntries.id,
+        )
+        .label('position'),
+    )
+    if slot_id is not None:
+        ranked = ranked.where(WaitlistEntries.slot_id == slot_id)
+    ranked = ranked.subquery()
+    query = select(ranked)
+    if user_id is not None:
+        query = query.where(ranked.c.user_id == user_id)
+    return query.order_by(ranked.c.slot_id, ranked.c.position)
+
+
+async def join_waitlist(
+    db_session: AsyncSession, slot_id: int, user_id: uuid.UUID
+) -> int:
+    """Queue the user for a full slot; returns the entry id."""
+    # locked, so a cancellation either commits before the check or
+    # promotes from the queue after this entry is in it
+    query = (
+        select(Slots.is_done, Slots.number_of_places, Slots.booked_count)
+        .where(Slots.id == slot_id)
+        .with_for_update()
+    )
+    slot = (await db_session.execute(query)).first()
+    if slot is None:
+        raise NotFoundSlotError(f'Slot with id {slot_id} not found')
+    if slot.is_done:
+        raise WaitlistError('This slot is already done.')
+    if slot.booked_count < slot.number_of_places:
+        raise WaitlistError('This slot has free places, book it instead.')
+    query = select(Bookings.id).where(
+        Bookings.slot_id == slot_id, Bookings.user_id == user_id
+    )
+    if await db_session.scalar(query.limit(1)) is not None:
+        raise DuplicateBookingError(
+            'Already exist booking for this user in this slot.'
+        )
+    entry_id = await db_session.scalar(
+        insert(WaitlistEntries)
+        .values(
+            slot_id=slot_id,
+            user_id=user_id,
+            created_at=datetime.now(timezone.utc),
+        )
+        .on_conflict_do_nothing(constraint='uix_waitlist_slot_user')
+        .returning(WaitlistEntries.id)
+    )
+    if entry_id is None:
+        raise WaitlistError('Already on the waitlist of this slot.')
+    return entry_id
+
+
+async def promote_from_waitlist(
+    db_session: AsyncSession, slot_id: int
+) -> list[dict]:
+    """Turn waitlist entries of the slot into bookings, first come first
+    served, while it has free places. Runs in the caller's transaction,
+    so a cancellation and the promotion it frees a place for commit or
+    roll back together. Nobody is promoted into a finished class."""
+    promoted = []
+    is_done = await db_session.scalar(
+        select(Slots.is_done).where(Slots.id == slot_id)
+    )
+    if is_done is None or is_done:
+        return promoted
+    while True:
+        query = (
+            select(WaitlistEntries.id, WaitlistEntries.user_id)
+            .where(WaitlistEntries.slot_id == slot_id)
+            .order_by(WaitlistEntries.id.asc())
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        entry = (await db_session.execute(query)).first()
+        if entry is None:
+            break
+        try:
+            await reserve_places(db_session, slot_id)
+        except (ExcessiveBookingError, NotFoundSlotError):
+            break
+        await db_session.execute(
+            delete(WaitlistEntries).where(WaitlistEntries.id == entry.id)
+        )
+        booking_id = await db_session.scalar(
+            insert(Bookings)
+            .values(
+                slot_id=slot_id,
+                user_id=entry.user_id,
+                created_at=datetime.now(timezone.utc),
+                source_record=WAITLIST_SOURCE,
+            )
+            .on_conflict_do_nothing(constraint='uix_user_slot')
+            .returning(Bookings.id)
+        )
+        if booking_id is None:
+            # booked meanwhile by other means, the place goes to the next
+            await release_places(db_session, slot_id)
+            continue
+        promoted.append(
+            {
+                'event': 'promoted',
+                'user_id': str(entry.user_id),
+                'slot_id': slot_id,
+                'booking_id': booking_id,
+            }
+        )
+    return promoted
+
+
+async def notify_promoted(cache: Cache, promoted: list[dict]) -> None:
+    """Push promotions to the members' event streams; call after commit.
+    A member who is not listening sees the booking on the next fetch."""
+    for message in promoted:
+        try:
+            await cache.publish(
+                WAITLIST_CHANNEL.format(user_id=message['user_id']), message
+            )
+        except Exception as e:
+            logger.warning(
+                'Could not notify %s of booking %s: %s',
+                message['user_id'],
+                message['booking_id'],
+                e,
+            )